@@ -4,81 +4,460 @@
 #  MIT License  (https://opensource.org/licenses/MIT)
 
 import argparse
+import asyncio
+import contextlib
+import gc
 import logging
 import os
+import shlex
+import signal
+import socket
 import sys
+import threading
+import time
 import uuid
 import json
 import hashlib
 import datetime
-from typing import List, Dict, Any
+import email.utils
+import sqlite3
+import unicodedata
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, Optional
 import re
 
 import aiofiles
-import ffmpeg
 import uvicorn
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+import yaml
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from modelscope.utils.logger import get_logger
 from transformers import MarianMTModel, MarianTokenizer
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+import numpy as np
 import torch
 
 from funasr import AutoModel
 
+from utils import (
+    NATIVE_DECODE_FORMATS,
+    SEARCH_FIELDS,
+    WaveformPeaks,
+    decode_native,
+    parse_byte_range,
+    read_peaks_level,
+    search_match_expression,
+    search_tokens,
+)
+
 logger = get_logger(log_level=logging.INFO)
 logger.setLevel(logging.INFO)
 
+
+def parse_bool(value) -> bool:
+    """解析布尔型参数：true/false、yes/no、on/off、1/0"""
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "on"):
+        return True
+    if text in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"not a boolean: {value}")
+
+
 parser = argparse.ArgumentParser()
-parser.add_argument(
+# 声明的启动参数：参数名 -> argparse.Action，配置文件和环境变量按参数名查找类型
+SETTINGS: Dict[str, argparse.Action] = {}
+
+
+def add_setting(*flags, **kwargs) -> argparse.Action:
+    """声明一个启动参数并登记到 SETTINGS"""
+    action = parser.add_argument(*flags, **kwargs)
+    SETTINGS[action.dest] = action
+    return action
+
+
+add_setting(
+    "--config",
+    type=str,
+    default="config.yaml",
+    help="YAML config file, values are overridden by ASTROMAO_<NAME> environment variables and command line flags",
+)
+add_setting(
     "--host", type=str, default="0.0.0.0", required=False, help="host ip, 0.0.0.0 to accept all connections"
 )
-parser.add_argument("--port", type=int, default=8001, required=False, help="server port")
-parser.add_argument(
+add_setting("--port", type=int, default=8001, required=False, help="server port")
+add_setting(
     "--asr_model",
     type=str,
     default="models/speech_paraformer-large-vad-punc_asr_nat-zh-cn-16k-common-vocab8404-pytorch",
     help="ASR model supporting Chinese and English with timestamp",
 )
-parser.add_argument(
+add_setting(
     "--vad_model",
     type=str,
     default="models/speech_fsmn_vad_zh-cn-16k-common-pytorch",
     help="VAD model for voice activity detection",
 )
-parser.add_argument(
+add_setting(
     "--punc_model",
     type=str,
     default="models/punc_ct-transformer_zh-cn-common-vocab272727-pytorch",
     help="Punctuation model",
 )
-parser.add_argument(
+add_setting(
     "--spk_model",
     type=str,
     default="models/speech_campplus_sv_zh-cn_16k-common",
     help="Speaker verification model",
 )
-parser.add_argument(
+add_setting(
     "--sd_model",
     type=str,
     default="models/speech_diarization_sond-zh-cn-alimeeting-16k-n16k4-pytorch",
     help="Speaker diarization model",
 )
-parser.add_argument("--device", type=str, default="cpu", help="cuda, cpu")
-parser.add_argument("--ncpu", type=int, default=4, help="cpu cores")
-parser.add_argument("--temp_dir", type=str, default="temp_dir/", required=False, help="temp dir")
-args = parser.parse_args()
+add_setting(
+    "--online_asr_model",
+    type=str,
+    default="models/speech_paraformer-large_asr_nat-zh-cn-16k-common-vocab8404-online",
+    help="Streaming ASR model for /ws/asr, optional",
+)
+add_setting("--device", type=str, default="cpu", help="cuda, cpu")
+add_setting("--ncpu", type=int, default=4, help="cpu cores")
+add_setting(
+    "--torch_threads",
+    type=int,
+    default=0,
+    help="torch intra-op threads, 0 keeps the ncpu value FunASR sets when loading a model",
+)
+add_setting("--temp_dir", type=str, default="temp_dir/", required=False, help="temp dir")
+add_setting(
+    "--inference_workers",
+    type=int,
+    default=0,
+    help="recognition threads shared by the ASR replicas (each window is also translated on its thread), "
+    "0 means os.cpu_count() // ncpu",
+)
+add_setting(
+    "--max_queue_depth",
+    type=int,
+    default=8,
+    help="max requests waiting for an inference worker before returning 503",
+)
+add_setting(
+    "--batch_window_ms",
+    type=float,
+    default=30,
+    help="time a replica waits to merge VAD segments of concurrent recognitions into one ASR batch, 0 disables",
+)
+add_setting(
+    "--batch_max_s",
+    type=float,
+    default=300,
+    help="run a merged ASR batch early once it holds this many seconds of speech",
+)
+add_setting(
+    "--translation_batch_tokens",
+    type=int,
+    default=4096,
+    help="max padded tokens per MarianMT generate batch",
+)
+add_setting(
+    "--translation_num_beams",
+    type=int,
+    default=4,
+    help="MarianMT beam size, 1 for greedy decoding",
+)
+add_setting(
+    "--translation_cache_size",
+    type=int,
+    default=10000,
+    help="max translations kept in the in-memory LRU cache",
+)
+add_setting(
+    "--translation_cache_db",
+    type=str,
+    default="results/translation_cache.sqlite3",
+    help="SQLite file backing the translation cache, empty to keep it in memory only",
+)
+add_setting(
+    "--recognition_cache_entries",
+    type=int,
+    default=500,
+    help="max cached recognition results keyed by audio hash, 0 disables the cache",
+)
+add_setting(
+    "--recognition_cache_max_age_h",
+    type=float,
+    default=168,
+    help="hours before a cached recognition result expires",
+)
+add_setting(
+    "--long_form_threshold_s",
+    type=float,
+    default=600,
+    help="audio longer than this is recognized window by window unless the request sets long_form",
+)
+add_setting(
+    "--long_form_window_s",
+    type=float,
+    default=300,
+    help="window length for long-form recognition",
+)
+add_setting(
+    "--stream_window_s",
+    type=float,
+    default=60,
+    help="window length for /api/recognize/stream, shorter windows return the first sentences sooner",
+)
+add_setting(
+    "--speaker_match_threshold",
+    type=float,
+    default=0.6,
+    help="cosine similarity above which a speaker in a later window is matched to an earlier speaker",
+)
+add_setting(
+    "--streaming_workers",
+    type=int,
+    default=2,
+    help="threads running the streaming VAD and online ASR models for /ws/asr, kept apart from the ASR replicas "
+    "so partial results are not queued behind offline recognitions",
+)
+add_setting(
+    "--max_streaming_sessions",
+    type=int,
+    default=8,
+    help="max concurrent /ws/asr sessions",
+)
+add_setting(
+    "--job_workers",
+    type=int,
+    default=1,
+    help="background workers running /api/jobs recognition jobs",
+)
+add_setting(
+    "--jobs_db",
+    type=str,
+    default="results/jobs.sqlite3",
+    help="SQLite file holding the persistent /api/jobs queue",
+)
+add_setting(
+    "--catalog_db",
+    type=str,
+    default="results/catalog.sqlite3",
+    help="SQLite index of saved results backing /api/results",
+)
+add_setting(
+    "--max_ffmpeg_processes",
+    type=int,
+    default=0,
+    help="max concurrent ffmpeg processes, 0 means one per CPU core",
+)
+add_setting(
+    "--ffmpeg_timeout_s",
+    type=float,
+    default=3600,
+    help="kill ffmpeg processes running longer than this, 0 disables the limit",
+)
+add_setting(
+    "--native_decode_max_mb",
+    type=float,
+    default=32,
+    help="uploads up to this size in WAV (or FLAC/OGG with soundfile) are decoded in-process instead of by ffmpeg, 0 disables",
+)
+add_setting(
+    "--model_load_workers",
+    type=int,
+    default=4,
+    help="threads loading independent models concurrently at startup",
+)
+add_setting(
+    "--lazy_models",
+    type=str,
+    default="",
+    help="comma separated model groups loaded on first use instead of at startup: translation, streaming",
+)
+add_setting(
+    "--asr_replicas",
+    type=int,
+    default=1,
+    help="independent copies of the recognition pipeline, requests go to the least loaded one",
+)
+add_setting(
+    "--replica_devices",
+    type=str,
+    default="",
+    help="comma separated devices assigned to ASR replicas in turn, e.g. cuda:0,cuda:1; empty uses --device",
+)
+add_setting(
+    "--pin_replicas",
+    action="store_true",
+    help="pin each ASR replica's inference threads to its own share of the CPU cores",
+)
+add_setting(
+    "--workers",
+    type=int,
+    default=1,
+    help="server processes; >1 loads models in a parent that forks workers sharing the listening socket and the weights",
+)
+add_setting(
+    "--max_file_size_mb",
+    type=float,
+    default=0,
+    help="reject request bodies larger than this before reading them, 0 disables the limit",
+)
+add_setting(
+    "--max_concurrent_requests",
+    type=int,
+    default=0,
+    help="max recognition requests admitted at once per process, 0 means inference workers + max_queue_depth",
+)
+add_setting(
+    "--model_cache",
+    type=parse_bool,
+    default=True,
+    help="keep optional models resident from startup, false loads translation and streaming models on first use",
+)
+add_setting(
+    "--clear_cache_after_request",
+    type=parse_bool,
+    default=False,
+    help="run garbage collection and empty the CUDA cache after each recognition request",
+)
+add_setting("--batch_size_s", type=int, default=300, help="model.generate batch_size_s")
+add_setting("--merge_vad", type=parse_bool, default=True, help="model.generate merge_vad")
+add_setting("--merge_length_s", type=int, default=15, help="model.generate merge_length_s")
+add_setting(
+    "--sentence_timestamp",
+    type=parse_bool,
+    default=True,
+    help="request sentence timestamps from model.generate",
+)
+add_setting(
+    "--vad_max_single_segment_time",
+    type=int,
+    default=None,
+    help="VAD max single segment length in ms, unset keeps the model default",
+)
+add_setting(
+    "--vad_speech_noise_thres",
+    type=float,
+    default=None,
+    help="VAD speech/noise threshold, unset keeps the model default",
+)
+add_setting("--hotwords", type=str, default="", help="space separated hotwords passed to model.generate")
+add_setting("--hotwords_file", type=str, default="", help="file with one hotword per line")
+add_setting("--log_level", type=str, default="INFO", help="DEBUG, INFO, WARNING, ERROR")
+
+# config.yaml 中的配置项 -> 启动参数
+CONFIG_FILE_KEYS = {
+    ("server", "host"): "host",
+    ("server", "port"): "port",
+    ("server", "temp_dir"): "temp_dir",
+    ("server", "max_file_size"): "max_file_size_mb",
+    ("device", "type"): "device",
+    ("device", "ncpu"): "ncpu",
+    ("device", "torch_threads"): "torch_threads",
+    ("recognition", "sentence_timestamp"): "sentence_timestamp",
+    ("recognition", "batch_size_s"): "batch_size_s",
+    ("recognition", "merge_vad"): "merge_vad",
+    ("recognition", "merge_length_s"): "merge_length_s",
+    ("recognition", "vad", "max_single_segment_time"): "vad_max_single_segment_time",
+    ("recognition", "vad", "speech_noise_thres"): "vad_speech_noise_thres",
+    ("recognition", "hotwords", "words"): "hotwords",
+    ("recognition", "hotwords", "file"): "hotwords_file",
+    ("translation", "num_beams"): "translation_num_beams",
+    ("logging", "level"): "log_level",
+    ("performance", "model_cache"): "model_cache",
+    ("performance", "max_concurrent_requests"): "max_concurrent_requests",
+    ("performance", "clear_cache_after_request"): "clear_cache_after_request",
+}
 
-logger.info("-----------  Configuration Arguments -----------")
-for arg, value in vars(args).items():
-    logger.info("%s: %s" % (arg, value))
-logger.info("------------------------------------------------")
 
-os.makedirs(args.temp_dir, exist_ok=True)
-os.makedirs("static", exist_ok=True)
-os.makedirs("results", exist_ok=True)  # 创建结果存储目录
+def read_config_file(path: str) -> Dict[str, Any]:
+    """读取YAML配置文件，返回 {参数名: 值}，文件不存在时返回空字典
+
+    只读取 CONFIG_FILE_KEYS 中列出的配置项；hotwords.enabled 为 false 时忽略热词。
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    settings = {}
+    for keys, dest in CONFIG_FILE_KEYS.items():
+        value = data
+        for key in keys:
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is not None:
+            settings[dest] = value
+    hotwords = (data.get("recognition") or {}).get("hotwords") or {}
+    if not hotwords.get("enabled", False):
+        settings.pop("hotwords", None)
+        settings.pop("hotwords_file", None)
+    return settings
+
+
+def convert_setting(action: argparse.Action, value):
+    """按启动参数的类型转换配置文件或环境变量中的值，列表按逗号或空格拼接
+
+    不带值的开关参数（如 --pin_replicas）按布尔值解析。
+    """
+    if action.nargs == 0:
+        return parse_bool(value)
+    if isinstance(value, list):
+        value = (" " if action.dest == "hotwords" else ",").join(str(item) for item in value)
+    if action.type is not None:
+        return action.type(value)
+    return value
+
+
+def load_settings(argv: Optional[List[str]] = None):
+    """生成启动参数，优先级：命令行 > 环境变量 > 配置文件 > 默认值，返回 (参数, 每项参数的来源)
+
+    argv 为命令行参数，直接运行 app.py 时由 main() 传入；为 None 时（被其他程序
+    导入）读取环境变量 ASTROMAO_ARGS（写法同命令行参数）。单个参数可用
+    环境变量 ASTROMAO_<参数名大写> 设置，如 ASTROMAO_PORT=8002。
+    """
+    if argv is None:
+        argv = shlex.split(os.environ.get("ASTROMAO_ARGS", ""))
+    actions = dict(SETTINGS)
+    sources = {dest: "default" for dest in actions}
+    overrides = {}
+    config_path = parser.parse_known_args(argv)[0].config
+    try:
+        file_settings = read_config_file(config_path)
+    except (OSError, yaml.YAMLError) as e:
+        parser.error(f"failed to read config file {config_path}: {e}")
+    for dest, value in file_settings.items():
+        overrides[dest] = value
+        sources[dest] = "file"
+    for dest in actions:
+        value = os.environ.get(f"ASTROMAO_{dest.upper()}")
+        if value is not None:
+            overrides[dest] = value
+            sources[dest] = "env"
+    defaults = {}
+    for dest, value in overrides.items():
+        try:
+            defaults[dest] = convert_setting(actions[dest], value)
+        except (TypeError, ValueError):
+            parser.error(f"invalid value for {dest} from {sources[dest]}: {value!r}")
+    parser.set_defaults(**defaults)
+    parsed = parser.parse_args(argv)
+    for action in actions.values():
+        for option in action.option_strings:
+            if any(token == option or token.startswith(f"{option}=") for token in argv):
+                sources[action.dest] = "cli"
+    return parsed, sources
+
 
-# 检查本地模型是否存在
 def check_local_models():
     """检查本地模型文件是否存在"""
     models_to_check = [
@@ -103,75 +482,338 @@ def check_local_models():
     
     logger.info("本地模型检查通过")
 
-check_local_models()
-logger.info("Loading models...")
-# Load FunASR models
-try:
-    # ASR model with speaker diarization
-    model = AutoModel(
-        model=args.asr_model,
-        vad_model=args.vad_model,
-        punc_model=args.punc_model,
-        spk_model=args.spk_model,
-        device=args.device,
-        ncpu=args.ncpu,
-        disable_pbar=True,
-        disable_log=True,
-        disable_update=True,
-    )
-    logger.info("Models loaded successfully!")
-except Exception as e:
-    logger.error(f"Failed to load models: {e}")
-    # Fallback to basic model without speaker features
-    model = AutoModel(
-        model=args.asr_model,
-        vad_model=args.vad_model,
-        punc_model=args.punc_model,
+# 模型加载状态
+MODEL_STATES = ("pending", "loading", "loaded", "failed", "deferred")
+LAZY_MODEL_GROUPS = ("translation", "streaming")
+
+
+class ModelSlot:
+    """单个模型的加载器、加载状态和耗时"""
+
+    def __init__(self, name: str, loader, required: bool, lazy: bool):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.lazy = lazy
+        self.state = "deferred" if lazy else "pending"
+        self.value = None
+        self.load_s = None
+        self.error = None
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """模型注册表
+
+    模块导入时只登记加载函数，服务启动后由 load_all() 在线程池中并行加载
+    相互独立的模型，uvicorn 不必等模型加载完成即可开始监听；lazy 的模型
+    在首次 get() 时才加载。required 的模型全部加载完成后服务才算就绪。
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max(1, max_workers)
+        self.slots: "OrderedDict[str, ModelSlot]" = OrderedDict()
+        self.started_at = None
+        self.finished_at = None
+
+    def register(self, name: str, loader, required: bool = False, lazy: bool = False):
+        self.slots[name] = ModelSlot(name, loader, required, lazy and not required)
+
+    def _load(self, slot: ModelSlot):
+        with slot.lock:
+            if slot.state in ("loaded", "failed"):
+                return slot.value
+            slot.state = "loading"
+            started = time.perf_counter()
+            try:
+                slot.value = slot.loader()
+                slot.state = "loaded"
+                if args.torch_threads > 0:
+                    # FunASR 的 AutoModel 加载时会把 torch 线程数设为 ncpu，加载后恢复为指定值
+                    torch.set_num_threads(args.torch_threads)
+                logger.info(f"Model {slot.name} loaded in {time.perf_counter() - started:.1f}s")
+            except Exception as e:
+                slot.state = "failed"
+                slot.error = str(e)
+                logger.error(f"Failed to load model {slot.name}: {e}")
+            finally:
+                slot.load_s = round(time.perf_counter() - started, 3)
+            return slot.value
+
+    def load_all(self):
+        """并行加载所有非 lazy 的模型，全部结束（成功或失败）后返回；已加载过时直接返回"""
+        if self.finished_at is not None:
+            return
+        self.started_at = time.time()
+        eager = [slot for slot in self.slots.values() if not slot.lazy]
+        logger.info(f"Loading {len(eager)} models with {self.max_workers} threads...")
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="model-load") as pool:
+            list(pool.map(self._load, eager))
+        self.finished_at = time.time()
+        logger.info(f"Model loading finished in {self.finished_at - self.started_at:.1f}s, ready: {self.ready}")
+
+    def get(self, name: str):
+        """返回已加载的模型，lazy 模型首次调用时在当前线程加载；未登记、未加载或加载失败时返回 None"""
+        slot = self.slots.get(name)
+        if slot is None:
+            return None
+        if slot.lazy and slot.state != "loaded":
+            return self._load(slot)
+        return slot.value
+
+    @property
+    def ready(self) -> bool:
+        return all(slot.state == "loaded" for slot in self.slots.values() if slot.required)
+
+    @property
+    def failed(self) -> bool:
+        return any(slot.state == "failed" for slot in self.slots.values() if slot.required)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回每个模型的加载状态和耗时"""
+        if self.started_at is None:
+            loading_s = None
+        else:
+            loading_s = round((self.finished_at or time.time()) - self.started_at, 3)
+        return {
+            "ready": self.ready,
+            "loading_s": loading_s,
+            "models": {
+                name: {
+                    "state": slot.state,
+                    "required": slot.required,
+                    "lazy": slot.lazy,
+                    "load_s": slot.load_s,
+                    "error": slot.error,
+                }
+                for name, slot in self.slots.items()
+            },
+        }
+
+
+def load_asr_model(device: str):
+    """加载识别主模型（ASR+VAD+标点+说话人），说话人模型加载失败时回退到不含说话人的模型"""
+    try:
+        # ASR model with speaker diarization
+        return AutoModel(
+            model=args.asr_model,
+            vad_model=args.vad_model,
+            vad_kwargs=VAD_PARAMS,
+            punc_model=args.punc_model,
+            spk_model=args.spk_model,
+            device=device,
+            ncpu=args.ncpu,
+            disable_pbar=True,
+            disable_log=True,
+            disable_update=True,
+        )
+    except Exception as e:
+        logger.error(f"Failed to load models: {e}")
+        # Fallback to basic model without speaker features
+        basic_model = AutoModel(
+            model=args.asr_model,
+            vad_model=args.vad_model,
+            vad_kwargs=VAD_PARAMS,
+            punc_model=args.punc_model,
+            device=device,
+            ncpu=args.ncpu,
+            disable_pbar=True,
+            disable_log=True,
+            disable_update=True,
+        )
+        logger.info("Basic models loaded (without speaker features)!")
+        return basic_model
+
+
+def load_streaming_model(model_path: str):
+    """加载 /ws/asr 使用的流式模型"""
+    return AutoModel(
+        model=model_path,
         device=args.device,
         ncpu=args.ncpu,
         disable_pbar=True,
         disable_log=True,
         disable_update=True,
     )
-    logger.info("Basic models loaded (without speaker features)!")
+
 
 # Initialize local translation models
+def model_dir_checksum(model_path: str) -> str:
+    """计算模型目录的校验和，用于区分模型版本
+
+    小文件（配置、词表）按内容计算，大的权重文件按文件名和大小计算，
+    避免启动时读取整个权重文件。
+    """
+    md5 = hashlib.md5()
+    for root, _, files in sorted(os.walk(model_path)):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            size = os.path.getsize(path)
+            md5.update(f"{os.path.relpath(path, model_path)}:{size}".encode("utf-8"))
+            if size <= 1024 * 1024:
+                with open(path, "rb") as f:
+                    md5.update(f.read())
+    return md5.hexdigest()
+
+
+class TranslationCache:
+    """翻译结果缓存：内存LRU，可选SQLite持久化
+
+    键为 (规范化文本, 源语言, 目标语言, 模型版本)，内存未命中时再查磁盘。
+    """
+
+    def __init__(self, max_entries: int, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db_path = db_path
+        self._db = None
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS translations ("
+                    "text TEXT NOT NULL, source_lang TEXT NOT NULL, target_lang TEXT NOT NULL, "
+                    "revision TEXT NOT NULL, translated TEXT NOT NULL, "
+                    "PRIMARY KEY (text, source_lang, target_lang, revision))"
+                )
+                self._db.commit()
+                logger.info(f"Translation cache backed by: {db_path}")
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to open translation cache {db_path}, using memory only: {e}")
+                self._db = None
+
+    def reopen(self):
+        """fork 后在子进程中重新打开数据库连接，SQLite 连接不能跨进程共用"""
+        if self._db is not None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """规范化文本：NFKC归一并合并空白"""
+        return " ".join(unicodedata.normalize("NFKC", text).split())
+
+    def get(self, text: str, source_lang: str, target_lang: str, revision: str) -> Optional[str]:
+        """查询缓存，未命中返回 None"""
+        key = (self.normalize(text), source_lang, target_lang, revision)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT translated FROM translations "
+                    "WHERE text = ? AND source_lang = ? AND target_lang = ? AND revision = ?",
+                    key,
+                ).fetchone()
+                if row is not None:
+                    self.disk_hits += 1
+                    self._remember(key, row[0])
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put_many(self, items: List[tuple]):
+        """写入多条 (文本, 源语言, 目标语言, 模型版本, 译文)"""
+        rows = [(self.normalize(text), src, tgt, rev, translated) for text, src, tgt, rev, translated in items]
+        with self._lock:
+            for row in rows:
+                self._remember(row[:4], row[4])
+            if self._db is not None and rows:
+                try:
+                    self._db.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)", rows)
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to persist translations: {e}")
+
+    def _remember(self, key: tuple, translated: str):
+        self._entries[key] = translated
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存命中统计"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "persistent": self._db is not None,
+            }
+
+
 class LocalTranslator:
-    def __init__(self):
-        self.zh_to_en_model = None
-        self.zh_to_en_tokenizer = None
-        self.en_to_zh_model = None
-        self.en_to_zh_tokenizer = None
-        self.load_models()
-    
-    def load_models(self):
-        """加载本地翻译模型"""
-        try:
-            # 获取当前脚本目录
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            
-            # 中文到英文模型路径
-            zh_en_model_path = os.path.join(current_dir, "models", "translation", "opus-mt-zh-en")
-            if os.path.exists(zh_en_model_path):
-                self.zh_to_en_tokenizer = MarianTokenizer.from_pretrained(zh_en_model_path)
-                self.zh_to_en_model = MarianMTModel.from_pretrained(zh_en_model_path)
-                logger.info(f"Loaded zh-en model from: {zh_en_model_path}")
-            else:
-                logger.warning(f"zh-en model not found at: {zh_en_model_path}")
-            
-            # 英文到中文模型路径
-            en_zh_model_path = os.path.join(current_dir, "models", "translation", "opus-mt-en-zh")
-            if os.path.exists(en_zh_model_path):
-                self.en_to_zh_tokenizer = MarianTokenizer.from_pretrained(en_zh_model_path)
-                self.en_to_zh_model = MarianMTModel.from_pretrained(en_zh_model_path)
-                logger.info(f"Loaded en-zh model from: {en_zh_model_path}")
-            else:
-                logger.warning(f"en-zh model not found at: {en_zh_model_path}")
-            
-            logger.info("Local translation models loaded successfully from models folder!")
-        except Exception as e:
-            logger.error(f"Failed to load translation models: {e}")
-            logger.warning("Translation functionality will be disabled")
+    # 翻译方向对应的模型目录（models/translation 下）
+    MODEL_DIRS = {
+        ('zh', 'en'): "opus-mt-zh-en",
+        ('en', 'zh'): "opus-mt-en-zh",
+    }
+
+    def __init__(self, registry: ModelRegistry, max_batch_tokens: int = 4096,
+                 cache: Optional[TranslationCache] = None, lazy: bool = False, num_beams: int = 4):
+        self.registry = registry
+        self.max_batch_tokens = max_batch_tokens
+        self.num_beams = num_beams
+        self.cache = cache
+        self.revisions = {}
+        self.register_models(lazy)
+    
+    def register_models(self, lazy: bool):
+        """登记本地翻译模型，模型在服务启动时（lazy 时为首次翻译时）加载
+
+        启动时加载的翻译模型是 required 的，加载完成前服务不就绪，加载失败时服务不可用。
+        模型版本校验和在登记时计算，版本中带上 beam 大小，修改后缓存的译文随之失效。
+        """
+        # 获取当前脚本目录
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        for (source_lang, target_lang), dirname in self.MODEL_DIRS.items():
+            model_path = os.path.join(current_dir, "models", "translation", dirname)
+            if not os.path.exists(model_path):
+                logger.warning(f"{source_lang}-{target_lang} model not found at: {model_path}")
+                continue
+            self.revisions[(source_lang, target_lang)] = f"{model_dir_checksum(model_path)}:beams{self.num_beams}"
+            self.registry.register(
+                f"translation_{source_lang}_{target_lang}",
+                lambda model_path=model_path: self.load_model(model_path),
+                required=not lazy,
+                lazy=lazy,
+            )
+    
+    @staticmethod
+    def load_model(model_path: str):
+        """加载一个方向的 (tokenizer, model)"""
+        tokenizer = MarianTokenizer.from_pretrained(model_path)
+        model = MarianMTModel.from_pretrained(model_path)
+        logger.info(f"Loaded translation model from: {model_path}")
+        return tokenizer, model
+    
+    def _get_model(self, source_lang: str, target_lang: str):
+        """返回翻译方向对应的 (tokenizer, model)，不支持或未加载时返回 None"""
+        return self.registry.get(f"translation_{source_lang}_{target_lang}")
+
+    def available_revisions(self) -> Dict[tuple, str]:
+        """返回各翻译方向当前可用的模型版本，模型加载失败的方向记为 unavailable
+
+        识别缓存的指纹使用此结果：翻译模型不可用时识别结果里是原文，
+        这样的结果和正常翻译的结果不会共用缓存条目。
+        """
+        revisions = {}
+        for (source_lang, target_lang), revision in self.revisions.items():
+            slot = self.registry.slots.get(f"translation_{source_lang}_{target_lang}")
+            revisions[(source_lang, target_lang)] = "unavailable" if slot is None or slot.state == "failed" else revision
+        return revisions
     
     def translate(self, text: str, source_lang: str, target_lang: str) -> str:
         """执行翻译"""
@@ -179,36 +821,104 @@ class LocalTranslator:
             return text
         
         try:
-            if source_lang == 'zh' and target_lang == 'en':
-                if self.zh_to_en_model is None:
-                    return text
-                tokenizer = self.zh_to_en_tokenizer
-                model = self.zh_to_en_model
-            elif source_lang == 'en' and target_lang == 'zh':
-                if self.en_to_zh_model is None:
-                    return text
-                tokenizer = self.en_to_zh_tokenizer
-                model = self.en_to_zh_model
-            else:
+            loaded = self._get_model(source_lang, target_lang)
+            if loaded is None:
                 return text
+            tokenizer, model = loaded
+            revision = self.revisions.get((source_lang, target_lang), "")
+            if self.cache is not None:
+                cached = self.cache.get(text, source_lang, target_lang, revision)
+                if cached is not None:
+                    return cached
             
             # 编码输入文本
             inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=512)
             
             # 生成翻译
             with torch.no_grad():
-                outputs = model.generate(**inputs, max_length=512, num_beams=4, early_stopping=True)
+                outputs = model.generate(**inputs, max_length=512, num_beams=self.num_beams, early_stopping=True)
             
             # 解码输出
             translated = tokenizer.decode(outputs[0], skip_special_tokens=True)
+            if self.cache is not None:
+                self.cache.put_many([(text, source_lang, target_lang, revision, translated)])
             return translated
             
         except Exception as e:
             logger.warning(f"Translation failed: {e}")
             return text
+    
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        """批量翻译同一方向的多条文本
+
+        先查缓存并对重复文本去重，剩余文本按token长度排序后分块，每块填充后的
+        token总数不超过 max_batch_tokens，每块只调用一次 generate。
+        不支持的方向直接原样返回。
+        """
+        results = list(texts)
+        loaded = self._get_model(source_lang, target_lang)
+        if loaded is None:
+            if (source_lang, target_lang) in self.revisions:
+                logger.warning(f"Translation model {source_lang}-{target_lang} unavailable, keeping source text")
+            return results
+        tokenizer, model = loaded
+        
+        revision = self.revisions.get((source_lang, target_lang), "")
+        # 待翻译文本 -> 结果中的位置，相同文本只翻译一次
+        pending = {}
+        for i, text in enumerate(texts):
+            if not text.strip():
+                continue
+            if text in pending:
+                pending[text].append(i)
+                continue
+            cached = self.cache.get(text, source_lang, target_lang, revision) if self.cache is not None else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending[text] = [i]
+        if not pending:
+            return results
+        
+        try:
+            unique_texts = list(pending)
+            lengths = {
+                text: min(len(ids), 512)
+                for text, ids in zip(unique_texts, tokenizer(unique_texts, truncation=True, max_length=512)["input_ids"])
+            }
+            # 长度相近的句子放在同一批，减少填充
+            unique_texts.sort(key=lambda text: lengths[text])
+            
+            chunks = []
+            chunk = []
+            for text in unique_texts:
+                # 块内按最长句子填充，超出预算时另起一块
+                if chunk and lengths[text] * (len(chunk) + 1) > self.max_batch_tokens:
+                    chunks.append(chunk)
+                    chunk = []
+                chunk.append(text)
+            if chunk:
+                chunks.append(chunk)
+            
+            for chunk in chunks:
+                inputs = tokenizer(chunk, return_tensors="pt", padding=True, truncation=True, max_length=512)
+                with torch.no_grad():
+                    outputs = model.generate(**inputs, max_length=512, num_beams=self.num_beams, early_stopping=True)
+                translations = tokenizer.batch_decode(outputs, skip_special_tokens=True)
+                for text, translated in zip(chunk, translations):
+                    for i in pending[text]:
+                        results[i] = translated
+                if self.cache is not None:
+                    self.cache.put_many([
+                        (text, source_lang, target_lang, revision, translated)
+                        for text, translated in zip(chunk, translations)
+                    ])
+            return results
+        
+        except Exception as e:
+            logger.warning(f"Batch translation failed, falling back to per-sentence: {e}")
+            return [self.translate(text, source_lang, target_lang) for text in texts]
 
-# 初始化翻译器
-translator = LocalTranslator()
 
 # Translation functions
 def detect_language(text: str) -> str:
@@ -253,10 +963,1473 @@ def translate_text(text: str, target_lang: str = None) -> Dict[str, str]:
         logger.warning(f"Translation failed: {e}")
         return {"original": text, "translated": text, "source_lang": "unknown", "target_lang": target_lang or "unknown"}
 
+
+def translate_sentences(texts: List[str]) -> List[Dict[str, str]]:
+    """批量生成每条文本的中英文译文
+
+    按检测到的源语言分组，每个方向只做一次批量翻译；与源语言相同的
+    目标语言直接使用原文，不经过模型。
+    """
+    translations = []
+    groups = {'zh': [], 'en': []}
+    for i, text in enumerate(texts):
+        if not text.strip():
+            translations.append({"zh": text, "en": text, "source_lang": "unknown"})
+            continue
+        source_lang = detect_language(text)
+        translations.append({"zh": text, "en": text, "source_lang": source_lang})
+        if source_lang in groups:
+            groups[source_lang].append(i)
+    
+    for source_lang, indices in groups.items():
+        if not indices:
+            continue
+        target_lang = 'en' if source_lang == 'zh' else 'zh'
+        translated = translator.translate_batch([texts[i] for i in indices], source_lang, target_lang)
+        for i, text in zip(indices, translated):
+            translations[i][target_lang] = text
+    
+    return translations
+
+
+class QueueFullError(Exception):
+    """推理队列已满，请求被拒绝"""
+
+
+class AdmissionControl:
+    """准入控制：在途请求数达到上限时直接拒绝新请求
+
+    上限为 workers + max_queue_depth，max_in_flight 大于0时不超过 max_in_flight。
+    """
+
+    def __init__(self, workers: int, max_queue_depth: int, max_in_flight: int = 0):
+        self.max_queue_depth = max_queue_depth
+        self.max_in_flight = workers + max_queue_depth
+        if max_in_flight > 0:
+            self.max_in_flight = min(self.max_in_flight, max_in_flight)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    def try_acquire(self) -> bool:
+        """尝试占用一个准入名额，已满时返回 False（不计入 rejected）"""
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    @contextlib.contextmanager
+    def admit(self):
+        """占用一个准入名额，队列已满时抛出 QueueFullError"""
+        if not self.try_acquire():
+            with self._lock:
+                self.rejected += 1
+            raise QueueFullError(f"Inference queue is full ({self.in_flight} requests in flight)")
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "max_queue_depth": self.max_queue_depth,
+                "max_in_flight": self.max_in_flight,
+                "rejected": self.rejected,
+            }
+
+
+class StreamingExecutor:
+    """/ws/asr 流式模型（流式VAD、online ASR）的推理线程池
+
+    流式会话每 60ms×chunk 帧就要算一次VAD和 online 识别，每次只有几十毫秒，
+    必须在下一块音频到达前返回。ModelPool 的线程执行的是整段的离线识别，一次可达数秒，
+    流式的小计算排在它们后面会让实时草稿停顿，所以流式模型使用单独的少量线程。
+    admit() 限制的是同时在线的会话数（max_workers + max_queue_depth），会话中用离线
+    模型识别和翻译整段语音时仍由 ModelPool 执行，并占用它的准入名额。
+    """
+
+    def __init__(self, max_workers: int, max_queue_depth: int, max_in_flight: int = 0):
+        self.max_workers = max_workers
+        self.admission = AdmissionControl(max_workers, max_queue_depth, max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._running = 0
+
+    def admit(self):
+        """占用一个准入名额，队列已满时抛出 QueueFullError"""
+        return self.admission.admit()
+
+    async def run(self, fn, *args, **kwargs):
+        """在推理线程池中执行 fn，返回 (结果, 排队耗时, 计算耗时)，单位为秒"""
+        submitted = time.perf_counter()
+        timing = {}
+
+        def job():
+            started = time.perf_counter()
+            timing["queue_wait"] = started - submitted
+            with self._lock:
+                self._running += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timing["compute"] = time.perf_counter() - started
+                with self._lock:
+                    self._running -= 1
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self._executor, job)
+        return result, timing["queue_wait"], timing["compute"]
+
+    def stats(self) -> Dict[str, int]:
+        """返回线程池当前状态"""
+        with self._lock:
+            running = self._running
+        return {"workers": self.max_workers, "running": running, **self.admission.stats()}
+
+
+# 16kHz 单声道 s16le PCM 每秒字节数
+PCM_BYTES_PER_SECOND = 16000 * 2
+
+def load_hotwords() -> str:
+    """合并 --hotwords 和 --hotwords_file 中的热词，以空格分隔"""
+    words = args.hotwords.split()
+    if args.hotwords_file:
+        try:
+            with open(args.hotwords_file, "r", encoding="utf-8") as f:
+                words.extend(line.strip() for line in f if line.strip())
+        except OSError as e:
+            logger.warning(f"Failed to read hotwords file {args.hotwords_file}: {e}")
+    return " ".join(dict.fromkeys(words))
+
+
+def run_asr(audio_input, model) -> List[Dict[str, Any]]:
+    """用指定的识别模型副本执行语音识别，模型不支持时间戳时自动回退
+
+    服务中的调用都经过 model_pool.run()，由它分配副本并传入 model。
+    """
+    param_dict = dict(RECOGNITION_PARAMS)
+    if not args.sentence_timestamp:
+        return model.generate(input=audio_input, is_final=True, **param_dict)
+
+    # Add timestamp parameter only if model supports it
+    try:
+        param_dict["sentence_timestamp"] = True
+        return model.generate(input=audio_input, is_final=True, **param_dict)
+    except Exception as timestamp_error:
+        logger.warning(f"Timestamp not supported, falling back: {timestamp_error}")
+        # Retry without timestamp
+        param_dict.pop("sentence_timestamp", None)
+        return model.generate(input=audio_input, is_final=True, **param_dict)
+
+
+def build_sentences(result: Dict[str, Any]):
+    """将模型输出整理为带翻译的分句列表，返回 (全文, 分句, 说话人集合)"""
+    text = result.get("text", "")
+    sentences = []
+    speakers = set()
+
+    # Process sentence information
+    sentence_info = result.get("sentence_info", [])
+    if sentence_info:
+        # Model supports detailed sentence info
+        for sentence in sentence_info:
+            start_time = sentence.get("start", 0) / 1000  # Convert to seconds
+            end_time = sentence.get("end", 0) / 1000
+
+            # Extract speaker information if available
+            speaker_id = sentence.get("spk", "Speaker_1")
+            speakers.add(speaker_id)
+
+            sentences.append({
+                "text": sentence.get("text", ""),
+                "start": round(start_time, 2),
+                "end": round(end_time, 2),
+                "speaker": speaker_id,
+            })
+    else:
+        # Fallback: create single sentence from full text
+        sentences.append({
+            "text": text,
+            "start": 0.0,
+            "end": 0.0,
+            "speaker": "Speaker_1",
+        })
+        speakers.add("Speaker_1")
+
+    # 整个结果的句子一次性批量翻译
+    translations = translate_sentences([sentence["text"] for sentence in sentences])
+    for sentence, translation in zip(sentences, translations):
+        sentence["translation"] = translation
+
+    return text, sentences, speakers
+
+
+# 计算说话人声纹时每个说话人最多使用的音频时长（秒）
+SPEAKER_EMBEDDING_MAX_S = 30
+
+
+class SpeakerTracker:
+    """把各段识别结果中的说话人标签映射为整段音频统一的编号
+
+    说话人聚类在每段内独立进行，同一个人在不同段的标签可能不同。每段按标签计算声纹，
+    与已有说话人的声纹质心做余弦匹配（同一段内的不同标签不会映射到同一说话人），
+    相似度低于 threshold 的视为新说话人。
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.centroids = []
+        self.counts = []
+
+    def assign(self, embeddings: Dict[Any, np.ndarray]) -> Dict[Any, int]:
+        """返回 {段内标签: 全局编号}，并用本段声纹更新质心"""
+        vectors = {label: emb / (np.linalg.norm(emb) or 1.0) for label, emb in embeddings.items()}
+        pairs = sorted(
+            ((float(np.dot(vector, centroid / (np.linalg.norm(centroid) or 1.0))), label, index)
+             for label, vector in vectors.items() for index, centroid in enumerate(self.centroids)),
+            key=lambda pair: -pair[0],
+        )
+        mapping = {}
+        for similarity, label, index in pairs:
+            if similarity < self.threshold:
+                break
+            if label not in mapping and index not in mapping.values():
+                mapping[label] = index
+        for label in sorted(vectors, key=str):
+            if label not in mapping:
+                mapping[label] = len(self.centroids)
+                self.centroids.append(np.zeros_like(vectors[label]))
+                self.counts.append(0)
+            index = mapping[label]
+            self.counts[index] += 1
+            self.centroids[index] = self.centroids[index] + (vectors[label] - self.centroids[index]) / self.counts[index]
+        return mapping
+
+
+def speaker_embeddings(sentence_info: List[Dict[str, Any]], pcm: bytes, model) -> Optional[Dict[Any, np.ndarray]]:
+    """用识别模型自带的说话人模型为段内每个标签计算声纹，模型不含说话人模型时返回 None"""
+    spk_model = getattr(model, "spk_model", None)
+    if spk_model is None or any("spk" not in sentence for sentence in sentence_info):
+        return None
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768
+    samples_per_ms = PCM_BYTES_PER_SECOND // 2 // 1000
+    pieces = {}
+    for sentence in sentence_info:
+        start = int(sentence.get("start", 0)) * samples_per_ms
+        end = int(sentence.get("end", 0)) * samples_per_ms
+        pieces.setdefault(sentence["spk"], []).append(samples[start:end])
+    embeddings = {}
+    for label, parts in pieces.items():
+        audio = np.concatenate(parts)[:SPEAKER_EMBEDDING_MAX_S * samples_per_ms * 1000]
+        if len(audio) == 0:
+            continue
+        result = model.inference([audio], input_len=None, model=spk_model, kwargs=model.spk_kwargs)
+        embedding = result[0]["spk_embedding"]
+        if hasattr(embedding, "cpu"):
+            embedding = embedding.cpu().numpy()
+        embeddings[label] = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    return embeddings
+
+
+def recognize_pcm(pcm: bytes, offset: Optional[int], tracker: Optional[SpeakerTracker], model) -> Optional[tuple]:
+    """识别一段PCM并整理为带翻译的分句，返回 (全文, 分句, 说话人集合)，没有语音时返回 None
+
+    offset 为该段在整段音频中的字节偏移（整段识别时为 None）。分段识别时由 tracker
+    把段内说话人标签映射为整段统一的编号；无法计算声纹时保留段内标签。识别和翻译在
+    同一个副本线程中完成，计算线程总数不超过 --inference_workers。
+    """
+    rec_results = run_asr(pcm, model)
+    if len(rec_results) == 0:
+        return None
+    result = rec_results[0]
+    if tracker is not None and result.get("sentence_info"):
+        try:
+            embeddings = speaker_embeddings(result["sentence_info"], pcm, model)
+        except Exception as e:
+            logger.warning(f"Speaker embedding failed, keeping per-window speaker labels: {e}")
+            embeddings = None
+        if embeddings:
+            mapping = tracker.assign(embeddings)
+            for sentence in result["sentence_info"]:
+                if sentence["spk"] in mapping:
+                    sentence["spk"] = mapping[sentence["spk"]]
+    if offset is not None:
+        sentence_info = shift_result(
+            result, offset * 1000 // PCM_BYTES_PER_SECOND, len(pcm) * 1000 // PCM_BYTES_PER_SECOND
+        )
+        if not sentence_info:
+            return None
+        result = {"text": result.get("text", ""), "sentence_info": sentence_info}
+    return build_sentences(result)
+
+
+class ASRReplica:
+    """识别模型的一个副本：独占推理线程池，可绑定到一组CPU核心"""
+
+    def __init__(self, index: int, name: str, device: str, threads: int, pin: bool):
+        self.index = index
+        self.name = name
+        self.device = device
+        self.threads = threads
+        self.pin = pin
+        self.cores = None
+        self.batcher = None
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix=f"asr-{index}", initializer=self._pin_thread
+        )
+        self.in_flight = 0
+        self.running = 0
+        self.requests = 0
+        self.errors = 0
+        self.busy_s = 0.0
+
+    def _pin_thread(self):
+        """线程启动时绑定CPU核心；torch 的计算线程由该线程创建，继承同一组核心"""
+        if not self.pin or not hasattr(os, "sched_setaffinity"):
+            return
+        if self.cores is None:
+            self.cores = replica_cores(worker_index * args.asr_replicas + self.index,
+                                       max(1, args.workers) * args.asr_replicas)
+        os.sched_setaffinity(0, self.cores)
+
+
+def replica_cores(slot: int, slots: int) -> List[int]:
+    """把进程可用的CPU核心均分为 slots 份，返回第 slot 份；核心数不够分时返回全部核心"""
+    cores = sorted(os.sched_getaffinity(0))
+    per_slot = len(cores) // slots
+    if per_slot == 0:
+        return cores
+    return cores[slot * per_slot:(slot + 1) * per_slot]
+
+
+class _SegmentBatch:
+    """ASRSegmentBatcher 中一批待合并的语音段"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.inputs = []
+        self.seconds = 0.0
+        self.closed = False
+        self.done = threading.Event()
+        self.results = None
+
+
+class ASRSegmentBatcher:
+    """同一副本上并发识别的VAD语音段合并为一批ASR推理
+
+    FunASR 的 inference_with_vad 对每个输入先做VAD，再调用 inference(语音段列表,
+    model=ASR模型) 识别切出的语音段，之后逐个输入加标点、做说话人聚类。这里替换副本的
+    inference：VAD、标点和说话人模型照常按请求执行，只有ASR这一步跨请求合并。
+    第一个到达的线程等待最多 window_s，直到正在该副本上计算的请求都已提交语音段，
+    或合并的语音达到 max_batch_s，然后用合并后的语音段列表调用一次 inference，
+    再按提交顺序把结果分回各请求。识别参数不同的请求不会合并；合并推理失败时各请求
+    退回单独推理。副本只有一个识别线程时没有可合并的请求，不会等待。
+    """
+
+    def __init__(self, model, replica: ASRReplica, window_ms: float, max_batch_s: float):
+        self.model = model
+        self.replica = replica
+        self.window_s = window_ms / 1000
+        self.max_batch_s = max_batch_s
+        self._inference = model.inference
+        self._cond = threading.Condition()
+        self._pending = {}
+        self.batches = 0
+        self.merged_requests = 0
+        model.inference = self.inference
+
+    def inference(self, input, input_len=None, model=None, kwargs=None, key=None, **cfg):
+        if model is not self.model.model or not isinstance(input, list) or not input:
+            return self._inference(input, input_len=input_len, model=model, kwargs=kwargs, key=key, **cfg)
+        batch_key = json.dumps(cfg, sort_keys=True, default=str)
+        with self._cond:
+            batch = self._pending.get(batch_key)
+            leader = batch is None
+            if leader:
+                batch = self._pending[batch_key] = _SegmentBatch(batch_key)
+            index = len(batch.inputs)
+            batch.inputs.append(input)
+            batch.seconds += sum(len(segment) for segment in input) / 16000
+            if batch.seconds >= self.max_batch_s:
+                self._close(batch)
+            self._cond.notify_all()
+            if leader:
+                deadline = time.perf_counter() + self.window_s
+                while not batch.closed and len(batch.inputs) < self.replica.running:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._close(batch)
+        if leader:
+            self._run(batch, kwargs, cfg)
+        else:
+            batch.done.wait()
+        if batch.results is None:
+            return self._inference(input, input_len=input_len, model=model, kwargs=kwargs, key=key, **cfg)
+        return batch.results[index]
+
+    def _close(self, batch: _SegmentBatch):
+        """不再接受新的语音段，之后到达的请求组成新的一批"""
+        batch.closed = True
+        if self._pending.get(batch.key) is batch:
+            del self._pending[batch.key]
+
+    def _run(self, batch: _SegmentBatch, kwargs, cfg):
+        try:
+            segments = [segment for inputs in batch.inputs for segment in inputs]
+            # kwargs 中的 batch_size 是 batch_size_s 换算的毫秒数，远大于语音段数，整批一次前向计算
+            results = self._inference(segments, model=self.model.model, kwargs=kwargs, **cfg)
+            if len(batch.inputs) > 1:
+                logger.debug(f"Merged {len(batch.inputs)} recognitions into one ASR batch of {len(segments)} segments")
+            if len(results) != len(segments):
+                raise RuntimeError(f"ASR batch returned {len(results)} results for {len(segments)} segments")
+            split = []
+            for inputs in batch.inputs:
+                split.append(results[:len(inputs)])
+                results = results[len(inputs):]
+            batch.results = split
+            with self._cond:
+                self.batches += 1
+                self.merged_requests += len(batch.inputs)
+        except Exception as e:
+            logger.warning(f"Merged ASR batch failed, recognizing each request separately: {e}")
+        finally:
+            batch.done.set()
+
+
+class ModelPool:
+    """ASR 模型副本池，所有识别计算都在这里执行
+
+    每次调用分配给在途请求最少的已加载副本（相同时选累计计算时间最短的），
+    在该副本的线程池中执行 fn(*args, model=副本模型)。识别请求先通过 admit()
+    占用准入名额，上限为各副本线程总数 + max_queue_depth。batch_window_ms 大于0时
+    副本首次使用时挂上 ASRSegmentBatcher，合并并发请求的ASR语音段。
+    """
+
+    def __init__(self, registry: ModelRegistry, replicas: List[ASRReplica], max_queue_depth: int,
+                 max_in_flight: int = 0, batch_window_ms: float = 0, batch_max_s: float = 300):
+        self.registry = registry
+        self.replicas = replicas
+        self.batch_window_ms = batch_window_ms
+        self.batch_max_s = batch_max_s
+        self.workers = sum(replica.threads for replica in replicas)
+        self.admission = AdmissionControl(self.workers, max_queue_depth, max_in_flight)
+        self.created_at = time.time()
+        self._lock = threading.Lock()
+
+    def admit(self):
+        """占用一个准入名额，队列已满时抛出 QueueFullError"""
+        return self.admission.admit()
+
+    def _acquire(self) -> ASRReplica:
+        with self._lock:
+            loaded = [r for r in self.replicas if self.registry.slots[r.name].state == "loaded"]
+            if not loaded:
+                raise RuntimeError("ASR model is not loaded")
+            replica = min(loaded, key=lambda r: (r.in_flight, r.busy_s))
+            replica.in_flight += 1
+            return replica
+
+    async def run(self, fn, *args):
+        """在最空闲的副本上执行 fn，返回 (结果, 排队耗时, 计算耗时)，单位为秒"""
+        replica = self._acquire()
+        model = self.registry.get(replica.name)
+        if replica.batcher is None and self.batch_window_ms > 0:
+            # 在各工作进程中挂载，多进程部署时父进程加载的模型不带批处理线程状态
+            replica.batcher = ASRSegmentBatcher(model, replica, self.batch_window_ms, self.batch_max_s)
+        submitted = time.perf_counter()
+        timing = {}
+
+        def job():
+            started = time.perf_counter()
+            timing["queue_wait"] = started - submitted
+            with self._lock:
+                replica.running += 1
+            try:
+                return fn(*args, model=model)
+            except Exception:
+                with self._lock:
+                    replica.errors += 1
+                raise
+            finally:
+                timing["compute"] = time.perf_counter() - started
+                with self._lock:
+                    replica.running -= 1
+                    replica.requests += 1
+                    replica.busy_s += timing["compute"]
+
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(replica.executor, job)
+        finally:
+            with self._lock:
+                replica.in_flight -= 1
+        return result, timing["queue_wait"], timing["compute"]
+
+    def stats(self) -> Dict[str, Any]:
+        """返回识别线程总数、正在计算的任务数和准入状态"""
+        with self._lock:
+            running = sum(r.running for r in self.replicas)
+        return {"workers": self.workers, "running": running, **self.admission.stats()}
+
+    def replica_stats(self) -> List[Dict[str, Any]]:
+        """返回每个副本的负载，utilization 为计算耗时占 (运行时长 × 线程数) 的比例"""
+        elapsed = max(time.time() - self.created_at, 1e-6)
+        with self._lock:
+            return [
+                {
+                    "replica": r.index,
+                    "device": r.device,
+                    "state": self.registry.slots[r.name].state,
+                    "threads": r.threads,
+                    "cores": r.cores,
+                    "in_flight": r.in_flight,
+                    "running": r.running,
+                    "requests": r.requests,
+                    "errors": r.errors,
+                    "busy_s": round(r.busy_s, 3),
+                    "utilization": round(r.busy_s / (elapsed * r.threads), 4),
+                    "asr_batches": r.batcher.batches if r.batcher else 0,
+                    "merged_requests": r.batcher.merged_requests if r.batcher else 0,
+                }
+                for r in self.replicas
+            ]
+
+
+class RecognitionCache:
+    """识别结果缓存，避免重复识别相同的音频
+
+    以 (音频MD5, 模型与参数指纹) 为键，把分句结果保存为JSON文件；
+    超过 max_age_s 的条目视为过期，条目数超过 max_entries 时按最近使用时间淘汰。
+    fingerprint 是返回指纹的函数，每次读写时调用，指纹随模型加载状态变化时旧条目自然不再命中。
+    内存中保存各条目音频开头 CACHE_PROBE_BYTES 字节的MD5（probe），上传开头与某条目相同时
+    先等上传完成、按完整哈希查询缓存，命中则不必启动解码。
+    get/put/evict 都有文件读写，应在线程池中调用。
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int, max_age_s: float, fingerprint: Callable[[], str]):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_age_s = max_age_s
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self._probes = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        for filename in os.listdir(cache_dir):
+            if filename.endswith(".json"):
+                path = os.path.join(cache_dir, filename)
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        probe = json.load(f).get("probe")
+                except (OSError, ValueError):
+                    continue
+                if probe:
+                    self._probes[path] = probe
+
+    def may_contain(self, probe: str) -> bool:
+        """音频开头的MD5与某个缓存条目相同时返回 True（只查内存，可在事件循环中调用）"""
+        with self._lock:
+            return probe in self._probes.values()
+
+    def _path(self, audio_hash: str) -> str:
+        key = hashlib.md5(f"{audio_hash}:{self.fingerprint()}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, audio_hash: str) -> Optional[Dict[str, Any]]:
+        """查询缓存，未命中或已过期时返回 None"""
+        path = self._path(audio_hash)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age_s:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            # 更新修改时间，作为最近使用时间参与淘汰
+            os.utime(path)
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def put(self, audio_hash: str, entry: Dict[str, Any], probe: Optional[str] = None):
+        """写入识别结果并按容量和时效淘汰旧条目"""
+        path = self._path(audio_hash)
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({**entry, "probe": probe}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write recognition cache: {e}")
+            return
+        if probe:
+            with self._lock:
+                self._probes[path] = probe
+        self.evict()
+
+    def evict(self):
+        """删除过期条目，并把条目数控制在 max_entries 以内"""
+        now = time.time()
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                mtime = os.path.getmtime(path)
+                if now - mtime > self.max_age_s:
+                    os.remove(path)
+                else:
+                    entries.append((mtime, path))
+            except OSError:
+                continue
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        kept = {path for _, path in entries[max(0, len(entries) - self.max_entries):]}
+        with self._lock:
+            self._probes = {path: probe for path, probe in self._probes.items() if path in kept}
+
+
+def recognition_fingerprint() -> str:
+    """模型路径、识别参数和翻译模型版本的指纹，任一变化都会使识别缓存失效
+
+    翻译模型加载失败时对应方向记为 unavailable，未翻译的结果不会被当作译文结果命中。
+    """
+    fingerprint = {
+        "models": [args.asr_model, args.vad_model, args.punc_model, args.spk_model],
+        "params": RECOGNITION_PARAMS,
+        "vad": VAD_PARAMS,
+        "sentence_timestamp": args.sentence_timestamp,
+        "speaker_match_threshold": args.speaker_match_threshold,
+        "translation": sorted(f"{src}-{tgt}:{rev}" for (src, tgt), rev in translator.available_revisions().items()),
+    }
+    return hashlib.md5(json.dumps(fingerprint, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# 上传数据按块读取，避免整个文件进入内存
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# 识别缓存按上传开头这么多字节的MD5预判是否可能命中
+CACHE_PROBE_BYTES = 64 * 1024
+# 长音频分段时，在窗口末尾这段时间内寻找切点
+LONG_FORM_CUT_SEARCH_S = 10
+# 可以从管道直接解码的格式；m4a (MP4) 的索引可能位于文件末尾，需要完整文件才能解码
+STREAMABLE_FORMATS = {"wav", "mp3", "flac", "aac", "ogg"}
+
+
+class MultipartUploadStream:
+    """流式读取 multipart/form-data 请求中的单个文件字段
+
+    直接解析 request.stream()，数据到达即可读取，不会先把整个请求体缓存到
+    内存或临时文件。接口与 UploadFile 的 filename / read() 保持一致。
+    """
+
+    def __init__(self, request: Request, field_name: str, max_bytes: Optional[int] = None):
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise ValueError("Expected a multipart/form-data request")
+        self.field_name = field_name
+        self.filename = None
+        # 请求体大小（含multipart边界），作为文件大小的上限估计
+        content_length = request.headers.get("content-length", "")
+        self.size_hint = int(content_length) if content_length.isdigit() else None
+        # 没有 Content-Length 的分块上传在读取过程中检查大小
+        self.max_bytes = max_bytes
+        self._received = 0
+        self._body = request.stream().__aiter__()
+        self._chunks = deque()
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._in_field = False
+        self._found = False
+        self._field_done = False
+        self._eof = False
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if not self._found and options.get(b"name", b"").decode("utf-8", "replace") == self.field_name:
+            self._found = True
+            self._in_field = True
+            self.filename = options.get(b"filename", b"").decode("utf-8", "replace")
+
+    def _on_part_data(self, data, start, end):
+        if self._in_field:
+            self._chunks.append(bytes(data[start:end]))
+
+    def _on_part_end(self):
+        if self._in_field:
+            self._in_field = False
+            self._field_done = True
+
+    async def _pump(self):
+        """从请求体读取下一块数据送入解析器"""
+        try:
+            chunk = await self._body.__anext__()
+        except StopAsyncIteration:
+            self._parser.finalize()
+            self._eof = True
+            return
+        self._received += len(chunk)
+        if self.max_bytes and self._received > self.max_bytes:
+            raise HTTPException(status_code=413, detail=f"File too large, max {args.max_file_size_mb:g} MB")
+        self._parser.write(chunk)
+
+    async def open(self) -> Optional[str]:
+        """读取到目标字段的头部为止，返回文件名；请求中没有该字段时返回 None"""
+        while not self._found and not self._eof:
+            await self._pump()
+        return self.filename
+
+    async def read(self, size: int = -1) -> bytes:
+        """返回下一段文件数据（不超过 size 字节），读完时返回空字节串"""
+        while not self._chunks and not self._field_done and not self._eof:
+            await self._pump()
+        if not self._chunks:
+            return b""
+        chunk = self._chunks.popleft()
+        if 0 < size < len(chunk):
+            self._chunks.appendleft(chunk[size:])
+            chunk = chunk[:size]
+        return chunk
+
+
+class AudioDecodeError(RuntimeError):
+    """ffmpeg 解码失败"""
+
+
+class FFmpegProcess:
+    """由 FFmpegRunner 启动的ffmpeg进程，finished 在进程退出并释放名额后完成"""
+
+    def __init__(self, process, cmd: List[str]):
+        self.process = process
+        self.cmd = cmd
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self.timed_out = False
+        self.finished = None
+
+    def kill(self):
+        if self.process.returncode is None:
+            self.process.kill()
+
+
+class FFmpegRunner:
+    """所有ffmpeg子进程的统一入口
+
+    基于 asyncio.create_subprocess_exec，不阻塞事件循环；同时运行的进程数不超过
+    max_processes，超过 timeout_s（0 表示不限）的进程被强制终止，并统计每次解码耗时。
+    """
+
+    def __init__(self, max_processes: int, timeout_s: float):
+        self.max_processes = max_processes
+        self.timeout_s = timeout_s
+        self._slots = None
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.total_time = 0.0
+
+    async def spawn(self, args: List[str], stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE) -> FFmpegProcess:
+        """等待空闲名额后启动 ffmpeg，stderr 始终通过管道返回"""
+        if self._slots is None:
+            # 在事件循环内创建，兼容 Python 3.9 的 loop 绑定
+            self._slots = asyncio.Semaphore(self.max_processes)
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        cmd = ["ffmpeg", *args]
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdin=stdin, stdout=stdout, stderr=asyncio.subprocess.PIPE
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+        self.running += 1
+        ffmpeg_process = FFmpegProcess(process, cmd)
+        ffmpeg_process.finished = asyncio.ensure_future(self._reap(ffmpeg_process))
+        return ffmpeg_process
+
+    async def _reap(self, ffmpeg_process: FFmpegProcess):
+        """等待进程退出：超时则强制终止，退出后释放名额并记录耗时"""
+        watchdog = None
+        if self.timeout_s > 0:
+            watchdog = asyncio.get_running_loop().call_later(self.timeout_s, self._kill_runaway, ffmpeg_process)
+        try:
+            returncode = await ffmpeg_process.process.wait()
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+            ffmpeg_process.elapsed = time.perf_counter() - ffmpeg_process.started
+            self.running -= 1
+            self._slots.release()
+        self.total_time += ffmpeg_process.elapsed
+        if returncode == 0:
+            self.completed += 1
+        else:
+            self.failed += 1
+        logger.info(f"ffmpeg exited with code {returncode} after {ffmpeg_process.elapsed:.2f}s")
+
+    def _kill_runaway(self, ffmpeg_process: FFmpegProcess):
+        if ffmpeg_process.process.returncode is None:
+            logger.warning(f"Killing ffmpeg after {self.timeout_s}s: {' '.join(ffmpeg_process.cmd)}")
+            ffmpeg_process.timed_out = True
+            self.timed_out += 1
+            ffmpeg_process.kill()
+
+    async def run(self, args: List[str]) -> float:
+        """运行一次性的ffmpeg命令（输出写文件），失败时抛出 AudioDecodeError，返回耗时秒数"""
+        ffmpeg_process = await self.spawn(args, stdout=asyncio.subprocess.DEVNULL)
+        try:
+            _, stderr = await ffmpeg_process.process.communicate()
+            await ffmpeg_process.finished
+        except BaseException:
+            ffmpeg_process.kill()
+            raise
+        if ffmpeg_process.timed_out:
+            raise AudioDecodeError(f"ffmpeg timed out after {self.timeout_s}s")
+        if ffmpeg_process.process.returncode != 0:
+            raise AudioDecodeError(
+                f"ffmpeg exited with code {ffmpeg_process.process.returncode}: "
+                f"{stderr[-4096:].decode('utf-8', 'replace').strip()}"
+            )
+        return ffmpeg_process.elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "max_processes": self.max_processes,
+            "timeout_s": self.timeout_s,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "avg_decode_s": round(self.total_time / finished, 3) if finished else 0.0,
+        }
+
+
+class StreamingDecoder:
+    """ffmpeg 解码进程，把输入音频转为16kHz单声道s16le PCM
+
+    input_path 为 None 时从 stdin 读取，由 feed() 边接收上传边送入数据；
+    否则在 end_input() 时开始解码该文件。解码输出通过 read() 按需取出，
+    缓冲超过 max_buffered 字节时暂停读取ffmpeg输出，形成反压。
+    指定 archive_path 时同一进程同时输出128k MP3存档，不必再单独转码一次。
+    """
+
+    def __init__(self, input_path: Optional[str] = None, max_buffered: Optional[int] = None,
+                 archive_path: Optional[str] = None):
+        self.input_path = input_path
+        self.max_buffered = max_buffered
+        self.archive_path = archive_path
+        self.process = None
+        self._ffmpeg = None
+        self._buffer = bytearray()
+        self._stderr = b""
+        self._readers = []
+        self._stdin_broken = False
+        self._eof = False
+        self._error = None
+        self._started = asyncio.Event()
+        self._data_ready = asyncio.Event()
+        self._space_ready = asyncio.Event()
+
+    async def start(self):
+        """启动ffmpeg进程，并在后台读取其输出"""
+        cmd = []
+        if self.input_path is not None:
+            cmd.append("-nostdin")
+        cmd += [
+            "-threads", "0",
+            "-i", self.input_path or "pipe:0",
+            "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", "16000",
+            "pipe:1",
+        ]
+        if self.archive_path is not None:
+            cmd += ["-vn", "-acodec", "mp3", "-b:a", "128k", "-f", "mp3", "-y", self.archive_path]
+        self._ffmpeg = await ffmpeg_runner.spawn(
+            cmd, stdin=asyncio.subprocess.PIPE if self.input_path is None else asyncio.subprocess.DEVNULL
+        )
+        self.process = self._ffmpeg.process
+        stderr_reader = asyncio.ensure_future(self._read_stderr())
+        self._readers = [asyncio.ensure_future(self._read_stdout(stderr_reader)), stderr_reader]
+        self._started.set()
+
+    async def _read_stdout(self, stderr_reader):
+        while True:
+            while self.max_buffered is not None and len(self._buffer) >= self.max_buffered:
+                self._space_ready.clear()
+                await self._space_ready.wait()
+            chunk = await self.process.stdout.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            self._buffer += chunk
+            self._data_ready.set()
+        returncode = await self.process.wait()
+        await stderr_reader
+        if self._ffmpeg.timed_out and self._error is None:
+            self._error = AudioDecodeError(f"ffmpeg timed out after {ffmpeg_runner.timeout_s}s")
+        elif returncode != 0 and self._error is None:
+            self._error = AudioDecodeError(
+                f"ffmpeg exited with code {returncode}: {self._stderr.decode('utf-8', 'replace').strip()}"
+            )
+        self._eof = True
+        self._data_ready.set()
+
+    async def _read_stderr(self):
+        while True:
+            chunk = await self.process.stderr.read(4096)
+            if not chunk:
+                break
+            # 只保留最后一段错误输出用于报错
+            self._stderr = (self._stderr + chunk)[-4096:]
+
+    async def feed(self, chunk: bytes):
+        """把一块原始音频写入ffmpeg的stdin"""
+        if self._stdin_broken:
+            return
+        try:
+            self.process.stdin.write(chunk)
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg 已提前退出，错误在读取输出时统一报告
+            self._stdin_broken = True
+
+    async def end_input(self):
+        """输入结束：关闭stdin，文件输入则从此时开始解码"""
+        if self.process is None:
+            await self.start()
+        elif self.input_path is None and not self._stdin_broken:
+            try:
+                self.process.stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    @property
+    def exhausted(self) -> bool:
+        """解码已结束且缓冲区已读空"""
+        return self._eof and not self._buffer
+
+    @property
+    def decode_time(self) -> float:
+        """ffmpeg 进程运行时长（秒），未启动时为0"""
+        if self._ffmpeg is None:
+            return 0.0
+        return self._ffmpeg.elapsed if self._ffmpeg.elapsed is not None else time.perf_counter() - self._ffmpeg.started
+
+    @property
+    def succeeded(self) -> bool:
+        """ffmpeg 已正常退出（所有输出均已写完）"""
+        return self._eof and self._error is None and self.process is not None
+
+    async def read(self, size: int) -> bytes:
+        """读取至多 size 字节PCM，解码结束前会等到凑满 size 字节"""
+        await self._started.wait()
+        while len(self._buffer) < size and not self._eof:
+            self._data_ready.clear()
+            await self._data_ready.wait()
+        if self._error is not None:
+            raise self._error
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self._space_ready.set()
+        return data
+
+    async def read_all(self) -> bytes:
+        """读取剩余的全部PCM"""
+        chunks = []
+        while not self.exhausted:
+            chunks.append(await self.read(UPLOAD_CHUNK_SIZE))
+        return b"".join(chunks)
+
+    def abort(self, error: Optional[Exception] = None):
+        """终止解码进程并唤醒所有等待中的读取"""
+        for reader in self._readers:
+            reader.cancel()
+        if self._ffmpeg is not None:
+            self._ffmpeg.kill()
+        self._buffer = bytearray()
+        if not self._eof:
+            self._error = error or AudioDecodeError("Decoding aborted")
+            self._eof = True
+        self._started.set()
+        self._data_ready.set()
+        self._space_ready.set()
+
+
+class NativeDecoder:
+    """进程内解码的快速路径，接口与 StreamingDecoder 相同
+
+    上传完成后在线程池中解码：已是16kHz单声道16位的WAV直接取出数据区，其他PCM/浮点WAV
+    以及安装了 soundfile 时的 FLAC/OGG 解码后混为单声道并重采样到16kHz，省去启动
+    ffmpeg 进程的开销。无法处理的文件透明地回退到 ffmpeg。
+    """
+
+    archive_path = None
+
+    def __init__(self, input_path: str, suffix: str):
+        self.input_path = input_path
+        self.suffix = suffix
+        self._pcm = None
+        self._pos = 0
+        self._fallback = None
+        self._error = None
+        self._decode_time = 0.0
+        self._ready = asyncio.Event()
+
+    async def start(self):
+        started = time.perf_counter()
+        try:
+            pcm = await asyncio.get_running_loop().run_in_executor(None, decode_native, self.input_path, self.suffix)
+        except Exception as e:
+            logger.warning(f"Native decoding failed, falling back to ffmpeg: {e}")
+            pcm = None
+        self._decode_time = time.perf_counter() - started
+        if self._ready.is_set():
+            # 解码期间已被终止
+            return
+        if pcm is None:
+            self._fallback = StreamingDecoder(self.input_path)
+            await self._fallback.start()
+        else:
+            self._pcm = pcm
+        self._ready.set()
+
+    async def end_input(self):
+        """上传已写入 input_path，开始解码"""
+        await self.start()
+
+    @property
+    def exhausted(self) -> bool:
+        if self._fallback is not None:
+            return self._fallback.exhausted
+        return self._error is not None or (self._pcm is not None and self._pos >= len(self._pcm))
+
+    @property
+    def decode_time(self) -> float:
+        return self._decode_time + (self._fallback.decode_time if self._fallback is not None else 0.0)
+
+    @property
+    def succeeded(self) -> bool:
+        if self._fallback is not None:
+            return self._fallback.succeeded
+        return self._pcm is not None and self._error is None
+
+    async def read(self, size: int) -> bytes:
+        await self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        if self._fallback is not None:
+            return await self._fallback.read(size)
+        data = self._pcm[self._pos:self._pos + size]
+        self._pos += len(data)
+        return data
+
+    async def read_all(self) -> bytes:
+        await self._ready.wait()
+        if self._fallback is not None:
+            return await self._fallback.read_all()
+        return await self.read(len(self._pcm) - self._pos)
+
+    def abort(self, error: Optional[Exception] = None):
+        if self._fallback is not None:
+            self._fallback.abort(error)
+        elif self._pcm is None or self._pos < len(self._pcm):
+            self._error = self._error or error or AudioDecodeError("Decoding aborted")
+        if self._pcm is not None:
+            # 释放PCM缓冲区
+            self._pcm = b""
+            self._pos = 0
+        self._ready.set()
+
+
+async def encode_archive(input_path: str, output_path: str) -> float:
+    """把音频文件转码为128k MP3存档，返回转码耗时"""
+    return await ffmpeg_runner.run(
+        ["-nostdin", "-i", input_path, "-vn", "-acodec", "mp3", "-b:a", "128k", "-y", output_path]
+    )
+
+
+async def read_upload_head(audio, size: int) -> bytes:
+    """读取上传开头的 size 字节（文件更短时读到结尾）"""
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = await audio.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+async def ingest_upload(audio, audio_path: str, decoder: StreamingDecoder, head: bytes = b"",
+                        use_cache: bool = False) -> tuple:
+    """分块把上传写入磁盘并增量计算MD5，返回 (文件哈希, 缓存内容或 None)
+
+    head 为调用方已读取的上传开头。从stdin读取的解码器会同时收到每块数据，解码与上传
+    并行进行；文件输入的解码器在上传完成后先按哈希查询识别缓存，命中时不再解码。
+    写入失败时终止解码器，让等待PCM的一方立即得到错误。
+    """
+    streaming = decoder.input_path is None
+    md5 = hashlib.md5()
+    try:
+        if streaming:
+            await decoder.start()
+        async with aiofiles.open(audio_path, "wb") as out_file:
+            chunk = head
+            while chunk:
+                md5.update(chunk)
+                await out_file.write(chunk)
+                if streaming:
+                    await decoder.feed(chunk)
+                chunk = await audio.read(UPLOAD_CHUNK_SIZE)
+        audio_hash = md5.hexdigest()
+        cached = None
+        if use_cache:
+            cached = await asyncio.get_running_loop().run_in_executor(None, recognition_cache.get, audio_hash)
+        if cached is None or streaming:
+            await decoder.end_input()
+    except BaseException as e:
+        decoder.abort(AudioDecodeError(f"Upload failed: {e}"))
+        raise
+    return audio_hash, cached
+
+
+def find_quiet_cut(pcm, end: int, search_bytes: int) -> int:
+    """在 pcm[end - search_bytes:end] 内找能量最低的100ms帧，返回帧中点的字节偏移"""
+    start = max(0, end - search_bytes)
+    samples = np.frombuffer(bytes(pcm[start:end]), dtype=np.int16)
+    frame = PCM_BYTES_PER_SECOND // 10 // 2
+    frames = len(samples) // frame
+    if frames == 0:
+        return end
+    energy = np.square(samples[:frames * frame].astype(np.float32)).reshape(frames, frame).mean(axis=1)
+    return start + (int(np.argmin(energy)) * frame + frame // 2) * 2
+
+
+async def iter_pcm_windows(decoder: StreamingDecoder, head: bytes, window_bytes: int):
+    """把解码输出切成不超过 window_bytes 的片段，产出 (pcm, 起始偏移字节)
+
+    除最后一段外，切点选在窗口末尾 LONG_FORM_CUT_SEARCH_S 秒内最安静的位置，
+    尽量不切断语音；内存占用与窗口大小成正比，与音频总长无关。
+    """
+    pending = bytearray(head)
+    offset = 0
+    while True:
+        if len(pending) < window_bytes and not decoder.exhausted:
+            pending += await decoder.read(window_bytes - len(pending))
+        if not pending:
+            return
+        if decoder.exhausted and len(pending) <= window_bytes:
+            cut = len(pending)
+        else:
+            cut = find_quiet_cut(
+                pending, min(len(pending), window_bytes), int(LONG_FORM_CUT_SEARCH_S * PCM_BYTES_PER_SECOND)
+            )
+        chunk = bytes(pending[:cut])
+        del pending[:cut]
+        yield chunk, offset
+        offset += cut
+
+
+def shift_result(result: Dict[str, Any], offset_ms: int, duration_ms: int) -> List[Dict[str, Any]]:
+    """把分段识别结果的时间戳平移到整段音频上，返回分句信息"""
+    sentence_info = result.get("sentence_info", [])
+    if not sentence_info:
+        if not result.get("text", ""):
+            return []
+        # 模型不返回分句信息时，整段作为一句
+        return [{"text": result["text"], "start": offset_ms, "end": offset_ms + duration_ms}]
+    for sentence in sentence_info:
+        sentence["start"] = sentence.get("start", 0) + offset_ms
+        sentence["end"] = sentence.get("end", 0) + offset_ms
+        if "timestamp" in sentence:
+            sentence["timestamp"] = [[start + offset_ms, end + offset_ms] for start, end in sentence["timestamp"]]
+    return sentence_info
+
+
+def join_texts(texts: List[str]) -> str:
+    """拼接分段文本，英文片段之间补空格"""
+    joined = ""
+    for text in texts:
+        if joined and text and joined[-1].isascii() and text[0].isascii():
+            joined += " "
+        joined += text
+    return joined
+
+
+# 正在补算的峰值文件 -> 计算任务，同一文件的并发请求共用一次计算
+peaks_computations: Dict[str, asyncio.Future] = {}
+
+
+def ensure_peaks_file(audio_path: str, peaks_path: str) -> asyncio.Future:
+    """返回补算 peaks_path 的任务，已有同一文件的计算在进行时直接复用"""
+    task = peaks_computations.get(peaks_path)
+    if task is None:
+        task = asyncio.ensure_future(compute_peaks_file(audio_path, peaks_path))
+        peaks_computations[peaks_path] = task
+        task.add_done_callback(lambda _: peaks_computations.pop(peaks_path, None))
+    return task
+
+
+async def compute_peaks_file(audio_path: str, peaks_path: str):
+    """解码已保存的音频并生成峰值文件（识别时未生成峰值的结果按需补算）"""
+    peaks = WaveformPeaks()
+    decoder = StreamingDecoder(audio_path, max_buffered=8 * UPLOAD_CHUNK_SIZE)
+    try:
+        await decoder.start()
+        while not decoder.exhausted:
+            peaks.feed(await decoder.read(UPLOAD_CHUNK_SIZE))
+    finally:
+        decoder.abort()
+    await write_peaks_file(peaks_path, peaks)
+
+
+async def write_peaks_file(peaks_path: str, peaks: WaveformPeaks):
+    """原子地写入峰值文件"""
+    tmp_path = f"{peaks_path}.{uuid.uuid4().hex}.tmp"
+    async with aiofiles.open(tmp_path, "wb") as f:
+        await f.write(peaks.to_bytes())
+    os.replace(tmp_path, peaks_path)
+
+
+# 流式识别保留的历史音频时长（秒）
+STREAMING_HISTORY_S = 3
+# 流式会话离线识别语音段时等待准入名额的最长时间（秒），超时则放弃该段的离线结果
+STREAMING_ADMISSION_TIMEOUT_S = 5
+STREAMING_ADMISSION_RETRY_S = 0.1
+
+
+def recognize_streaming_segment(pcm: bytes, model) -> tuple:
+    """离线识别流式会话中的一个语音段并翻译，返回 (文本, 译文)，没有文本时译文为 None"""
+    rec_results = run_asr(pcm, model)
+    text = rec_results[0].get("text", "") if rec_results else ""
+    if not text:
+        return text, None
+    return text, translate_sentences([text])[0]
+
+
+class StreamingASRSession:
+    """单个 /ws/asr 连接的流式识别状态
+
+    按 FunASR 的 2pass 方案：online 模型每凑满一个 chunk 就输出部分结果，
+    流式VAD检测到语音段结束时，用离线模型（含标点）对整段重新识别并翻译，
+    作为该段的最终结果。mode 为 "online" 只输出部分结果，"offline" 只输出最终结果。
+    """
+
+    def __init__(self, websocket: WebSocket, mode: str = "2pass", chunk_size: List[int] = None):
+        self.websocket = websocket
+        self.vad_model = model_registry.get("streaming_vad")
+        self.asr_model = model_registry.get("streaming_asr")
+        if self.asr_model is None:
+            mode = "offline"
+        self.mode = mode
+        chunk_size = list(chunk_size or [0, 10, 5])
+        # chunk_size[1] 个 60ms 帧为一个 online 识别单元
+        self.chunk_bytes = chunk_size[1] * 60 * PCM_BYTES_PER_SECOND // 1000
+        self.asr_status = {
+            "cache": {},
+            "is_final": False,
+            "chunk_size": chunk_size,
+            "encoder_chunk_look_back": 4,
+            "decoder_chunk_look_back": 1,
+        }
+        self.vad_status = {"cache": {}, "is_final": False}
+        self.frames = deque()
+        self.frames_bytes = 0
+        self.frames_asr = []
+        self.online_buffer = bytearray()
+        self.speech_start = False
+        self.received_ms = 0
+        self.segment_start_ms = 0
+
+    async def _generate(self, model_to_run, audio_in, status: Dict[str, Any]):
+        rec_results, _, _ = await streaming_executor.run(model_to_run.generate, input=audio_in, **status)
+        return rec_results
+
+    async def _detect_speech(self, audio_in: bytes):
+        """流式VAD，返回本块中检测到的 (语音起点ms, 语音终点ms)，未检测到为 -1"""
+        rec_results = await self._generate(self.vad_model, audio_in, self.vad_status)
+        segments = rec_results[0]["value"] if rec_results else []
+        if len(segments) != 1:
+            return -1, -1
+        return segments[0][0], segments[0][1]
+
+    async def _recognize_online(self, audio_in: bytes, is_final: bool = False):
+        self.asr_status["is_final"] = is_final
+        rec_results = await self._generate(self.asr_model, audio_in, self.asr_status)
+        # 2pass 模式下段尾的 online 结果会被离线结果替换，不再发送
+        if self.mode == "2pass" and is_final:
+            return
+        text = rec_results[0].get("text", "") if rec_results else ""
+        if text:
+            await self.websocket.send_json({
+                "type": "partial",
+                "mode": f"{self.mode}-online" if self.mode == "2pass" else "online",
+                "text": text,
+                "is_final": is_final,
+            })
+
+    async def _recognize_segment(self, end_ms: int):
+        """离线识别整个语音段并发送最终结果
+
+        与 /api/recognize 共用 model_pool 的准入名额；名额已满时最多等待
+        STREAMING_ADMISSION_TIMEOUT_S 秒，仍拿不到则放弃该段并通知客户端。
+        """
+        audio_in = b"".join(self.frames_asr)
+        if not audio_in:
+            return
+        deadline = time.perf_counter() + STREAMING_ADMISSION_TIMEOUT_S
+        while not model_pool.admission.try_acquire():
+            if time.perf_counter() >= deadline:
+                logger.warning("Inference queue is full, skipping offline recognition of a streaming segment")
+                await self.websocket.send_json(
+                    {"type": "error", "detail": "Server busy, a speech segment was not recognized"}
+                )
+                return
+            await asyncio.sleep(STREAMING_ADMISSION_RETRY_S)
+        try:
+            (text, translation), _, _ = await model_pool.run(recognize_streaming_segment, audio_in)
+        finally:
+            model_pool.admission.release()
+        if not text:
+            return
+        await self.websocket.send_json({
+            "type": "final",
+            "mode": "2pass-offline" if self.mode == "2pass" else "offline",
+            "text": text,
+            "start": round(self.segment_start_ms / 1000, 2),
+            "end": round(end_ms / 1000, 2),
+            "translation": translation,
+        })
+
+    def _reset_segment(self):
+        self.frames_asr = []
+        self.speech_start = False
+        self.online_buffer = bytearray()
+        self.asr_status["cache"] = {}
+
+    async def feed(self, message: bytes):
+        """处理一块16kHz单声道s16le PCM"""
+        self.frames.append(message)
+        self.frames_bytes += len(message)
+        self.received_ms += len(message) * 1000 // PCM_BYTES_PER_SECOND
+
+        if self.mode != "offline":
+            self.online_buffer += message
+            while len(self.online_buffer) >= self.chunk_bytes:
+                chunk = bytes(self.online_buffer[:self.chunk_bytes])
+                del self.online_buffer[:self.chunk_bytes]
+                await self._recognize_online(chunk)
+
+        if self.speech_start:
+            self.frames_asr.append(message)
+
+        speech_start_ms, speech_end_ms = await self._detect_speech(message)
+        if speech_start_ms != -1:
+            # 从历史帧中回溯到VAD给出的语音起点
+            self.speech_start = True
+            self.segment_start_ms = speech_start_ms
+            frames_asr = []
+            covered_ms = 0
+            for frame in reversed(self.frames):
+                if covered_ms >= self.received_ms - speech_start_ms:
+                    break
+                frames_asr.insert(0, frame)
+                covered_ms += len(frame) * 1000 // PCM_BYTES_PER_SECOND
+            self.frames_asr = frames_asr
+
+        if speech_end_ms != -1:
+            if self.mode != "offline":
+                await self._recognize_online(bytes(self.online_buffer), is_final=True)
+            if self.mode != "online":
+                await self._recognize_segment(speech_end_ms)
+            self._reset_segment()
+
+        # 只保留最近几秒的音频，足够回溯VAD延迟给出的语音起点
+        while len(self.frames) > 1 and self.frames_bytes > STREAMING_HISTORY_S * PCM_BYTES_PER_SECOND:
+            self.frames_bytes -= len(self.frames.popleft())
+
+    async def finish(self):
+        """客户端停止说话：识别未结束的语音段并重置状态"""
+        if self.speech_start:
+            if self.mode != "offline":
+                await self._recognize_online(bytes(self.online_buffer), is_final=True)
+            if self.mode != "online":
+                await self._recognize_segment(self.received_ms)
+        self._reset_segment()
+        self.frames.clear()
+        self.frames_bytes = 0
+        self.received_ms = 0
+        self.vad_status["cache"] = {}
+
+
 app = FastAPI(title="AstroMao - 离线语音识别Web应用")
+SERVICE_STARTED_AT = time.time()
+
+class RequestSizeLimit:
+    """ASGI中间件：Content-Length 超过上限的请求直接返回413，不读取请求体"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and max_upload_bytes:
+            for name, value in scope["headers"]:
+                if name == b"content-length" and value.isdigit() and int(value) > max_upload_bytes:
+                    response = JSONResponse(
+                        status_code=413, content={"detail": f"File too large, max {args.max_file_size_mb:g} MB"}
+                    )
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(RequestSizeLimit)
 
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", StaticFiles(directory="static", check_dir=False), name="static")
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -294,12 +2467,8 @@ async def convert_audio_to_mp3(audio: UploadFile = File(..., description="Audio
         # Convert to MP3 using ffmpeg
         if suffix != "mp3":
             logger.info(f"Converting {audio.filename} from {suffix} to MP3")
-            (
-                ffmpeg.input(input_path)
-                .output(output_path, acodec='mp3', audio_bitrate='128k')
-                .overwrite_output()
-                .run(cmd=["ffmpeg", "-nostdin"], capture_stdout=True, capture_stderr=True)
-            )
+            elapsed = await encode_archive(input_path, output_path)
+            logger.info(f"Converted {audio.filename} in {elapsed:.2f}s")
             
             # Clean up original file
             if os.path.exists(input_path):
@@ -325,170 +2494,1040 @@ async def convert_audio_to_mp3(audio: UploadFile = File(..., description="Audio
         raise HTTPException(status_code=500, detail=f"Failed to convert audio file: {str(e)}")
 
 
-@app.post("/api/recognize")
-async def recognize_audio(audio: UploadFile = File(..., description="Audio file for recognition")):
-    """音频识别API"""
-    if not audio.filename:
+async def open_audio_upload(request: Request):
+    """开始流式读取请求中的 audio 文件字段，校验文件名和格式，返回 (上传流, 扩展名)"""
+    try:
+        audio = MultipartUploadStream(request, "audio", max_upload_bytes)
+        filename = await audio.open()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not filename:
         raise HTTPException(status_code=400, detail="No file uploaded")
     
     # Check file format
     allowed_formats = ["wav", "mp3", "m4a", "flac", "aac", "ogg"]
-    suffix = audio.filename.split(".")[-1].lower()
+    suffix = filename.split(".")[-1].lower()
     if suffix not in allowed_formats:
         raise HTTPException(
             status_code=400, 
             detail=f"Unsupported file format. Supported formats: {', '.join(allowed_formats)}"
         )
-    
-    # Save uploaded file
-    audio_path = f"{args.temp_dir}/{str(uuid.uuid1())}.{suffix}"
+    return audio, suffix
+
+
+def require_models_ready():
+    """识别模型尚未加载完成时返回503"""
+    if not model_registry.ready:
+        raise HTTPException(
+            status_code=503, detail="Models are still loading, please retry later", headers={"Retry-After": "5"}
+        )
+
+
+@app.post("/api/recognize")
+async def recognize_audio(request: Request, nocache: bool = False, long_form: Optional[bool] = None,
+                          archive: bool = False):
+    """音频识别API（multipart字段 audio）
+
+    请求体按流读取：文件边上传边写盘、计算哈希并送入ffmpeg解码。
+    nocache=1 跳过识别结果缓存；long_form=1/0 强制开启/关闭长音频分段识别，
+    不指定时按音频时长自动选择；archive=1 同时保存MP3存档到结果目录。
+    """
+    require_models_ready()
+    audio, suffix = await open_audio_upload(request)
     try:
-        async with aiofiles.open(audio_path, "wb") as out_file:
-            content = await audio.read()
-            await out_file.write(content)
-    except Exception as e:
-        logger.error(f"Failed to save audio file: {e}")
-        raise HTTPException(status_code=500, detail="Failed to save audio file")
-    
+        with model_pool.admit():
+            response = None
+            async for event in recognition_events(audio, suffix, nocache, long_form, archive=archive):
+                if event["type"] == "done":
+                    response = event["result"]
+            return response
+    except QueueFullError as e:
+        logger.warning(f"Rejecting recognition request: {e}")
+        raise HTTPException(status_code=503, detail="Server busy, please retry later")
+
+
+@app.post("/api/recognize/stream")
+async def recognize_audio_stream(request: Request, nocache: bool = False, long_form: Optional[bool] = True,
+                                 archive: bool = False):
+    """流式音频识别API，以NDJSON逐行返回事件
+
+    默认按 --stream_window_s 分段识别，每段识别并翻译完成后立即返回
+    {"type": "sentences", ...}；最后返回 {"type": "done", "result": 完整结果}，
+    出错时返回 {"type": "error", "detail": ...}。archive 同 /api/recognize。
+    """
+    require_models_ready()
+    audio, suffix = await open_audio_upload(request)
+    slot = contextlib.ExitStack()
     try:
-        # Calculate audio file hash
-        with open(audio_path, 'rb') as f:
-            audio_hash = hashlib.md5(f.read()).hexdigest()
-        
-        # Convert audio to required format
-        audio_bytes, _ = (
-            ffmpeg.input(audio_path, threads=0)
-            .output("-", format="s16le", acodec="pcm_s16le", ac=1, ar=16000)
-            .run(cmd=["ffmpeg", "-nostdin"], capture_stdout=True, capture_stderr=True)
+        slot.enter_context(model_pool.admit())
+    except QueueFullError as e:
+        logger.warning(f"Rejecting recognition request: {e}")
+        raise HTTPException(status_code=503, detail="Server busy, please retry later")
+    
+    async def event_lines():
+        events = recognition_events(audio, suffix, nocache, long_form, args.stream_window_s, archive)
+        try:
+            async for event in events:
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except HTTPException as e:
+            yield json.dumps({"type": "error", "detail": e.detail}, ensure_ascii=False) + "\n"
+        finally:
+            await events.aclose()
+            slot.close()
+    
+    return StreamingResponse(event_lines(), media_type="application/x-ndjson")
+
+
+def build_response(text: str, sentences: List[Dict[str, Any]], speakers, audio_hash: str,
+                   filename: str, timing: Dict[str, Any], cached: bool = False) -> Dict[str, Any]:
+    """组装识别API的返回结果"""
+    if not sentences:
+        return {
+            "success": True,
+            "text": "",
+            "sentences": [],
+            "speakers": [],
+            "timing": timing,
+            "cached": cached,
+            "message": "No speech detected"
+        }
+    
+    return {
+        "success": True,
+        "result_id": str(uuid.uuid4()),
+        "text": text,
+        "sentences": sentences,
+        "speakers": list(speakers),
+        "total_duration": round(max([s["end"] for s in sentences], default=0), 2),
+        "audio_hash": audio_hash,
+        "filename": filename,
+        "timestamp": datetime.datetime.now().isoformat(),
+        "timing": timing,
+        "cached": cached,
+        "message": "Recognition completed successfully"
+    }
+
+
+async def recognition_events(audio, suffix: str, nocache: bool = False, long_form: Optional[bool] = None,
+                             window_s: Optional[float] = None, archive: bool = False):
+    """保存、解码并识别上传的音频，随识别进度逐步产出事件（需已获得准入名额）
+
+    long_form 为 None 时，解码长度超过 --long_form_threshold_s 才分段识别；
+    True 始终按 window_s（默认 --long_form_window_s）分段识别，False 始终整段识别。
+    每段识别并翻译后产出 {"type": "sentences", ...}，最后产出
+    {"type": "done", "result": 完整结果}。
+    archive 为 True 时把MP3存档保存为 results/{result_id}_audio.mp3 并写入结果的
+    audio_path：MP3上传直接保留原文件，其他格式由解码的同一个ffmpeg进程同时输出。
+    """
+    file_id = str(uuid.uuid1())
+    audio_path = f"{args.temp_dir}/{file_id}.{suffix}"
+    archive_path = f"{args.temp_dir}/{file_id}.archive.mp3" if archive and suffix != "mp3" else None
+    window_bytes = int((window_s or args.long_form_window_s) * PCM_BYTES_PER_SECOND)
+    if long_form is None:
+        head_bytes = int(args.long_form_threshold_s * PCM_BYTES_PER_SECOND)
+    else:
+        head_bytes = 0 if long_form else None
+    use_cache = recognition_cache is not None and not nocache
+    upload_head = await read_upload_head(audio, CACHE_PROBE_BYTES)
+    probe = hashlib.md5(upload_head).hexdigest()
+    size_hint = getattr(audio, "size_hint", None)
+    if (archive_path is None and suffix in NATIVE_DECODE_FORMATS and size_hint is not None
+            and size_hint <= args.native_decode_max_mb * 1024 * 1024):
+        # 小文件在进程内解码，省去启动ffmpeg的开销
+        decoder = NativeDecoder(audio_path, suffix)
+    else:
+        # 开头与缓存条目相同时可能命中，先等上传完成按完整哈希查询，命中则不启动ffmpeg
+        stream_input = suffix in STREAMABLE_FORMATS and not (use_cache and recognition_cache.may_contain(probe))
+        decoder = StreamingDecoder(
+            None if stream_input else audio_path,
+            max_buffered=None if head_bytes is None else max(window_bytes, head_bytes),
+            archive_path=archive_path,
         )
-    except Exception as e:
-        logger.error(f"Failed to process audio file: {e}")
-        # Clean up
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
-        raise HTTPException(status_code=500, detail="Failed to process audio file")
+    # Stream the upload to disk, hashing and decoding it on the fly
+    ingest = asyncio.ensure_future(ingest_upload(audio, audio_path, decoder, upload_head, use_cache))
+    cache_checked = not use_cache
+    # 解码出的PCM顺带计算波形峰值，保存存档音频时一并保存为 results/{result_id}_peaks.bin
+    peaks = WaveformPeaks()
+    # 分段识别时跨段统一说话人编号
+    speakers_tracker = SpeakerTracker(args.speaker_match_threshold)
+    texts = []
+    sentences = []
+    speakers = set()
+    queue_wait = compute = 0.0
+    chunks = 0
+    
+    def lookup_cache():
+        """上传完成后取一次 ingest_upload 的缓存查询结果，命中时返回缓存内容"""
+        nonlocal cache_checked
+        if cache_checked or not ingest.done():
+            return None
+        cache_checked = True
+        return ingest.result()[1]
+    
+    async def attach_archive(response: Dict[str, Any]) -> bool:
+        """把MP3存档保存到结果目录，成功返回 True"""
+        result_id = response.get("result_id")
+        if not archive or not result_id:
+            return False
+        audio_filename = f"{result_id}_audio.mp3"
+        try:
+            if archive_path is None:
+                os.replace(audio_path, f"results/{audio_filename}")
+            elif decoder.succeeded:
+                os.replace(archive_path, f"results/{audio_filename}")
+            else:
+                # 缓存命中时解码未完成，先结束解码进程释放名额，再单独转码
+                decoder.abort()
+                await encode_archive(audio_path, f"results/{audio_filename}")
+        except Exception as e:
+            logger.warning(f"Failed to save archived audio for {result_id}: {e}")
+            return False
+        response["audio_path"] = audio_filename
+        return True
     
-    try:
-        # Perform recognition
-        param_dict = {
-            "batch_size_s": 300,
-            "merge_vad": True,
-            "merge_length_s": 15,
+    async def recognize_window(pcm: bytes, offset: Optional[int] = None):
+        """识别并翻译一段PCM，offset 为该段在整段音频中的字节偏移（整段识别时为 None）"""
+        nonlocal queue_wait, compute, chunks
+        peaks.feed(pcm)
+        built, chunk_wait, chunk_compute = await model_pool.run(recognize_pcm, pcm, offset,
+                                                                speakers_tracker if offset is not None else None)
+        queue_wait += chunk_wait
+        compute += chunk_compute
+        chunks += 1
+        if built is None:
+            return None
+        text, window_sentences, window_speakers = built
+        texts.append(text)
+        sentences.extend(window_sentences)
+        speakers.update(window_speakers)
+        return {
+            "type": "sentences",
+            "sentences": window_sentences,
+            "speakers": list(window_speakers),
+            "processed_s": round(((offset or 0) + len(pcm)) / PCM_BYTES_PER_SECOND, 2),
         }
+    
+    try:
+        if decoder.input_path is not None:
+            # 需要完整文件才能解码的格式，先等上传完成，缓存命中则无需解码
+            await ingest
+        cached = lookup_cache()
         
-        # Add timestamp parameter only if model supports it
-        try:
-            param_dict["sentence_timestamp"] = True
-            rec_results = model.generate(input=audio_bytes, is_final=True, **param_dict)
-        except Exception as timestamp_error:
-            logger.warning(f"Timestamp not supported, falling back: {timestamp_error}")
-            # Retry without timestamp
-            param_dict.pop("sentence_timestamp", None)
-            rec_results = model.generate(input=audio_bytes, is_final=True, **param_dict)
-        
-        # Clean up temporary file
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
-        
-        # Process results
-        if len(rec_results) == 0:
-            return {
-                "success": True,
-                "text": "",
-                "sentences": [],
-                "speakers": [],
-                "message": "No speech detected"
-            }
+        if cached is None:
+            # 整段识别或先缓冲到阈值长度再判断
+            head = await (decoder.read_all() if head_bytes is None else decoder.read(head_bytes))
+            cached = lookup_cache()
         
-        result = rec_results[0]
-        text = result.get("text", "")
-        sentences = []
-        speakers = set()
-        
-        # Process sentence information
-        sentence_info = result.get("sentence_info", [])
-        if sentence_info:
-            # Model supports detailed sentence info
-            for i, sentence in enumerate(sentence_info):
-                sentence_text = sentence.get("text", "")
-                start_time = sentence.get("start", 0) / 1000  # Convert to seconds
-                end_time = sentence.get("end", 0) / 1000
-                
-                # Extract speaker information if available
-                speaker_id = sentence.get("spk", f"Speaker_{i % 2 + 1}")
-                speakers.add(speaker_id)
-                
-                # 翻译句子
-                translation_zh = translate_text(sentence_text, 'zh')
-                translation_en = translate_text(sentence_text, 'en')
-                
-                sentences.append({
-                    "text": sentence_text,
-                    "start": round(start_time, 2),
-                    "end": round(end_time, 2),
-                    "speaker": speaker_id,
-                    "translation": {
-                        "zh": translation_zh["translated"],
-                        "en": translation_en["translated"],
-                        "source_lang": translation_zh["source_lang"]
-                    }
-                })
-        else:
-            # Fallback: create single sentence from full text
-            translation_zh = translate_text(text, 'zh')
-            translation_en = translate_text(text, 'en')
-            
-            sentences.append({
-                "text": text,
-                "start": 0.0,
-                "end": 0.0,
-                "speaker": "Speaker_1",
-                "translation": {
-                    "zh": translation_zh["translated"],
-                    "en": translation_en["translated"],
-                    "source_lang": translation_zh["source_lang"]
-                }
-            })
-            speakers.add("Speaker_1")
+        if cached is None and decoder.exhausted:
+            event = await recognize_window(head)
+            if event is not None:
+                yield event
+        elif cached is None:
+            # Long-form: recognize window by window and stitch timestamps
+            async for chunk, offset in iter_pcm_windows(decoder, head, window_bytes):
+                event = await recognize_window(chunk, offset)
+                if event is not None:
+                    yield event
+                cached = lookup_cache()
+                if cached is not None:
+                    break
+            logger.info(f"Long-form recognition: {chunks} windows")
         
-        # Generate unique result ID
-        result_id = str(uuid.uuid4())
-        timestamp = datetime.datetime.now().isoformat()
+        audio_hash, _ = await ingest
+        if cached is not None:
+            logger.info(f"Recognition cache hit: {audio_hash}")
+            response = build_response(
+                cached["text"], cached["sentences"], cached["speakers"], audio_hash, audio.filename,
+                {"queue_wait_s": 0.0, "compute_s": 0.0, "decode_s": round(decoder.decode_time, 3),
+                 "chunks": 0}, cached=True,
+            )
+            await attach_archive(response)
+            yield {"type": "done", "result": response}
+            return
         
-        response = {
-            "success": True,
-            "result_id": result_id,
-            "text": text,
-            "sentences": sentences,
-            "speakers": list(speakers),
-            "total_duration": round(max([s["end"] for s in sentences], default=0), 2),
-            "audio_hash": audio_hash,
-            "filename": audio.filename,
-            "timestamp": timestamp,
-            "message": "Recognition completed successfully"
+        text = join_texts(texts)
+        timing = {
+            "queue_wait_s": round(queue_wait, 3),
+            "compute_s": round(compute, 3),
+            "decode_s": round(decoder.decode_time, 3),
+            "chunks": chunks,
         }
         
-        logger.info(f"Recognition result: {len(sentences)} sentences, {len(speakers)} speakers")
-        return response
+        if recognition_cache is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, recognition_cache.put, audio_hash,
+                {"text": text, "sentences": sentences, "speakers": list(speakers)}, probe,
+            )
         
+        logger.info(
+            f"Recognition result: {len(sentences)} sentences, {len(speakers)} speakers "
+            f"(queue wait {queue_wait:.2f}s, compute {compute:.2f}s, decode {decoder.decode_time:.2f}s)"
+        )
+        response = build_response(text, sentences, speakers, audio_hash, audio.filename, timing)
+        if await attach_archive(response):
+            try:
+                await write_peaks_file(f"results/{response['result_id']}_peaks.bin", peaks)
+            except Exception as e:
+                logger.warning(f"Failed to save waveform peaks: {e}")
+        yield {"type": "done", "result": response}
+    
+    except AudioDecodeError as e:
+        if ingest.done() and not ingest.cancelled() and ingest.exception() is not None:
+            if isinstance(ingest.exception(), HTTPException):
+                raise ingest.exception()
+            logger.error(f"Failed to save audio file: {ingest.exception()}")
+            raise HTTPException(status_code=500, detail="Failed to save audio file")
+        logger.error(f"Failed to process audio file: {e}")
+        raise HTTPException(status_code=500, detail="Failed to process audio file")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Recognition failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Recognition failed: {str(e)}")
+    finally:
         # Clean up
+        decoder.abort()
+        if not ingest.done():
+            ingest.cancel()
+        for path in (audio_path, archive_path):
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+        if args.clear_cache_after_request:
+            release_memory()
+
+
+def release_memory():
+    """释放识别过程中的临时内存：回收Python对象，使用GPU时清空CUDA缓存"""
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+JOB_STATUSES = ("queued", "running", "done", "failed", "cancelled")
+# 多进程部署时后台任务进程检查队列和取消请求的间隔（秒）
+JOB_POLL_INTERVAL_S = 2.0
+# 识别准入名额已满时后台任务等待重试的间隔（秒）
+JOB_ADMISSION_RETRY_S = 0.5
+
+
+class JobStore:
+    """识别任务队列的SQLite持久化存储
+
+    任务按 priority 降序、提交时间升序出队；服务重启时仍处于 running 的任务重新排队。
+    运行中的任务由执行它的进程负责中断，其他进程收到取消请求时只设置 cancel_requested，
+    由执行进程定期检查。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, priority INTEGER NOT NULL, "
+            "filename TEXT NOT NULL, audio_path TEXT NOT NULL, file_size INTEGER NOT NULL, "
+            "options TEXT NOT NULL, created_at TEXT NOT NULL, started_at TEXT, finished_at TEXT, "
+            "processed_s REAL NOT NULL DEFAULT 0, sentences_count INTEGER NOT NULL DEFAULT 0, "
+            "result_id TEXT, error TEXT, cancel_requested INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "cancel_requested" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, created_at)")
+        self._db.commit()
+
+    def reopen(self):
+        """fork 后在子进程中重新打开数据库连接"""
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            self._db.commit()
+            return cursor
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["options"] = json.loads(job["options"])
+        return job
+
+    def create(self, job_id: str, filename: str, audio_path: str, file_size: int,
+               priority: int, options: Dict[str, Any]):
+        self._execute(
+            "INSERT INTO jobs (job_id, status, priority, filename, audio_path, file_size, options, created_at) "
+            "VALUES (?, 'queued', ?, ?, ?, ?, ?, ?)",
+            (job_id, priority, filename, audio_path, file_size, json.dumps(options),
+             datetime.datetime.now().isoformat()),
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        sql = "SELECT * FROM jobs"
+        params = ()
+        if status:
+            sql += " WHERE status = ?"
+            params = (status,)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(sql, params + (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def queue_position(self, job: Dict[str, Any]) -> int:
+        """返回排在该任务之前的排队任务数"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND "
+                "(priority > ? OR (priority = ? AND created_at < ?))",
+                (job["priority"], job["priority"], job["created_at"]),
+            ).fetchone()[0]
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """取出优先级最高的排队任务并标记为 running"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY priority DESC, created_at ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            started_at = datetime.datetime.now().isoformat()
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE job_id = ?",
+                (started_at, row["job_id"]),
+            )
+            self._db.commit()
+        job = self._to_dict(row)
+        job.update(status="running", started_at=started_at)
+        return job
+
+    def update_progress(self, job_id: str, processed_s: float, sentences_count: int):
+        self._execute(
+            "UPDATE jobs SET processed_s = ?, sentences_count = ? WHERE job_id = ?",
+            (processed_s, sentences_count, job_id),
+        )
+
+    def finish(self, job_id: str, status: str, result_id: Optional[str] = None, error: Optional[str] = None):
+        self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, result_id = ?, error = ? WHERE job_id = ?",
+            (status, datetime.datetime.now().isoformat(), result_id, error, job_id),
+        )
+
+    def cancel_queued(self, job_id: str) -> bool:
+        """取消仍在排队的任务，成功返回 True"""
+        cursor = self._execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status = 'queued'",
+            (datetime.datetime.now().isoformat(), job_id),
+        )
+        return cursor.rowcount > 0
+
+    def request_cancel(self, job_id: str) -> bool:
+        """标记运行中的任务待取消，由执行它的进程中断，成功返回 True"""
+        cursor = self._execute(
+            "UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status = 'running'", (job_id,)
+        )
+        return cursor.rowcount > 0
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def requeue_running(self) -> int:
+        """把上次退出时仍在运行的任务重新排队（已请求取消的直接标记取消），返回重新排队的任务数"""
+        self._execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE status = 'running' AND cancel_requested = 1",
+            (datetime.datetime.now().isoformat(),),
+        )
+        cursor = self._execute(
+            "UPDATE jobs SET status = 'queued', started_at = NULL, processed_s = 0, sentences_count = 0 "
+            "WHERE status = 'running'"
+        )
+        return cursor.rowcount
+
+
+class StoredAudioFile:
+    """以 filename / read() 接口读取已落盘的音频，供 recognition_events 复用"""
+
+    def __init__(self, path: str, filename: str):
+        self.path = path
+        self.filename = filename
+        self.size_hint = os.path.getsize(path)
+        self._file = None
+
+    async def read(self, size: int = -1) -> bytes:
+        if self._file is None:
+            self._file = await aiofiles.open(self.path, "rb")
+        chunk = await self._file.read(size)
+        if not chunk:
+            await self.close()
+        return chunk
+
+    async def close(self):
+        if self._file is not None:
+            await self._file.close()
+            self._file = None
+
+
+class JobRunner:
+    """后台执行识别任务：按优先级出队，逐段更新进度，完成后写入 results/{result_id}.json"""
+
+    def __init__(self, store: JobStore, workers: int, poll_interval_s: Optional[float] = None):
+        self.store = store
+        self.workers = workers
+        # 多进程部署时任务可能由其他进程提交，notify() 唤醒不到，需要定期检查队列
+        self.poll_interval_s = poll_interval_s
+        self._wakeup = None
+        self._tasks = []
+        self._running = {}
+        self._stopping = False
+
+    def start(self):
+        requeued = self.store.requeue_running()
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted jobs")
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def notify(self):
+        """有新任务入队时唤醒空闲的工作协程"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def cancel(self, job_id: str) -> bool:
+        """取消任务：排队中直接标记取消，运行中则中断识别，返回是否取消成功
+
+        任务在其他进程中运行时只记录取消请求，由该进程的 _worker 检查后中断。
+        """
+        if self.store.cancel_queued(job_id):
+            job = self.store.get(job_id)
+            if os.path.exists(job["audio_path"]):
+                os.remove(job["audio_path"])
+            return True
+        task = self._running.get(job_id)
+        if task is None:
+            return self.store.request_cancel(job_id)
+        task.cancel()
+        return True
+
+    async def _worker(self):
+        while True:
+            # 后台任务与在线识别请求共用 model_pool 的准入名额，名额已满时等待
+            if not model_pool.admission.try_acquire():
+                await asyncio.sleep(JOB_ADMISSION_RETRY_S)
+                continue
+            job = None
+            try:
+                job = self.store.claim_next()
+                if job is not None:
+                    await self._supervise(job)
+            finally:
+                model_pool.admission.release()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _supervise(self, job: Dict[str, Any]):
+        """执行任务直到结束；多进程部署时定期检查其他进程写入的取消请求"""
+        job_id = job["job_id"]
+        task = asyncio.ensure_future(self._run(job))
+        self._running[job_id] = task
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=self.poll_interval_s)
+                if not task.done() and self.store.cancel_requested(job_id):
+                    task.cancel()
+        except asyncio.CancelledError:
+            if not task.done():
+                # 工作协程本身被取消（服务关闭），中断任务并等待其清理完毕
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+            raise
+        finally:
+            self._running.pop(job_id, None)
+
+    async def _run(self, job: Dict[str, Any]):
+        job_id = job["job_id"]
+        options = job["options"]
+        audio = StoredAudioFile(job["audio_path"], job["filename"])
+        suffix = job["audio_path"].rsplit(".", 1)[-1]
+        logger.info(f"Job started: {job_id} ({job['filename']}, priority {job['priority']})")
+        events = recognition_events(
+            audio, suffix, options.get("nocache", False), options.get("long_form", True),
+            args.long_form_window_s, archive=True,
+        )
+        sentences_count = 0
+        try:
+            response = None
+            async for event in events:
+                if event["type"] == "sentences":
+                    sentences_count += len(event["sentences"])
+                    self.store.update_progress(job_id, event["processed_s"], sentences_count)
+                elif event["type"] == "done":
+                    response = event["result"]
+            
+            result_id = response.get("result_id")
+            if result_id:
+                # MP3存档已随识别保存，历史记录中可直接播放
+                await write_result_file(result_id, response)
+            self.store.update_progress(job_id, response.get("total_duration", 0), len(response["sentences"]))
+            self.store.finish(job_id, "done", result_id=result_id)
+            logger.info(f"Job done: {job_id} -> {result_id}")
+        except asyncio.CancelledError:
+            if self._stopping:
+                # 服务关闭，保留音频和 running 状态，重启后重新排队
+                logger.info(f"Job interrupted by shutdown: {job_id}")
+                raise
+            self.store.finish(job_id, "cancelled")
+            logger.info(f"Job cancelled: {job_id}")
+        except HTTPException as e:
+            self.store.finish(job_id, "failed", error=e.detail)
+            logger.error(f"Job failed: {job_id}: {e.detail}")
+        except Exception as e:
+            self.store.finish(job_id, "failed", error=str(e))
+            logger.error(f"Job failed: {job_id}: {e}")
+        finally:
+            await events.aclose()
+            await audio.close()
+            if not self._stopping and os.path.exists(job["audio_path"]):
+                os.remove(job["audio_path"])
+
+
+# 当前服务进程编号，多进程部署时只有 0 号进程执行后台任务，避免重复出队和误把其他进程的任务重新排队
+worker_index = 0
+
+
+async def load_models_and_start_jobs():
+    """在线程中加载模型，识别模型就绪后再开始执行后台任务"""
+    await asyncio.get_running_loop().run_in_executor(None, model_registry.load_all)
+    if model_registry.ready:
+        if worker_index == 0:
+            job_runner.start()
+    else:
+        logger.error("Required models failed to load, background jobs will not run")
+
+
+@app.on_event("startup")
+async def start_model_loading():
+    app.state.model_loading = asyncio.ensure_future(load_models_and_start_jobs())
+
+
+@app.on_event("shutdown")
+async def stop_job_runner():
+    app.state.model_loading.cancel()
+    await job_runner.stop()
+
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """组装任务状态返回内容"""
+    status = {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "priority": job["priority"],
+        "filename": job["filename"],
+        "file_size": job["file_size"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "progress": {"processed_s": job["processed_s"], "sentences_count": job["sentences_count"]},
+        "result_id": job["result_id"],
+        "error": job["error"],
+    }
+    if job["status"] == "queued":
+        status["queue_position"] = job_runner.store.queue_position(job)
+    return status
+
+
+@app.post("/api/jobs")
+async def create_job(request: Request, priority: int = 0, nocache: bool = False, long_form: Optional[bool] = True):
+    """提交异步识别任务（multipart字段 audio），立即返回任务ID
+
+    priority 越大越先执行；完成后结果写入 results/{result_id}.json，
+    通过 GET /api/jobs/{job_id} 查询状态和进度。
+    """
+    audio, suffix = await open_audio_upload(request)
+    job_id = str(uuid.uuid4())
+    audio_path = os.path.join(args.temp_dir, "jobs", f"{job_id}.{suffix}")
+    file_size = 0
+    try:
+        async with aiofiles.open(audio_path, "wb") as out_file:
+            while True:
+                chunk = await audio.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                await out_file.write(chunk)
+    except Exception as e:
         if os.path.exists(audio_path):
             os.remove(audio_path)
-        raise HTTPException(status_code=500, detail=f"Recognition failed: {str(e)}")
+        if isinstance(e, HTTPException):
+            raise
+        logger.error(f"Failed to save job audio: {e}")
+        raise HTTPException(status_code=500, detail="Failed to save audio file")
+    
+    job_runner.store.create(
+        job_id, audio.filename, audio_path, file_size, priority, {"nocache": nocache, "long_form": long_form}
+    )
+    job_runner.notify()
+    logger.info(f"Job queued: {job_id} ({audio.filename}, {file_size} bytes, priority {priority})")
+    return {"success": True, **job_status(job_runner.store.get(job_id))}
+
+
+@app.get("/api/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """列出最近的识别任务，可按状态过滤"""
+    if status and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Invalid status. Supported: {', '.join(JOB_STATUSES)}")
+    jobs = job_runner.store.list(status, max(1, min(limit, 500)))
+    return {"success": True, "jobs": [job_status(job) for job in jobs], "total_count": len(jobs)}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """查询识别任务状态和进度"""
+    job = job_runner.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, **job_status(job)}
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """取消排队中或运行中的识别任务"""
+    job = job_runner.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not job_runner.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job is already {job['status']}")
+    logger.info(f"Job cancel requested: {job_id}")
+    return {"success": True, "job_id": job_id, "message": "Job cancelled"}
 
 
 @app.get("/api/health")
 async def health_check():
     """健康检查API"""
+    if model_registry.ready:
+        status = "healthy"
+    elif model_registry.failed:
+        status = "unhealthy"
+    else:
+        status = "starting"
+    return {
+        "status": status,
+        "models_loaded": model_registry.ready,
+        "models": model_registry.stats(),
+        "supported_formats": ["wav", "mp3", "m4a", "flac", "aac", "ogg"],
+        "inference": model_pool.stats(),
+        "asr_replicas": model_pool.replica_stats(),
+        "ffmpeg": ffmpeg_runner.stats()
+    }
+
+
+@app.get("/api/config")
+async def get_config():
+    """返回生效的运行配置，sources 为每项的来源：default、file（配置文件）、env（环境变量）或 cli（命令行）"""
     return {
-        "status": "healthy",
-        "models_loaded": True,
-        "supported_formats": ["wav", "mp3", "m4a", "flac", "aac", "ogg"]
+        "success": True,
+        "config_file": os.path.abspath(args.config) if os.path.exists(args.config) else None,
+        "settings": vars(args),
+        "sources": settings_sources,
+        "recognition_params": RECOGNITION_PARAMS,
+        "vad_params": VAD_PARAMS,
+        "max_concurrent_requests": model_pool.admission.max_in_flight,
+        "lazy_models": sorted(lazy_model_groups),
     }
 
 
+@app.get("/api/health/live")
+async def liveness_check():
+    """存活检查：进程能响应请求即返回200，不关心模型是否加载完成"""
+    return {"status": "alive", "uptime_s": round(time.time() - SERVICE_STARTED_AT, 1)}
+
+
+@app.get("/api/health/ready")
+async def readiness_check():
+    """就绪检查：识别模型加载完成返回200，否则返回503，附带各模型加载耗时"""
+    stats = model_registry.stats()
+    return JSONResponse(status_code=200 if stats["ready"] else 503, content=stats)
+
+
+RESULT_SORT_FIELDS = ("timestamp", "filename", "total_duration", "speakers_count", "sentences_count", "file_size")
+CATALOG_SCHEMA_VERSION = 1
+
+
+# 结果目录中没有对应结果JSON的音频/峰值文件超过这个时长（秒）后在同步时删除；
+# 留出时间让客户端在识别（archive=1）后调用 /api/save_result 保存结果
+ORPHAN_MEDIA_MIN_AGE_S = 3600
+RESULT_MEDIA_PATTERN = re.compile(r"^(.+)_(?:audio\.\w+|peaks\.bin)$")
+
+
+class ResultCatalog:
+    """识别结果元数据索引（SQLite）
+
+    由保存、更新、删除结果和上传音频时增量维护，/api/results 的分页、排序和过滤
+    直接查询索引，不再逐个读取 results/*.json。启动时按文件修改时间与目录同步一次。
+    """
+
+    def __init__(self, db_path: str, results_dir: str = "results"):
+        self.db_path = db_path
+        self.results_dir = results_dir
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "result_id TEXT PRIMARY KEY, filename TEXT NOT NULL, audio_hash TEXT NOT NULL, "
+            "text_preview TEXT NOT NULL, speakers_count INTEGER NOT NULL, sentences_count INTEGER NOT NULL, "
+            "total_duration REAL NOT NULL, timestamp TEXT NOT NULL, file_size INTEGER NOT NULL, "
+            "audio_path TEXT, updated_timestamp TEXT, error TEXT, mtime REAL NOT NULL)"
+        )
+        for column in ("timestamp", "filename", "audio_hash", "speakers_count"):
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS results_{column} ON results ({column})")
+        # 分句全文索引：sentences 存原文和时间戳，sentences_fts 以相同rowid存切分后的词元
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sentences ("
+            "id INTEGER PRIMARY KEY, result_id TEXT NOT NULL, sentence_index INTEGER NOT NULL, "
+            "start REAL, end REAL, speaker TEXT, text TEXT, zh TEXT, en TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sentences_result_id ON sentences (result_id)")
+        self._db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS sentences_fts USING fts5(text, zh, en, tokenize='unicode61')"
+        )
+        if self._db.execute("PRAGMA user_version").fetchone()[0] < CATALOG_SCHEMA_VERSION:
+            # 旧版本索引没有分句数据，清空后由 sync() 全量重建
+            self._db.execute("DELETE FROM results")
+            self._db.execute(f"PRAGMA user_version = {CATALOG_SCHEMA_VERSION}")
+        self._db.commit()
+
+    def reopen(self):
+        """fork 后在子进程中重新打开数据库连接"""
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+
+    def _result_file(self, result_id: str) -> str:
+        return os.path.join(self.results_dir, f"{result_id}.json")
+
+    @staticmethod
+    def _row(result_id: str, data: Optional[Dict[str, Any]], stat: os.stat_result) -> tuple:
+        created_time = datetime.datetime.fromtimestamp(stat.st_ctime).isoformat()
+        if data is None:
+            return (result_id, "unknown", "", "", 0, 0, 0, created_time, stat.st_size,
+                    None, None, "Failed to read file content", stat.st_mtime)
+        text = data.get("text", "")
+        return (
+            result_id,
+            data.get("filename", "unknown"),
+            data.get("audio_hash", ""),
+            text[:100] + "..." if len(text) > 100 else text,
+            len(data.get("speakers", [])),
+            len(data.get("sentences", [])),
+            data.get("total_duration", 0) or 0,
+            data.get("timestamp", created_time),
+            stat.st_size,
+            data.get("audio_path"),
+            data.get("updated_timestamp"),
+            None,
+            stat.st_mtime,
+        )
+
+    def upsert(self, result_id: str, data: Optional[Dict[str, Any]]):
+        """按结果内容更新索引，data 为 None 表示文件无法解析"""
+        row = self._row(result_id, data, os.stat(self._result_file(result_id)))
+        with self._lock:
+            if row[9] is None:
+                # 结果JSON中没有音频路径时保留上传音频时记录的路径
+                existing = self._db.execute(
+                    "SELECT audio_path FROM results WHERE result_id = ?", (result_id,)
+                ).fetchone()
+                if existing is not None:
+                    row = row[:9] + (existing[0],) + row[10:]
+            self._db.execute(f"INSERT OR REPLACE INTO results VALUES ({', '.join('?' * len(row))})", row)
+            self._delete_sentences(result_id)
+            for index, sentence in enumerate((data or {}).get("sentences", [])):
+                if not isinstance(sentence, dict):
+                    continue
+                translation = sentence.get("translation") or {}
+                fields = (sentence.get("text", ""), translation.get("zh", ""), translation.get("en", ""))
+                cursor = self._db.execute(
+                    "INSERT INTO sentences (result_id, sentence_index, start, end, speaker, text, zh, en) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (result_id, index, sentence.get("start"), sentence.get("end"),
+                     str(sentence.get("speaker", "")), *fields),
+                )
+                self._db.execute(
+                    "INSERT INTO sentences_fts (rowid, text, zh, en) VALUES (?, ?, ?, ?)",
+                    (cursor.lastrowid, *[search_tokens(field) for field in fields]),
+                )
+            self._db.commit()
+
+    def _delete_sentences(self, result_id: str):
+        """删除结果的分句及其全文索引（需持有锁）"""
+        self._db.execute(
+            "DELETE FROM sentences_fts WHERE rowid IN (SELECT id FROM sentences WHERE result_id = ?)", (result_id,)
+        )
+        self._db.execute("DELETE FROM sentences WHERE result_id = ?", (result_id,))
+
+    def delete(self, result_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM results WHERE result_id = ?", (result_id,))
+            self._delete_sentences(result_id)
+            self._db.commit()
+
+    def set_audio(self, result_id: str, audio_path: str):
+        with self._lock:
+            self._db.execute("UPDATE results SET audio_path = ? WHERE result_id = ?", (audio_path, result_id))
+            self._db.commit()
+
+    def sync(self):
+        """与结果目录同步：索引新增或被外部修改的文件，移除已删除文件的记录，
+        并删除没有对应结果的存档音频和峰值文件"""
+        with self._lock:
+            indexed = dict(self._db.execute("SELECT result_id, mtime FROM results").fetchall())
+        present = set()
+        updated = 0
+        for filename in os.listdir(self.results_dir):
+            if not filename.endswith(".json"):
+                continue
+            result_id = filename[:-5]
+            path = os.path.join(self.results_dir, filename)
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            present.add(result_id)
+            if indexed.get(result_id) == mtime:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as e:
+                logger.warning(f"Failed to read result file {filename}: {e}")
+                data = None
+            self.upsert(result_id, data)
+            updated += 1
+        removed = [result_id for result_id in indexed if result_id not in present]
+        for result_id in removed:
+            self.delete(result_id)
+        orphans = 0
+        now = time.time()
+        for filename in os.listdir(self.results_dir):
+            match = RESULT_MEDIA_PATTERN.match(filename)
+            if match is None or match.group(1) in present:
+                continue
+            path = os.path.join(self.results_dir, filename)
+            try:
+                if now - os.stat(path).st_mtime > ORPHAN_MEDIA_MIN_AGE_S:
+                    os.remove(path)
+                    orphans += 1
+            except OSError:
+                continue
+        logger.info(
+            f"Result catalog synced: {len(present)} results, {updated} indexed, {len(removed)} removed, "
+            f"{orphans} orphaned media files deleted"
+        )
+
+    def query(self, offset: int = 0, limit: int = 50, sort: str = "timestamp", order: str = "desc",
+              filename: Optional[str] = None, audio_hash: Optional[str] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None,
+              min_speakers: Optional[int] = None, max_speakers: Optional[int] = None):
+        """分页查询，返回 (结果列表, 满足条件的总数)；日期为 YYYY-MM-DD，包含首尾两天"""
+        conditions = []
+        params = []
+        if filename:
+            conditions.append("filename LIKE ? ESCAPE '\\'")
+            params.append("%" + re.sub(r"([%_\\])", r"\\\1", filename) + "%")
+        if audio_hash:
+            conditions.append("audio_hash = ?")
+            params.append(audio_hash)
+        if date_from:
+            conditions.append("timestamp >= ?")
+            params.append(datetime.date.fromisoformat(date_from).isoformat())
+        if date_to:
+            conditions.append("timestamp < ?")
+            params.append((datetime.date.fromisoformat(date_to) + datetime.timedelta(days=1)).isoformat())
+        if min_speakers is not None:
+            conditions.append("speakers_count >= ?")
+            params.append(min_speakers)
+        if max_speakers is not None:
+            conditions.append("speakers_count <= ?")
+            params.append(max_speakers)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        direction = "ASC" if order == "asc" else "DESC"
+        with self._lock:
+            total = self._db.execute(f"SELECT COUNT(*) FROM results{where}", params).fetchone()[0]
+            rows = self._db.execute(
+                f"SELECT * FROM results{where} ORDER BY {sort} {direction}, result_id {direction} LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        results = []
+        for row in rows:
+            item = dict(row)
+            item.pop("mtime")
+            item["original_filename"] = item["filename"]  # 原始音频文件名
+            if item["error"] is None:
+                item.pop("error")
+            results.append(item)
+        return results, total
+
+    def search(self, query: str, field: Optional[str] = None, result_id: Optional[str] = None,
+               offset: int = 0, limit: int = 50):
+        """全文检索分句原文及中英文译文，按相关度返回 (命中列表, 命中总数)"""
+        expression = search_match_expression(query, field)
+        if not expression:
+            return [], 0
+        where = "sentences_fts MATCH ?"
+        params = [expression]
+        if result_id:
+            where += " AND s.result_id = ?"
+            params.append(result_id)
+        with self._lock:
+            total = self._db.execute(
+                f"SELECT COUNT(*) FROM sentences_fts JOIN sentences s ON s.id = sentences_fts.rowid WHERE {where}",
+                params,
+            ).fetchone()[0]
+            rows = self._db.execute(
+                "SELECT s.result_id, s.sentence_index, s.start, s.end, s.speaker, s.text, s.zh, s.en, "
+                "r.filename, r.timestamp FROM sentences_fts "
+                "JOIN sentences s ON s.id = sentences_fts.rowid "
+                "LEFT JOIN results r ON r.result_id = s.result_id "
+                f"WHERE {where} ORDER BY sentences_fts.rank, s.result_id, s.sentence_index LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        hits = []
+        for row in rows:
+            hit = dict(row)
+            hit["translation"] = {"zh": hit.pop("zh"), "en": hit.pop("en")}
+            hits.append(hit)
+        return hits, total
+
+
+
+
+async def write_result_file(result_id: str, result_data: dict) -> str:
+    """把识别结果写入 results/{result_id}.json 并更新索引，返回文件路径"""
+    result_file = f"results/{result_id}.json"
+    async with aiofiles.open(result_file, 'w', encoding='utf-8') as f:
+        await f.write(json.dumps(result_data, ensure_ascii=False, indent=2))
+    result_catalog.upsert(result_id, result_data)
+    return result_file
+
+
 @app.post("/api/save_result")
 async def save_result(result_data: dict):
     """保存识别结果到本地文件"""
@@ -498,9 +3537,7 @@ async def save_result(result_data: dict):
             raise HTTPException(status_code=400, detail="Missing result_id")
         
         # 保存结果到JSON文件
-        result_file = f"results/{result_id}.json"
-        async with aiofiles.open(result_file, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(result_data, ensure_ascii=False, indent=2))
+        result_file = await write_result_file(result_id, result_data)
         
         logger.info(f"Result saved: {result_file}")
         return {
@@ -535,63 +3572,66 @@ async def export_result(result_id: str):
 
 
 @app.get("/api/results")
-async def list_results():
-    """列出所有保存的识别结果"""
+async def list_results(offset: int = 0, limit: int = 50, sort: str = "timestamp", order: str = "desc",
+                       filename: Optional[str] = None, audio_hash: Optional[str] = None,
+                       date_from: Optional[str] = None, date_to: Optional[str] = None,
+                       min_speakers: Optional[int] = None, max_speakers: Optional[int] = None):
+    """分页列出保存的识别结果
+
+    从结果索引查询，支持按时间、文件名、时长、说话人数等排序（sort / order=asc|desc），
+    按文件名（子串）、audio_hash、日期范围（YYYY-MM-DD）和说话人数过滤。
+    """
+    if sort not in RESULT_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort field. Supported: {', '.join(RESULT_SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Invalid order. Supported: asc, desc")
+    offset = max(0, offset)
+    limit = max(1, min(limit, 500))
     try:
-        results = []
-        results_dir = "results"
-        
-        if os.path.exists(results_dir):
-            for filename in os.listdir(results_dir):
-                if filename.endswith('.json'):
-                    result_id = filename[:-5]  # 移除.json后缀
-                    file_path = os.path.join(results_dir, filename)
-                    
-                    # 读取文件基本信息
-                    stat = os.stat(file_path)
-                    created_time = datetime.datetime.fromtimestamp(stat.st_ctime).isoformat()
-                    file_size = stat.st_size
-                    
-                    # 尝试读取文件内容获取更多信息
-                    try:
-                        async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                            content = await f.read()
-                            data = json.loads(content)
-                            
-                            results.append({
-                                "result_id": result_id,
-                                "filename": data.get("filename", "unknown"),
-                                "original_filename": data.get("filename", "unknown"),  # 原始音频文件名
-                                "audio_hash": data.get("audio_hash", ""),
-                                "text_preview": data.get("text", "")[:100] + "..." if len(data.get("text", "")) > 100 else data.get("text", ""),
-                                "speakers_count": len(data.get("speakers", [])),
-                                "sentences_count": len(data.get("sentences", [])),
-                                "total_duration": data.get("total_duration", 0),
-                                "timestamp": data.get("timestamp", created_time),
-                                "file_size": file_size
-                            })
-                    except Exception as e:
-                        logger.warning(f"Failed to read result file {filename}: {e}")
-                        results.append({
-                            "result_id": result_id,
-                            "filename": "unknown",
-                            "created_time": created_time,
-                            "file_size": file_size,
-                            "error": "Failed to read file content"
-                        })
-        
-        # 按时间戳排序（最新的在前）
-        results.sort(key=lambda x: x.get("timestamp", x.get("created_time", "")), reverse=True)
-        
-        return {
-            "success": True,
-            "results": results,
-            "total_count": len(results)
-        }
-    
+        results, total = result_catalog.query(
+            offset, limit, sort, order, filename, audio_hash, date_from, date_to, min_speakers, max_speakers
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date, expected YYYY-MM-DD")
     except Exception as e:
         logger.error(f"Failed to list results: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to list results: {str(e)}")
+    
+    return {
+        "success": True,
+        "results": results,
+        "total_count": total,
+        "offset": offset,
+        "limit": limit
+    }
+
+
+@app.get("/api/search")
+async def search_results(q: str, field: Optional[str] = None, result_id: Optional[str] = None,
+                         offset: int = 0, limit: int = 50):
+    """全文检索保存的识别结果
+
+    在分句原文和译文（field=text / zh / en，默认全部）中检索，空格分隔的多个词需同时出现，
+    中文按子串匹配。返回命中的 result_id、分句序号、时间戳和文本。
+    """
+    if field and field not in SEARCH_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Invalid field. Supported: {', '.join(SEARCH_FIELDS)}")
+    offset = max(0, offset)
+    limit = max(1, min(limit, 500))
+    try:
+        hits, total = result_catalog.search(q, field, result_id, offset, limit)
+    except Exception as e:
+        logger.error(f"Search failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+    
+    return {
+        "success": True,
+        "query": q,
+        "hits": hits,
+        "total_count": total,
+        "offset": offset,
+        "limit": limit
+    }
 
 
 @app.post("/api/upload_audio/{result_id}")
@@ -619,6 +3659,7 @@ async def upload_audio_for_result(result_id: str, audio: UploadFile = File(...))
         # 验证文件是否成功保存
         if os.path.exists(audio_path):
             file_size = os.path.getsize(audio_path)
+            result_catalog.set_audio(result_id, audio_filename)
             logger.info(f"音频文件保存成功: {audio_path}, 文件大小: {file_size} bytes")
         else:
             logger.error(f"音频文件保存失败: 文件不存在 {audio_path}")
@@ -635,31 +3676,152 @@ async def upload_audio_for_result(result_id: str, audio: UploadFile = File(...))
         raise HTTPException(status_code=500, detail=f"Failed to upload audio: {str(e)}")
 
 
-@app.get("/api/audio/{audio_filename}")
-async def get_audio_file(audio_filename: str):
-    """获取保存的音频文件"""
-    try:
-        audio_path = f"results/{audio_filename}"
-        if not os.path.exists(audio_path):
-            raise HTTPException(status_code=404, detail="Audio file not found")
-        
-        return FileResponse(
-            path=audio_path,
-            filename=audio_filename,
-            media_type="audio/mpeg"  # 通用音频类型
-        )
+AUDIO_MEDIA_TYPES = {
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+    ".m4a": "audio/mp4",
+    ".flac": "audio/flac",
+    ".aac": "audio/aac",
+    ".ogg": "audio/ogg",
+}
+
+
+async def iter_file_range(path: str, start: int, length: int):
+    """分块读取文件的指定字节范围"""
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        while length > 0:
+            chunk = await f.read(min(UPLOAD_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_range_response(request: Request, path: str, media_type: str) -> Response:
+    """返回支持 Range（206）和条件请求（ETag / Last-Modified，304）的文件响应"""
+    stat = os.stat(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = datetime.datetime.fromtimestamp(stat.st_mtime, datetime.timezone.utc)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": last_modified.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        "Cache-Control": "no-cache",
+    }
+    
+    # If-None-Match 优先于 If-Modified-Since
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        try:
+            since = email.utils.parsedate_to_datetime(request.headers["if-modified-since"])
+            if int(last_modified.timestamp()) <= since.timestamp():
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    
+    start, end = 0, stat.st_size - 1
+    status_code = 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() in (etag, headers["Last-Modified"])):
+        try:
+            byte_range = parse_byte_range(range_header, stat.st_size)
+        except ValueError:
+            # 无法解析或多段范围，返回完整文件
+            byte_range = False
+        if byte_range is None:
+            headers["Content-Range"] = f"bytes */{stat.st_size}"
+            return Response(status_code=416, headers=headers)
+        if byte_range:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    
+    headers["Content-Length"] = str(end - start + 1)
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(
+        iter_file_range(path, start, end - start + 1),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+    )
+
+
+@app.api_route("/api/audio/{audio_filename}", methods=["GET", "HEAD"])
+async def get_audio_file(request: Request, audio_filename: str):
+    """获取保存的音频文件，支持断点续传/拖动播放（Range）和缓存校验（ETag）"""
+    audio_path = f"results/{audio_filename}"
+    if os.path.basename(audio_filename) != audio_filename or not os.path.isfile(audio_path):
+        raise HTTPException(status_code=404, detail="Audio file not found")
     
+    try:
+        media_type = AUDIO_MEDIA_TYPES.get(os.path.splitext(audio_filename)[1].lower(), "application/octet-stream")
+        return file_range_response(request, audio_path, media_type)
     except Exception as e:
         logger.error(f"Failed to get audio file: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get audio file: {str(e)}")
 
 
+@app.get("/api/audio/{result_id}/peaks")
+async def get_audio_peaks(request: Request, result_id: str, zoom: Optional[int] = None):
+    """获取结果音频的波形峰值（二进制）
+
+    zoom 从0（最粗的概览）开始，越大越细，超出范围时取最近的一级。响应体为
+    int16 小端交错的 (min, max) 数组，每对覆盖 X-Peaks-Samples-Per-Bucket 个16kHz采样。
+    识别时没有生成峰值的结果，首次请求时从保存的音频解码计算；计算期间到达的
+    同一结果的请求等待同一次计算，请求断开不会中断计算。
+    """
+    if os.path.basename(result_id) != result_id:
+        raise HTTPException(status_code=404, detail="Result not found")
+    peaks_path = f"results/{result_id}_peaks.bin"
+    if not os.path.exists(peaks_path):
+        audio_path = next(
+            (f"results/{result_id}_audio{ext}" for ext in AUDIO_MEDIA_TYPES
+             if os.path.exists(f"results/{result_id}_audio{ext}")),
+            None,
+        )
+        if audio_path is None:
+            raise HTTPException(status_code=404, detail="Audio file not found")
+        try:
+            await asyncio.shield(ensure_peaks_file(audio_path, peaks_path))
+        except Exception as e:
+            logger.error(f"Failed to compute waveform peaks: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to compute waveform peaks: {str(e)}")
+    
+    stat = os.stat(peaks_path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}-{zoom}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    try:
+        info, zoom, bucket_samples, data = read_peaks_level(peaks_path, zoom)
+    except Exception as e:
+        logger.error(f"Failed to read waveform peaks: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to read waveform peaks: {str(e)}")
+    
+    return Response(
+        content=data,
+        media_type="application/octet-stream",
+        headers={
+            "ETag": etag,
+            "Cache-Control": "no-cache",
+            "X-Peaks-Sample-Rate": str(info["sample_rate"]),
+            "X-Peaks-Total-Samples": str(info["total_samples"]),
+            "X-Peaks-Samples-Per-Bucket": str(bucket_samples),
+            "X-Peaks-Zoom": str(zoom),
+            "X-Peaks-Zoom-Levels": str(info["zoom_levels"]),
+        },
+    )
+
+
 @app.put("/api/update_result/{result_id}")
 async def update_result(result_id: str, result_data: dict):
     """更新已保存的识别结果"""
     try:
-        result_file = f"results/{result_id}.json"
-        
         # 确保结果目录存在
         os.makedirs("results", exist_ok=True)
         
@@ -667,8 +3829,7 @@ async def update_result(result_id: str, result_data: dict):
         result_data["updated_timestamp"] = datetime.datetime.now().isoformat()
         
         # 保存更新后的结果
-        async with aiofiles.open(result_file, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(result_data, ensure_ascii=False, indent=2))
+        result_file = await write_result_file(result_id, result_data)
         
         logger.info(f"Result updated: {result_file}")
         return {
@@ -692,6 +3853,7 @@ async def delete_result(result_id: str):
         
         # 删除JSON文件
         os.remove(result_file)
+        result_catalog.delete(result_id)
         logger.info(f"Result JSON deleted: {result_file}")
         
         # 查找并删除对应的音频文件
@@ -703,6 +3865,11 @@ async def delete_result(result_id: str):
                 audio_files_deleted.append(audio_file)
                 logger.info(f"Audio file deleted: {audio_file}")
         
+        peaks_file = f"results/{result_id}_peaks.bin"
+        if os.path.exists(peaks_file):
+            os.remove(peaks_file)
+            audio_files_deleted.append(peaks_file)
+        
         message = "Result deleted successfully"
         if audio_files_deleted:
             message += f", audio files deleted: {', '.join(audio_files_deleted)}"
@@ -729,23 +3896,18 @@ async def translate_api(request: dict):
         if not text.strip():
             return {"success": False, "error": "文本不能为空"}
         
-        # 执行翻译
+        # 执行翻译（放到线程中，lazy 的翻译模型首次使用时需要加载）
+        loop = asyncio.get_running_loop()
         if target_lang == 'auto':
             # 自动检测并翻译为两种语言
-            translation_zh = translate_text(text, 'zh')
-            translation_en = translate_text(text, 'en')
-            
+            translations = await loop.run_in_executor(None, translate_sentences, [text])
             return {
                 "success": True,
-                "translation": {
-                    "zh": translation_zh["translated"],
-                    "en": translation_en["translated"],
-                    "source_lang": translation_zh["source_lang"]
-                }
+                "translation": translations[0]
             }
         else:
             # 翻译为指定语言
-            result = translate_text(text, target_lang)
+            result = await loop.run_in_executor(None, translate_text, text, target_lang)
             return {
                 "success": True,
                 "translation": result
@@ -755,5 +3917,299 @@ async def translate_api(request: dict):
         logger.error(f"Translation API error: {e}")
         return {"success": False, "error": str(e)}
 
+@app.websocket("/ws/asr")
+async def websocket_asr(websocket: WebSocket):
+    """实时流式识别
+
+    客户端可先发送JSON配置 {"mode": "2pass" | "online" | "offline", "chunk_size": [0, 10, 5]}，
+    随后发送16kHz单声道s16le PCM二进制帧，发送 {"is_speaking": false} 表示说话结束。
+    服务端返回 {"type": "partial", ...} 部分结果和 {"type": "final", ...} 语音段最终结果，
+    说话结束的剩余音频识别完成后返回 {"type": "end"}。
+    """
+    await websocket.accept()
+    if not model_registry.ready:
+        await websocket.send_json({"type": "error", "detail": "Models are still loading, please retry later"})
+        await websocket.close(code=1013)
+        return
+    # lazy 的流式模型在首次连接时加载，放到线程中避免阻塞事件循环
+    loop = asyncio.get_running_loop()
+    if await loop.run_in_executor(None, model_registry.get, "streaming_vad") is None:
+        await websocket.send_json({"type": "error", "detail": "Streaming models are not loaded"})
+        await websocket.close(code=1011)
+        return
+    await loop.run_in_executor(None, model_registry.get, "streaming_asr")
+    slot = contextlib.ExitStack()
+    try:
+        slot.enter_context(streaming_executor.admit())
+    except QueueFullError as e:
+        logger.warning(f"Rejecting streaming session: {e}")
+        await websocket.send_json({"type": "error", "detail": "Too many streaming sessions, please retry later"})
+        await websocket.close(code=1013)
+        return
+    
+    session = None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text") is not None:
+                config = json.loads(message["text"])
+                if session is None:
+                    session = StreamingASRSession(
+                        websocket, config.get("mode", "2pass"), config.get("chunk_size")
+                    )
+                    await websocket.send_json({"type": "ready", "mode": session.mode})
+                if config.get("is_speaking") is False:
+                    await session.finish()
+                    await websocket.send_json({"type": "end"})
+            elif message.get("bytes"):
+                if session is None:
+                    session = StreamingASRSession(websocket)
+                    await websocket.send_json({"type": "ready", "mode": session.mode})
+                await session.feed(message["bytes"])
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Streaming recognition failed: {e}")
+        try:
+            await websocket.send_json({"type": "error", "detail": f"Streaming recognition failed: {str(e)}"})
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+    finally:
+        slot.close()
+
+
+@app.get("/api/translation_cache")
+async def translation_cache_stats():
+    """翻译缓存统计API"""
+    return {
+        "success": True,
+        "cache": translation_cache.stats()
+    }
+
+def configure(argv: Optional[List[str]] = None):
+    """读取配置，创建模型注册表、线程池、缓存和数据库等服务状态
+
+    导入本模块只定义接口，不读取配置也不创建任何资源。直接运行时由 main() 传入
+    命令行参数调用；被其他程序导入时（如 benchmark.py）需先调用本函数，argv 为
+    None 时读取环境变量 ASTROMAO_ARGS。模型只登记不加载，由 load_all() 加载。
+    """
+    global args, settings_sources, VAD_PARAMS, RECOGNITION_PARAMS, lazy_model_groups, model_registry
+    global asr_replica_names, translation_cache, translator, inference_workers
+    global model_pool, recognition_cache, ffmpeg_runner, streaming_executor, max_upload_bytes
+    global job_runner, result_catalog
+
+    args, settings_sources = load_settings(argv)
+    logger.setLevel(args.log_level.upper())
+
+    logger.info("-----------  Configuration Arguments -----------")
+    for arg, value in vars(args).items():
+        logger.info("%s: %s" % (arg, value))
+    logger.info("------------------------------------------------")
+
+    os.makedirs(args.temp_dir, exist_ok=True)
+    os.makedirs(os.path.join(args.temp_dir, "jobs"), exist_ok=True)
+    os.makedirs("results", exist_ok=True)  # 创建结果存储目录
+
+    # 覆盖VAD模型默认配置的参数，未设置的项保持模型自带的配置
+    VAD_PARAMS = {
+        key: value for key, value in (
+            ("max_single_segment_time", args.vad_max_single_segment_time),
+            ("speech_noise_thres", args.vad_speech_noise_thres),
+        ) if value is not None
+    }
+    # model.generate 识别参数，同时参与识别结果缓存的指纹计算
+    RECOGNITION_PARAMS = {
+        "batch_size_s": args.batch_size_s,
+        "merge_vad": args.merge_vad,
+        "merge_length_s": args.merge_length_s,
+    }
+    hotwords = load_hotwords()
+    if hotwords:
+        RECOGNITION_PARAMS["hotword"] = hotwords
+
+    lazy_model_groups = {group.strip() for group in args.lazy_models.split(",") if group.strip()}
+    if not args.model_cache:
+        lazy_model_groups |= set(LAZY_MODEL_GROUPS)
+    for group in lazy_model_groups - set(LAZY_MODEL_GROUPS):
+        logger.warning(f"Unknown lazy model group: {group}, supported: {', '.join(LAZY_MODEL_GROUPS)}")
+
+    model_registry = ModelRegistry(args.model_load_workers)
+    # 识别主模型的各个副本，0号副本必须加载成功，其余副本加载失败时不参与分配
+    replica_devices = [device.strip() for device in args.replica_devices.split(",") if device.strip()] or [args.device]
+    asr_replica_names = []
+    for replica_index in range(max(1, args.asr_replicas)):
+        replica_name = "asr" if replica_index == 0 else f"asr_{replica_index}"
+        replica_device = replica_devices[replica_index % len(replica_devices)]
+        model_registry.register(
+            replica_name, lambda device=replica_device: load_asr_model(device), required=replica_index == 0
+        )
+        asr_replica_names.append((replica_name, replica_device))
+    # Streaming (online) models for /ws/asr, optional
+    model_registry.register(
+        "streaming_vad", lambda: load_streaming_model(args.vad_model), lazy="streaming" in lazy_model_groups
+    )
+    if os.path.exists(args.online_asr_model):
+        model_registry.register(
+            "streaming_asr", lambda: load_streaming_model(args.online_asr_model),
+            lazy="streaming" in lazy_model_groups,
+        )
+    else:
+        logger.warning(f"Online ASR model not found at: {args.online_asr_model}, /ws/asr will run offline mode only")
+
+    # 初始化翻译器
+    translation_cache = TranslationCache(args.translation_cache_size, args.translation_cache_db or None)
+    translator = LocalTranslator(
+        model_registry, args.translation_batch_tokens, translation_cache,
+        lazy="translation" in lazy_model_groups, num_beams=args.translation_num_beams,
+    )
+
+    # 多进程部署时CPU在各进程间均分
+    inference_workers = args.inference_workers or max(
+        1, (os.cpu_count() or 1) // max(1, args.ncpu) // max(1, args.workers)
+    )
+    # 识别线程在各副本间均分，每个副本至少一个线程
+    model_pool = ModelPool(model_registry, [
+        ASRReplica(index, name, device, max(1, inference_workers // len(asr_replica_names)), args.pin_replicas)
+        for index, (name, device) in enumerate(asr_replica_names)
+    ], args.max_queue_depth, args.max_concurrent_requests, args.batch_window_ms, args.batch_max_s)
+    logger.info(
+        f"ASR model pool: {len(asr_replica_names)} replicas on {', '.join(d for _, d in asr_replica_names)}, "
+        f"{model_pool.workers} workers, max queue depth {args.max_queue_depth}, "
+        f"max concurrent requests {model_pool.admission.max_in_flight}"
+    )
+
+    recognition_cache = None
+    if args.recognition_cache_entries > 0:
+        recognition_cache = RecognitionCache(
+            os.path.join(args.temp_dir, "recognition_cache"),
+            args.recognition_cache_entries,
+            args.recognition_cache_max_age_h * 3600,
+            recognition_fingerprint,
+        )
+
+    ffmpeg_runner = FFmpegRunner(
+        args.max_ffmpeg_processes or max(1, (os.cpu_count() or 1) // max(1, args.workers)), args.ffmpeg_timeout_s
+    )
+    # 流式模型线程池：admit() 限制同时在线的会话数，离线识别仍使用 model_pool
+    streaming_executor = StreamingExecutor(
+        args.streaming_workers, max(0, args.max_streaming_sessions - args.streaming_workers)
+    )
+    # 请求体大小上限（字节），None 表示不限制
+    max_upload_bytes = int(args.max_file_size_mb * 1024 * 1024) if args.max_file_size_mb > 0 else None
+
+    job_runner = JobRunner(
+        JobStore(args.jobs_db), max(1, args.job_workers), JOB_POLL_INTERVAL_S if args.workers > 1 else None
+    )
+    result_catalog = ResultCatalog(args.catalog_db)
+    result_catalog.sync()
+
+
+def serve_prefork(workers: int):
+    """预派生多进程服务
+
+    父进程创建监听socket并加载所有非 lazy 的模型，然后 fork 出 workers 个子进程共用
+    该socket。模型权重在 fork 前加载，各子进程以写时复制的方式共享同一份内存，
+    进程数增加时内存占用基本不变；lazy 模型仍由各子进程首次使用时自行加载。
+    父进程以单个 torch 线程加载模型、不做任何推理，不会创建 OpenMP/MKL 线程池，
+    子进程 fork 后再按配置设置线程数，避免继承线程池状态导致死锁。CUDA 不能在
+    fork 前初始化，使用GPU时由各子进程自行加载模型。fork 前冻结GC，模型对象和
+    配置等Python对象不会因子进程的垃圾回收而被复制。
+    父进程只负责监控，子进程异常退出时重新 fork，收到 SIGTERM/SIGINT 时通知子进程退出。
+    """
+    sock = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    config = uvicorn.Config(app, host=args.host, port=args.port)
+
+    devices = [args.device] + [device for _, device in asr_replica_names]
+    if any(device.startswith("cuda") for device in devices):
+        logger.info("CUDA devices configured, each worker process loads its own models")
+    else:
+        # FunASR 加载时把线程数设为 ncpu，_load 之后又恢复为 torch_threads，父进程中都改为1
+        ncpu, torch_threads = args.ncpu, args.torch_threads
+        args.ncpu = args.torch_threads = 1
+        torch.set_num_threads(1)
+        try:
+            model_registry.load_all()
+        finally:
+            args.ncpu, args.torch_threads = ncpu, torch_threads
+        if not model_registry.ready:
+            logger.error("Required models failed to load in the parent process, exiting")
+            sys.exit(1)
+
+    gc.collect()
+    gc.freeze()
+    children = {}
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid:
+            children[pid] = index
+            return
+        global worker_index
+        worker_index = index
+        # 子进程单独成组，终端的 Ctrl-C 只发给父进程，由父进程统一转发，避免子进程收到两次信号
+        os.setpgid(0, 0)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        torch.set_num_threads(args.torch_threads if args.torch_threads > 0 else args.ncpu)
+        # SQLite 连接不能跨进程共用
+        translation_cache.reopen()
+        job_runner.store.reopen()
+        result_catalog.reopen()
+        exit_code = 0
+        try:
+            uvicorn.Server(config).run(sockets=[sock])
+        except Exception as e:
+            logger.error(f"Worker {index} crashed: {e}")
+            exit_code = 1
+        finally:
+            logging.shutdown()
+            os._exit(exit_code)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for index in range(workers):
+        spawn(index)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info(f"Serving on {args.host}:{args.port} with {workers} worker processes: {sorted(children)}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+        logger.warning(f"Worker {index} (pid {pid}) exited with status {status}, restarting")
+        time.sleep(1)
+        spawn(index)
+    sock.close()
+
+
+def main():
+    configure(sys.argv[1:])
+    check_local_models()
+    if args.workers > 1:
+        serve_prefork(args.workers)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
+
+
 if __name__ == "__main__":
-    uvicorn.run(app, host=args.host, port=args.port)
\ No newline at end of file
+    main()
\ No newline at end of file
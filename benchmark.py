@@ -9,16 +9,67 @@ import os
 import sys
 import time
 import json
+import math
+import uuid
+import random
+import shlex
+import wave
+import hashlib
 import argparse
 import asyncio
+import tempfile
 import aiohttp
 import statistics
+from collections import defaultdict
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+
+def audio_file_duration(file_path: str) -> float:
+    """读取WAV文件头得到音频时长（秒），其他格式或读取失败时返回0"""
+    try:
+        with wave.open(file_path, 'rb') as f:
+            return f.getnframes() / f.getframerate()
+    except (wave.Error, EOFError, OSError):
+        return 0.0
+
+
+def percentile(values: List[float], q: float) -> float:
+    """线性插值计算百分位数，q 取 0~100"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """返回样本数、均值、最小/最大值和 p50/p95/p99"""
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean': statistics.mean(values),
+        'min': min(values),
+        'max': max(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+    }
+
+
+def recognize_params(warm_cache: bool) -> Dict[str, int]:
+    """识别请求的查询参数：未指定 --warm-cache 时绕过服务端识别缓存"""
+    return {} if warm_cache else {'nocache': 1}
+
 
 class AstroMaoBenchmark:
-    def __init__(self, server_url: str = "http://localhost:8001"):
+    def __init__(self, server_url: str = "http://localhost:8001", warm_cache: bool = False):
         self.server_url = server_url
+        # 默认带 nocache=1 绕过服务端识别缓存，测量实际识别耗时
+        self.warm_cache = warm_cache
         self.results = []
         
     async def test_single_file(self, session: aiohttp.ClientSession, 
@@ -36,8 +87,8 @@ class AstroMaoBenchmark:
                 
                 # 发送请求
                 request_start = time.time()
-                async with session.post(f"{self.server_url}/api/recognize", 
-                                       data=data) as response:
+                async with session.post(f"{self.server_url}/api/recognize", data=data,
+                                        params=recognize_params(self.warm_cache)) as response:
                     request_end = time.time()
                     
                     if response.status == 200:
@@ -46,7 +97,8 @@ class AstroMaoBenchmark:
                         
                         # 计算性能指标
                         file_size = os.path.getsize(file_path)
-                        audio_duration = result.get('duration', 0)
+                        # 服务端不返回音频时长，按文件头计算，非WAV文件用识别出的语音时长近似
+                        audio_duration = audio_file_duration(file_path) or result.get('total_duration', 0)
                         processing_time = result.get('processing_time', request_end - request_start)
                         
                         return {
@@ -214,6 +266,1219 @@ class AstroMaoBenchmark:
         
         print("\n" + "="*60)
 
+# 分阶段基准测试的阶段，按流水线顺序排列
+PIPELINE_STAGES = [
+    'upload_write', 'hash', 'decode_ffmpeg', 'decode_native',
+    'vad', 'asr', 'punctuation', 'speaker', 'generate_other',
+    'sentence_build', 'translate_zh_en', 'translate_en_zh', 'json_serialize', 'total',
+]
+
+# 识别结果为空时（合成音频通常没有可识别的语音），用这些句子测量翻译耗时
+TRANSLATION_SAMPLES = {
+    ('zh', 'en'): [
+        "今天天气很好，我们一起去公园散步吧。",
+        "这个语音识别系统支持中英文混合识别和说话人分离。",
+        "会议将在下午三点开始，请大家准时参加。",
+    ],
+    ('en', 'zh'): [
+        "The weather is nice today, let's take a walk in the park.",
+        "This speech recognition system supports speaker diarization.",
+        "The meeting starts at three o'clock, please be on time.",
+    ],
+}
+
+
+def generate_corpus(output_dir: str, durations: List[int]) -> List[Dict[str, Any]]:
+    """用 sample_audio 生成各时长的单说话人和多说话人合成音频"""
+    from sample_audio import generate_test_audio, create_multi_speaker_audio
+    
+    corpus = []
+    for duration in durations:
+        single_path = os.path.join(output_dir, f"single_{duration}s.wav")
+        generate_test_audio(single_path, duration)
+        corpus.append({'path': single_path, 'kind': 'single', 'duration': duration})
+        multi_path = os.path.join(output_dir, f"multi_{duration}s.wav")
+        create_multi_speaker_audio(multi_path, duration)
+        corpus.append({'path': multi_path, 'kind': 'multi', 'duration': duration})
+    return corpus
+
+
+class StageBenchmark:
+    """进程内分阶段基准测试
+
+    直接导入 app.py 的识别流水线（不经过HTTP），分别计时上传写盘、哈希、
+    ffmpeg/进程内解码、VAD、ASR、标点、说话人、分句、各方向翻译和JSON序列化。
+    VAD/ASR/标点/说话人通过包装 AutoModel.inference 按调用的子模型区分，
+    generate 中其余耗时（说话人聚类、结果合并等）计入 generate_other。
+    """
+    
+    def __init__(self, app_args: str = "", translation_cache: bool = False):
+        # app.configure() 从 ASTROMAO_ARGS 读取启动参数
+        os.environ["ASTROMAO_ARGS"] = app_args
+        import app as pipeline
+        pipeline.configure()
+        self.app = pipeline
+        self.translation_cache = translation_cache
+        self.model = None
+        self._timings = None
+    
+    def load_models(self):
+        """加载模型并安装计时包装"""
+        print("加载模型...")
+        self.app.model_registry.load_all()
+        if not self.app.model_registry.ready:
+            raise RuntimeError("识别模型加载失败")
+        for name, info in self.app.model_registry.stats()['models'].items():
+            if info['load_s'] is not None:
+                print(f"  {name}: {info['state']} ({info['load_s']:.2f}s)")
+        self.model = self.app.model_registry.get("asr")
+        self._wrap_inference(self.model)
+        self._wrap_translation(self.app.translator)
+        if not self.translation_cache:
+            # 关闭翻译缓存，重复运行时测到的是模型耗时而不是缓存命中
+            self.app.translator.cache = None
+    
+    def _record(self, stage: str, elapsed: float):
+        if self._timings is not None:
+            self._timings[stage] = self._timings.get(stage, 0.0) + elapsed
+    
+    def _wrap_inference(self, model):
+        """按传入的子模型把 AutoModel.inference 的耗时归入 vad/asr/punctuation/speaker"""
+        original = model.inference
+        sub_models = {}
+        for attr, stage in (('vad_model', 'vad'), ('punc_model', 'punctuation'), ('spk_model', 'speaker')):
+            sub_model = getattr(model, attr, None)
+            if sub_model is not None:
+                sub_models[id(sub_model)] = stage
+        
+        def timed_inference(*args, **kwargs):
+            # AutoModel.inference(input, input_len=None, model=None, kwargs=None, ...)
+            sub_model = kwargs.get('model', args[2] if len(args) > 2 else None)
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self._record(sub_models.get(id(sub_model), 'asr'), time.perf_counter() - started)
+        
+        model.inference = timed_inference
+    
+    def _wrap_translation(self, translator):
+        """按翻译方向计时 translate_batch"""
+        original = translator.translate_batch
+        
+        def timed_translate_batch(texts, source_lang, target_lang):
+            started = time.perf_counter()
+            try:
+                return original(texts, source_lang, target_lang)
+            finally:
+                self._record(f"translate_{source_lang}_{target_lang}", time.perf_counter() - started)
+        
+        translator.translate_batch = timed_translate_batch
+    
+    async def run_file(self, file_path: str) -> Dict[str, Any]:
+        """完整跑一遍识别流水线，返回音频时长和各阶段耗时（秒）"""
+        app = self.app
+        timings = self._timings = {}
+        suffix = file_path.rsplit('.', 1)[-1].lower()
+        upload_path = os.path.join(app.args.temp_dir, f"bench_{uuid.uuid4().hex}.{suffix}")
+        try:
+            started = time.perf_counter()
+            with open(file_path, 'rb') as src, open(upload_path, 'wb') as dst:
+                while True:
+                    chunk = src.read(app.UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+            timings['upload_write'] = time.perf_counter() - started
+            
+            started = time.perf_counter()
+            md5 = hashlib.md5()
+            with open(upload_path, 'rb') as f:
+                while True:
+                    chunk = f.read(app.UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    md5.update(chunk)
+            audio_hash = md5.hexdigest()
+            timings['hash'] = time.perf_counter() - started
+            
+            started = time.perf_counter()
+            decoder = app.StreamingDecoder(upload_path)
+            try:
+                await decoder.end_input()
+                pcm = await decoder.read_all()
+            finally:
+                decoder.abort()
+            timings['decode_ffmpeg'] = time.perf_counter() - started
+            
+            if suffix in app.NATIVE_DECODE_FORMATS:
+                started = time.perf_counter()
+                if app.decode_native(upload_path, suffix) is not None:
+                    timings['decode_native'] = time.perf_counter() - started
+        finally:
+            if os.path.exists(upload_path):
+                os.remove(upload_path)
+        
+        started = time.perf_counter()
+        rec_results = app.run_asr(pcm, self.model)
+        generate_time = time.perf_counter() - started
+        timings['generate_other'] = max(0.0, generate_time - sum(
+            timings.get(stage, 0.0) for stage in ('vad', 'asr', 'punctuation', 'speaker')
+        ))
+        
+        started = time.perf_counter()
+        if rec_results:
+            text, sentences, speakers = app.build_sentences(rec_results[0])
+        else:
+            text, sentences, speakers = "", [], set()
+        build_time = time.perf_counter() - started
+        timings['sentence_build'] = max(0.0, build_time - timings.get('translate_zh_en', 0.0)
+                                        - timings.get('translate_en_zh', 0.0))
+        
+        response = app.build_response(text, sentences, speakers, audio_hash, os.path.basename(file_path), {})
+        started = time.perf_counter()
+        json.dumps(response, ensure_ascii=False)
+        timings['json_serialize'] = time.perf_counter() - started
+        
+        # total 为实际服务路径的耗时，不含备选的进程内解码和下面的示例翻译
+        timings['total'] = sum(value for stage, value in timings.items() if stage != 'decode_native')
+        
+        # 识别内容没有用到的翻译方向用示例句子计时，记入 sample_stages，不属于该文件的处理耗时
+        sample_stages = []
+        for (source_lang, target_lang), samples in TRANSLATION_SAMPLES.items():
+            if f"translate_{source_lang}_{target_lang}" not in timings:
+                app.translator.translate_batch(samples, source_lang, target_lang)
+                sample_stages.append(f"translate_{source_lang}_{target_lang}")
+        
+        self._timings = None
+        return {
+            'audio_duration': len(pcm) / app.PCM_BYTES_PER_SECOND,
+            'sentences': len(sentences),
+            'speakers': len(speakers),
+            'timings': timings,
+            'sample_stages': sample_stages,
+            'transcript': text,
+            'translations': {
+                lang: ('' if lang == 'zh' else ' ').join(s['translation'][lang] for s in sentences)
+                for lang in ('zh', 'en')
+            },
+        }
+    
+    async def run(self, corpus: List[Dict[str, Any]], repeat: int = 3, warmup: int = 1) -> List[Dict[str, Any]]:
+        """每个文件先预热 warmup 次（不计入结果），再正式运行 repeat 次"""
+        results = []
+        for item in corpus:
+            for run_index in range(warmup + repeat):
+                run = await self.run_file(item['path'])
+                if run_index < warmup:
+                    continue
+                run.update(file_path=item['path'], kind=item.get('kind', 'file'),
+                           duration_group=item.get('duration'), run=run_index - warmup)
+                results.append(run)
+                print(f"  {os.path.basename(item['path'])} #{run_index - warmup + 1}: "
+                      f"{run['timings']['total']:.3f}s, RTF {run['timings']['total'] / max(run['audio_duration'], 1e-6):.3f}")
+        return results
+    
+    @staticmethod
+    def analyze(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """按阶段汇总耗时和RTF（阶段耗时 / 音频时长）的百分位数，并按音频时长分组"""
+        def stage_summary(runs):
+            summary = {}
+            for stage in PIPELINE_STAGES:
+                samples = [run for run in runs if stage in run['timings']]
+                if not samples:
+                    continue
+                summary[stage] = {
+                    'seconds': summarize([run['timings'][stage] for run in samples]),
+                    'rtf': summarize([run['timings'][stage] / max(run['audio_duration'], 1e-6) for run in samples]),
+                }
+            return summary
+        
+        groups = defaultdict(list)
+        for run in results:
+            groups[str(run['duration_group'] or round(run['audio_duration']))].append(run)
+        return {
+            'runs': len(results),
+            'audio_seconds': sum(run['audio_duration'] for run in results),
+            'stages': stage_summary(results),
+            'by_duration': {group: stage_summary(runs) for group, runs in sorted(groups.items(), key=lambda g: float(g[0]))},
+        }
+    
+    @staticmethod
+    def print_analysis(analysis: Dict[str, Any]):
+        """打印各阶段耗时和RTF的百分位数"""
+        def print_table(title, stages):
+            print(f"\n{title}")
+            print(f"  {'阶段':<16}{'样本':>6}{'p50(s)':>10}{'p95(s)':>10}{'p99(s)':>10}"
+                  f"{'RTF p50':>10}{'RTF p95':>10}{'RTF p99':>10}")
+            for stage, summary in stages.items():
+                seconds, rtf = summary['seconds'], summary['rtf']
+                print(f"  {stage:<16}{seconds['count']:>6}{seconds['p50']:>10.4f}{seconds['p95']:>10.4f}"
+                      f"{seconds['p99']:>10.4f}{rtf['p50']:>10.4f}{rtf['p95']:>10.4f}{rtf['p99']:>10.4f}")
+        
+        print("\n" + "="*60)
+        print("AstroMao 分阶段性能报告")
+        print("="*60)
+        print(f"  运行次数: {analysis['runs']}, 音频总时长: {analysis['audio_seconds']:.1f} 秒")
+        print_table("📊 全部音频:", analysis['stages'])
+        for group, stages in analysis['by_duration'].items():
+            print_table(f"⏱  {group} 秒音频:", stages)
+        print("\n" + "="*60)
+
+
+async def run_stage_benchmark(args):
+    """stages 子命令：生成合成语料（或使用指定文件），进程内分阶段计时"""
+    benchmark = StageBenchmark(args.app_args, args.translation_cache)
+    benchmark.load_models()
+    
+    with tempfile.TemporaryDirectory(prefix="astromao_bench_") as corpus_dir:
+        if args.files:
+            corpus = [{'path': f, 'kind': 'file', 'duration': None} for f in args.files]
+        else:
+            print(f"生成合成语料: {args.durations} 秒")
+            corpus = generate_corpus(corpus_dir, args.durations)
+        
+        print(f"\n开始分阶段测试 (重复 {args.repeat} 次, 预热 {args.warmup} 次)...")
+        start_time = time.time()
+        results = await benchmark.run(corpus, args.repeat, args.warmup)
+    
+    analysis = benchmark.analyze(results)
+    benchmark.print_analysis(analysis)
+    
+    if args.output:
+        output_data = {
+            'mode': 'stages',
+            'timestamp': time.time(),
+            'test_duration': time.time() - start_time,
+            'configuration': {
+                'app_args': args.app_args,
+                'durations': args.durations,
+                'files': args.files,
+                'repeat': args.repeat,
+                'warmup': args.warmup,
+                'translation_cache': args.translation_cache,
+                'settings': vars(benchmark.app.args),
+            },
+            'analysis': analysis,
+            'raw_results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        print(f"\n详细结果已保存到: {args.output}")
+
+
+# 负载测试的请求类型：short/long 为短/长音频识别，translate 为纯翻译，results 为历史记录列表
+LOAD_OPERATIONS = ('short', 'long', 'translate', 'results')
+
+# translate 请求随机使用的文本
+LOAD_TRANSLATE_TEXTS = [text for samples in TRANSLATION_SAMPLES.values() for text in samples]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """解析负载配比，如 "short=5,long=1,translate=3,results=1"，返回归一化的权重"""
+    weights = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in LOAD_OPERATIONS:
+            raise ValueError(f"未知的请求类型: {name}，可选: {', '.join(LOAD_OPERATIONS)}")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("负载配比的权重之和必须大于0")
+    return {name: weight / total for name, weight in weights.items() if weight > 0}
+
+
+def parse_schedule(steps: Optional[List[str]], rate: float, duration: float,
+                   ramp_up: float) -> List[Dict[str, float]]:
+    """生成到达率计划，每段为 {duration, start_rate, end_rate}（请求/秒）
+
+    指定 steps（如 ["30:1", "30:2", "30:4"]，每段 时长:速率）时按阶梯加压；
+    否则先在 ramp_up 秒内从0线性升到 rate，再保持 duration 秒。
+    """
+    if steps:
+        schedule = []
+        for step in steps:
+            seconds, _, step_rate = step.partition(':')
+            schedule.append({'duration': float(seconds), 'start_rate': float(step_rate),
+                             'end_rate': float(step_rate)})
+        return schedule
+    schedule = []
+    if ramp_up > 0:
+        schedule.append({'duration': ramp_up, 'start_rate': 0.0, 'end_rate': rate})
+    schedule.append({'duration': duration, 'start_rate': rate, 'end_rate': rate})
+    return schedule
+
+
+def rate_at(schedule: List[Dict[str, float]], t: float) -> Optional[float]:
+    """返回 t 秒时的目标到达率，计划结束后返回 None"""
+    offset = 0.0
+    for segment in schedule:
+        if t < offset + segment['duration']:
+            progress = (t - offset) / segment['duration']
+            return segment['start_rate'] + (segment['end_rate'] - segment['start_rate']) * progress
+        offset += segment['duration']
+    return None
+
+
+def arrival_times(schedule: List[Dict[str, float]], arrival: str, rng: random.Random):
+    """按到达率计划生成请求到达时刻（秒）
+
+    每段内到达率线性变化，累计请求量 Λ(τ) = r0·τ + (r1 - r0)·τ²/(2D)。
+    恒定到达每累计1个请求发出一次，泊松到达的间隔服从指数分布，
+    都在累计量上取间隔再反解出时刻，加压阶段的间隔也能随速率连续变化。
+    """
+    offset = 0.0
+    need = 1.0 if arrival == 'constant' else rng.expovariate(1.0)
+    for segment in schedule:
+        duration, r0, r1 = segment['duration'], segment['start_rate'], segment['end_rate']
+        used = 0.0  # 本段已消耗的累计请求量
+        while True:
+            target = used + need
+            if target > (r0 + r1) * duration / 2:
+                need = target - (r0 + r1) * duration / 2
+                break
+            slope = (r1 - r0) / duration
+            if abs(slope) < 1e-12:
+                tau = target / r0
+            else:
+                tau = (-r0 + math.sqrt(r0 * r0 + 2 * slope * target)) / slope
+            yield offset + tau
+            used = target
+            need = 1.0 if arrival == 'constant' else rng.expovariate(1.0)
+        offset += duration
+
+
+class LoadGenerator:
+    """开环负载生成器
+
+    请求按泊松或恒定到达过程发出，不等待前面的请求完成，因此能测出持续负载下的
+    排队和饱和点，而不是一次性突发。延迟从计划到达时刻算起，客户端发送不及时
+    造成的延迟也计入，避免协调遗漏。
+    """
+    
+    def __init__(self, server_url: str, mix: Dict[str, float], audio_files: Dict[str, str],
+                 arrival: str = 'poisson', timeout: float = 600, max_in_flight: int = 1000, seed: Optional[int] = None,
+                 warm_cache: bool = False):
+        self.server_url = server_url
+        self.warm_cache = warm_cache
+        self.mix = mix
+        self.audio = {}
+        for name, path in audio_files.items():
+            with open(path, 'rb') as f:
+                self.audio[name] = (os.path.basename(path), f.read())
+        self.arrival = arrival
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.random = random.Random(seed)
+        self.in_flight = 0
+        self.results = []
+    
+    async def _request(self, session: aiohttp.ClientSession, operation: str):
+        """发送一个请求，返回 (HTTP状态码, 错误信息)"""
+        if operation in ('short', 'long'):
+            filename, content = self.audio[operation]
+            data = aiohttp.FormData()
+            data.add_field('audio', content, filename=filename)
+            async with session.post(f"{self.server_url}/api/recognize", data=data,
+                                    params=recognize_params(self.warm_cache)) as response:
+                body = await response.read()
+        elif operation == 'translate':
+            payload = {'text': self.random.choice(LOAD_TRANSLATE_TEXTS), 'target_lang': 'auto'}
+            async with session.post(f"{self.server_url}/api/translate", json=payload) as response:
+                body = await response.read()
+        else:
+            async with session.get(f"{self.server_url}/api/results", params={'limit': 20}) as response:
+                body = await response.read()
+        if response.status != 200:
+            return response.status, body.decode('utf-8', 'replace')[:200]
+        if operation == 'translate' and not json.loads(body).get('success', False):
+            return response.status, json.loads(body).get('error', 'translation failed')
+        return response.status, None
+    
+    async def _fire(self, session: aiohttp.ClientSession, operation: str, scheduled: float, origin: float):
+        record = {'operation': operation, 'scheduled_at': scheduled}
+        try:
+            status, error = await self._request(session, operation)
+            record.update(status=status, success=error is None, error=error)
+        except asyncio.TimeoutError:
+            record.update(status=None, success=False, error='timeout')
+        except Exception as e:
+            record.update(status=None, success=False, error=f"{type(e).__name__}: {e}")
+        finally:
+            self.in_flight -= 1
+        record['completed_at'] = time.perf_counter() - origin
+        record['latency'] = record['completed_at'] - scheduled
+        self.results.append(record)
+    
+    async def run(self, schedule: List[Dict[str, float]]) -> List[Dict[str, Any]]:
+        """按到达率计划发出请求，计划结束后等待所有在途请求完成"""
+        operations = list(self.mix)
+        weights = [self.mix[name] for name in operations]
+        tasks = []
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            origin = time.perf_counter()
+            for t in arrival_times(schedule, self.arrival, self.random):
+                delay = origin + t - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                operation = self.random.choices(operations, weights)[0]
+                if self.in_flight >= self.max_in_flight:
+                    # 客户端自身的保护上限，记为失败而不是推迟发送，保持开环
+                    self.results.append({'operation': operation, 'scheduled_at': t, 'completed_at': t,
+                                         'latency': 0.0, 'status': None, 'success': False,
+                                         'error': 'client max in-flight reached'})
+                    continue
+                self.in_flight += 1
+                tasks.append(asyncio.ensure_future(self._fire(session, operation, t, origin)))
+            if tasks:
+                print(f"已发出 {len(tasks)} 个请求，等待 {self.in_flight} 个在途请求完成...")
+                await asyncio.gather(*tasks)
+        return sorted(self.results, key=lambda r: r['scheduled_at'])
+    
+    @staticmethod
+    def analyze(results: List[Dict[str, Any]], schedule: List[Dict[str, float]], window: float) -> Dict[str, Any]:
+        """汇总整体和各请求类型的延迟百分位数、错误率、吞吐量，并按时间窗口统计"""
+        planned = sum(segment['duration'] for segment in schedule)
+        elapsed = max([r['completed_at'] for r in results] + [planned])
+        
+        def summary(records, seconds):
+            succeeded = [r for r in records if r['success']]
+            return {
+                'requests': len(records),
+                'succeeded': len(succeeded),
+                'errors': len(records) - len(succeeded),
+                'error_rate': (len(records) - len(succeeded)) / len(records) if records else 0.0,
+                'rejected_503': sum(1 for r in records if r['status'] == 503),
+                'offered_rps': len(records) / seconds if seconds else 0.0,
+                'throughput_rps': len(succeeded) / seconds if seconds else 0.0,
+                'latency': summarize([r['latency'] for r in succeeded]),
+            }
+        
+        timeline = []
+        for index in range(int(math.ceil(planned / window))):
+            start, end = index * window, min((index + 1) * window, planned)
+            arrived = [r for r in results if start <= r['scheduled_at'] < end]
+            completed = [r for r in results if start <= r['completed_at'] < end and r['success']]
+            entry = summary(arrived, end - start)
+            # 吞吐量按该窗口内完成的请求计算，延迟和错误率按该窗口内到达的请求计算
+            entry['throughput_rps'] = len(completed) / (end - start)
+            entry.update(start=start, end=end, target_rps=rate_at(schedule, (start + end) / 2) or 0.0)
+            timeline.append(entry)
+        
+        errors = defaultdict(int)
+        for record in results:
+            if not record['success']:
+                errors[record['error'] if record['status'] is None else f"HTTP {record['status']}"] += 1
+        return {
+            'planned_seconds': planned,
+            'elapsed_seconds': elapsed,
+            'overall': summary(results, planned),
+            'by_operation': {
+                operation: summary([r for r in results if r['operation'] == operation], planned)
+                for operation in LOAD_OPERATIONS if any(r['operation'] == operation for r in results)
+            },
+            'timeline': timeline,
+            'errors': dict(errors),
+        }
+    
+    @staticmethod
+    def print_analysis(analysis: Dict[str, Any]):
+        """打印整体结果、各请求类型结果和时间线"""
+        overall = analysis['overall']
+        print("\n" + "="*60)
+        print("AstroMao 负载测试报告")
+        print("="*60)
+        print(f"\n📊 整体:")
+        print(f"  请求数: {overall['requests']}, 成功: {overall['succeeded']}, "
+              f"错误率: {overall['error_rate'] * 100:.1f}% (503: {overall['rejected_503']})")
+        print(f"  发送速率: {overall['offered_rps']:.2f} req/s, 吞吐量: {overall['throughput_rps']:.2f} req/s")
+        if overall['latency']['count']:
+            latency = overall['latency']
+            print(f"  延迟 (秒): p50 {latency['p50']:.3f}, p95 {latency['p95']:.3f}, p99 {latency['p99']:.3f}")
+        
+        print(f"\n📋 各请求类型:")
+        for operation, summary in analysis['by_operation'].items():
+            latency = summary['latency']
+            latency_text = (f"p50 {latency['p50']:.3f}s, p95 {latency['p95']:.3f}s, p99 {latency['p99']:.3f}s"
+                            if latency['count'] else "无成功请求")
+            print(f"  {operation:<10} {summary['requests']:>6} 次, 错误率 {summary['error_rate'] * 100:5.1f}%, {latency_text}")
+        
+        print(f"\n⏱  时间线:")
+        print(f"  {'时间(s)':<14}{'目标':>8}{'发送':>8}{'吞吐':>8}{'错误率':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for entry in analysis['timeline']:
+            latency = entry['latency']
+            percentiles = (f"{latency['p50']:>9.3f}{latency['p95']:>9.3f}{latency['p99']:>9.3f}"
+                           if latency['count'] else f"{'-':>9}{'-':>9}{'-':>9}")
+            print(f"  {entry['start']:>5.0f}-{entry['end']:<8.0f}{entry['target_rps']:>8.2f}{entry['offered_rps']:>8.2f}"
+                  f"{entry['throughput_rps']:>8.2f}{entry['error_rate'] * 100:>7.1f}%{percentiles}")
+        
+        if analysis['errors']:
+            print(f"\n❌ 错误信息:")
+            for error, count in analysis['errors'].items():
+                print(f"  {error} (出现 {count} 次)")
+        print("\n" + "="*60)
+
+
+async def run_load_test(args):
+    """load 子命令：按到达率计划对服务发起混合负载"""
+    mix = parse_mix(args.mix)
+    schedule = parse_schedule(args.schedule, args.rate, args.duration, args.ramp_up)
+    
+    with tempfile.TemporaryDirectory(prefix="astromao_load_") as corpus_dir:
+        audio_files = {}
+        if 'short' in mix:
+            audio_files['short'] = args.short_file
+        if 'long' in mix:
+            audio_files['long'] = args.long_file
+        for name, duration in (('short', args.short_duration), ('long', args.long_duration)):
+            if name in audio_files and not audio_files[name]:
+                from sample_audio import generate_test_audio
+                audio_files[name] = os.path.join(corpus_dir, f"{name}_{duration}s.wav")
+                generate_test_audio(audio_files[name], duration)
+        generator = LoadGenerator(args.server, mix, audio_files, args.arrival, args.timeout,
+                                  args.max_in_flight, args.seed, args.warm_cache)
+    
+    planned = sum(segment['duration'] for segment in schedule)
+    print(f"\n开始负载测试: {args.arrival} 到达, 计划 {planned:.0f} 秒, 配比 "
+          + ", ".join(f"{name} {weight * 100:.0f}%" for name, weight in mix.items()))
+    start_time = time.time()
+    results = await generator.run(schedule)
+    
+    analysis = LoadGenerator.analyze(results, schedule, args.window)
+    LoadGenerator.print_analysis(analysis)
+    
+    if args.output:
+        output_data = {
+            'mode': 'load',
+            'timestamp': start_time,
+            'test_duration': time.time() - start_time,
+            'configuration': {
+                'server_url': args.server,
+                'arrival': args.arrival,
+                'schedule': schedule,
+                'mix': mix,
+                'window': args.window,
+                'short_duration': args.short_duration if not args.short_file else None,
+                'long_duration': args.long_duration if not args.long_file else None,
+                'short_file': args.short_file,
+                'long_file': args.long_file,
+                'seed': args.seed,
+                'warm_cache': args.warm_cache,
+            },
+            'analysis': analysis,
+            'raw_results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        print(f"\n详细结果已保存到: {args.output}")
+
+
+# 扫描的参数：命令行选项 -> (app.py 启动参数, 取值类型)
+SWEEP_PARAMETERS = {
+    'batch_size_s': ('--batch_size_s', int),
+    'merge_length_s': ('--merge_length_s', int),
+    'merge_vad': ('--merge_vad', str),
+    'ncpu': ('--ncpu', int),
+    'torch_threads': ('--torch_threads', int),
+    'num_beams': ('--translation_num_beams', int),
+}
+
+# 计算 CER/WER 前去掉的标点
+TRANSCRIPT_PUNCTUATION = set("，。！？、；：“”‘’（）《》【】…—·,.!?;:\"'()[]<>-")
+
+
+def load_reference_set(manifest: str) -> List[Dict[str, Any]]:
+    """读取参考集，每行一个JSON：{"audio": 路径, "text": 参考转写, "translation": 参考译文, "target_lang": "en"}
+
+    audio 为相对路径时相对于清单文件所在目录，translation 可省略（不计算BLEU）。
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest))
+    items = []
+    with open(manifest, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            item['audio'] = os.path.join(base_dir, item['audio'])
+            item.setdefault('target_lang', 'en')
+            items.append(item)
+    return items
+
+
+def tokenize(text: str, keep_punctuation: bool = False) -> List[str]:
+    """中英混合分词：每个汉字一个词，连续的字母数字为一个词（小写）"""
+    tokens = []
+    word = ''
+    for char in text.lower():
+        is_cjk = '\u4e00' <= char <= '\u9fff'
+        if char.isalnum() and not is_cjk:
+            word += char
+            continue
+        if word:
+            tokens.append(word)
+            word = ''
+        if is_cjk or (keep_punctuation and not char.isspace()):
+            tokens.append(char)
+    if word:
+        tokens.append(word)
+    return tokens
+
+
+def edit_distance(reference: List[str], hypothesis: List[str]) -> int:
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_token in enumerate(reference, 1):
+        current = [i] + [0] * len(hypothesis)
+        for j, hyp_token in enumerate(hypothesis, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_token != hyp_token))
+        previous = current
+    return previous[-1]
+
+
+def error_counts(reference: str, hypothesis: str) -> Dict[str, int]:
+    """返回字符和词的编辑距离及参考长度，CER 按去掉空白和标点的字符计算"""
+    ref_chars = [c for c in reference.lower() if not c.isspace() and c not in TRANSCRIPT_PUNCTUATION]
+    hyp_chars = [c for c in hypothesis.lower() if not c.isspace() and c not in TRANSCRIPT_PUNCTUATION]
+    ref_words, hyp_words = tokenize(reference), tokenize(hypothesis)
+    return {
+        'char_errors': edit_distance(ref_chars, hyp_chars), 'chars': len(ref_chars),
+        'word_errors': edit_distance(ref_words, hyp_words), 'words': len(ref_words),
+    }
+
+
+def corpus_bleu(references: List[str], hypotheses: List[str], max_n: int = 4) -> float:
+    """语料级 BLEU（0~100），4-gram、带长度惩罚，中文按字切分"""
+    matches = [0] * max_n
+    totals = [0] * max_n
+    ref_length = hyp_length = 0
+    for reference, hypothesis in zip(references, hypotheses):
+        ref_tokens, hyp_tokens = tokenize(reference, True), tokenize(hypothesis, True)
+        ref_length += len(ref_tokens)
+        hyp_length += len(hyp_tokens)
+        for n in range(1, max_n + 1):
+            ref_counts = defaultdict(int)
+            for i in range(len(ref_tokens) - n + 1):
+                ref_counts[tuple(ref_tokens[i:i + n])] += 1
+            for i in range(len(hyp_tokens) - n + 1):
+                gram = tuple(hyp_tokens[i:i + n])
+                if ref_counts[gram] > 0:
+                    ref_counts[gram] -= 1
+                    matches[n - 1] += 1
+            totals[n - 1] += max(0, len(hyp_tokens) - n + 1)
+    if hyp_length == 0 or min(matches) == 0:
+        return 0.0
+    log_precision = sum(math.log(m / t) for m, t in zip(matches, totals)) / max_n
+    brevity = min(0.0, 1 - ref_length / hyp_length)
+    return 100 * math.exp(log_precision + brevity)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程的内存峰值（MB）"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为KB，macOS 上为字节
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+async def run_sweep_point(args):
+    """sweep-point 子命令（由 sweep 调用）：在独立进程中用一组参数跑完参考集"""
+    benchmark = StageBenchmark(args.app_args)
+    benchmark.load_models()
+    reference_set = load_reference_set(args.reference)
+    corpus = [{'path': item['audio'], 'kind': 'reference', 'duration': None} for item in reference_set]
+    results = await benchmark.run(corpus, args.repeat, args.warmup)
+    
+    counts = defaultdict(int)
+    references, hypotheses = [], []
+    for item in reference_set:
+        run = next(r for r in results if r['file_path'] == item['audio'])
+        for key, value in error_counts(item['text'], run['transcript']).items():
+            counts[key] += value
+        if item.get('translation'):
+            references.append(item['translation'])
+            hypotheses.append(run['translations'].get(item['target_lang'], ''))
+    
+    audio_seconds = sum(run['audio_duration'] for run in results)
+    totals = [run['timings']['total'] for run in results]
+    translate_seconds = sum(value for run in results for stage, value in run['timings'].items()
+                            if stage.startswith('translate_') and stage not in run['sample_stages'])
+    output = {
+        'rtf': sum(totals) / audio_seconds if audio_seconds else None,
+        'translation_rtf': translate_seconds / audio_seconds if audio_seconds else None,
+        'seconds': summarize(totals),
+        'cer': counts['char_errors'] / counts['chars'] if counts['chars'] else None,
+        'wer': counts['word_errors'] / counts['words'] if counts['words'] else None,
+        'bleu': corpus_bleu(references, hypotheses) if references else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'model_load_s': benchmark.app.model_registry.stats()['loading_s'],
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False)
+
+
+def pareto_front(points: List[Dict[str, Any]]) -> List[int]:
+    """返回帕累托最优配置的下标：RTF、CER、内存越小越好，BLEU 越大越好，
+    没有其他配置在所有指标上都不差且至少一项更好
+
+    只在可用指标（不为 None）相同的配置之间比较，缺少某项指标的配置不会因为
+    其余指标更好而淘汰有该指标的配置。
+    """
+    def objectives(point):
+        return (point['rtf'], point['cer'], point['peak_rss_mb'],
+                -point['bleu'] if point['bleu'] is not None else None)
+    
+    def dominates(a, b):
+        pairs = list(zip(objectives(a), objectives(b)))
+        if any((x is None) != (y is None) for x, y in pairs):
+            return False
+        pairs = [(x, y) for x, y in pairs if x is not None]
+        return all(x <= y for x, y in pairs) and any(x < y for x, y in pairs)
+    
+    valid = [i for i, point in enumerate(points) if point.get('rtf') is not None]
+    return [i for i in valid if not any(dominates(points[j], points[i]) for j in valid if j != i)]
+
+
+def render_sweep_table(points: List[Dict[str, Any]], parameters: List[str], front: List[int]) -> List[List[str]]:
+    """帕累托表格：最优配置在前，各组内按RTF排序"""
+    def fmt(value, pattern):
+        return pattern.format(value) if value is not None else '-'
+    
+    order = sorted(range(len(points)), key=lambda i: (i not in front, points[i].get('rtf') or float('inf')))
+    rows = []
+    for i in order:
+        point = points[i]
+        rows.append(['★' if i in front else ''] + [str(point['params'][name]) for name in parameters] + [
+            fmt(point.get('rtf'), '{:.4f}'), fmt(point.get('cer'), '{:.2%}'), fmt(point.get('wer'), '{:.2%}'),
+            fmt(point.get('bleu'), '{:.1f}'), fmt(point.get('peak_rss_mb'), '{:.0f}'),
+            point.get('error') or '',
+        ])
+    return rows
+
+
+SWEEP_RESULT_HEADERS = ['RTF', 'CER', 'WER', 'BLEU', '内存峰值MB', '错误']
+
+
+def run_sweep(args):
+    """sweep 子命令：对参数网格的每个组合在独立进程中跑参考集，输出帕累托表"""
+    import itertools
+    import subprocess
+    
+    grid = {name: getattr(args, name) for name in SWEEP_PARAMETERS if getattr(args, name)}
+    if not grid:
+        print("错误: 至少指定一个要扫描的参数，如 --batch-size-s 60 300 --num-beams 1 4")
+        sys.exit(2)
+    parameters = list(grid)
+    combinations = list(itertools.product(*grid.values()))
+    print(f"参数网格: {len(combinations)} 个组合，参考集: {args.reference}")
+    
+    points = []
+    with tempfile.TemporaryDirectory(prefix="astromao_sweep_") as work_dir:
+        for index, values in enumerate(combinations):
+            params = dict(zip(parameters, values))
+            app_args = shlex.split(args.app_args) + [
+                f"{SWEEP_PARAMETERS[name][0]}={value}" for name, value in params.items()
+            ]
+            output_path = os.path.join(work_dir, f"point_{index}.json")
+            print(f"\n[{index + 1}/{len(combinations)}] {params}")
+            # 每个组合单独起进程：模型按新参数重新加载，内存峰值互不影响
+            command = [sys.executable, os.path.abspath(__file__), "sweep-point",
+                       "--reference", args.reference, "--app-args", shlex.join(app_args),
+                       "--repeat", str(args.repeat), "--warmup", str(args.warmup), "--output", output_path]
+            completed = subprocess.run(command)
+            point = {'params': params, 'app_args': shlex.join(app_args)}
+            if completed.returncode == 0 and os.path.exists(output_path):
+                with open(output_path, 'r', encoding='utf-8') as f:
+                    point.update(json.load(f))
+            else:
+                point.update(rtf=None, cer=None, wer=None, bleu=None, peak_rss_mb=None,
+                             error=f"exit code {completed.returncode}")
+            points.append(point)
+    
+    front = pareto_front(points)
+    for i, point in enumerate(points):
+        point['pareto'] = i in front
+    headers = [''] + parameters + SWEEP_RESULT_HEADERS
+    rows = render_sweep_table(points, parameters, front)
+    
+    print("\n" + "="*60)
+    print("AstroMao 参数扫描结果（★ 为帕累托最优）")
+    print("="*60)
+    widths = [max(len(str(cell)) for cell in column) + 2 for column in zip(headers, *rows)]
+    for row in [headers] + rows:
+        print("".join(str(cell).rjust(width) for cell, width in zip(row, widths)))
+    print("\n" + "="*60)
+    
+    if args.report:
+        lines = ["# AstroMao 参数扫描", "", f"- 参考集: `{args.reference}`",
+                 f"- 基础参数: `{args.app_args or '(默认)'}`", "- ★ 为帕累托最优（RTF、CER、内存越小越好，BLEU越大越好）", "",
+                 "| " + " | ".join(headers) + " |", "|" + "---|" * len(headers)]
+        lines += ["| " + " | ".join(row) + " |" for row in rows]
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"报告已保存到: {args.report}")
+    
+    if args.output:
+        output_data = {
+            'mode': 'sweep',
+            'timestamp': time.time(),
+            'configuration': {
+                'reference': args.reference,
+                'app_args': args.app_args,
+                'grid': grid,
+                'repeat': args.repeat,
+                'warmup': args.warmup,
+            },
+            'points': points,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        print(f"\n详细结果已保存到: {args.output}")
+
+
+# 基线目录，baseline save 保存的结果按名称存放在这里
+DEFAULT_BASELINE_DIR = "benchmark_baselines"
+
+# 对比的统计量，均为越小越好
+COMPARE_STATISTICS = ('p50', 'p95', 'p99')
+
+
+def result_mode(data: Dict[str, Any]) -> str:
+    """结果文件的测试类型，不带子命令的端到端测试没有 mode 字段"""
+    return data.get('mode', 'recognize')
+
+
+def extract_metrics(data: Dict[str, Any]):
+    """从结果文件中提取可对比的指标
+
+    返回 (samples, scalars)：samples 为 指标名 -> 原始样本列表（秒，越小越好），
+    用于分位数对比和显著性检验；scalars 为错误率、吞吐量等只有一个值的指标。
+    """
+    mode = result_mode(data)
+    results = data.get('raw_results', [])
+    samples = defaultdict(list)
+    scalars = {}
+    if mode == 'stages':
+        for run in results:
+            for stage, seconds in run['timings'].items():
+                samples[f"stage.{stage}"].append(seconds)
+            samples['rtf.total'].append(run['timings']['total'] / max(run['audio_duration'], 1e-6))
+    elif mode == 'load':
+        for record in results:
+            if record['success']:
+                samples[f"latency.{record['operation']}"].append(record['latency'])
+                samples['latency.all'].append(record['latency'])
+        overall = data['analysis']['overall']
+        scalars['error_rate'] = overall['error_rate']
+        scalars['throughput_rps'] = overall['throughput_rps']
+    else:
+        succeeded = [r for r in results if r.get('success')]
+        samples['request_time'] = [r['request_time'] for r in succeeded]
+        samples['rtf'] = [r['rtf'] for r in succeeded]
+        scalars['error_rate'] = (len(results) - len(succeeded)) / len(results) if results else 0.0
+    return dict(samples), scalars
+
+
+def mann_whitney_greater(baseline: List[float], current: List[float]) -> float:
+    """单侧 Mann-Whitney U 检验，返回"当前样本整体大于基线样本"的 p 值
+
+    使用带结校正和连续性校正的正态近似，样本很少时结果只作参考。
+    """
+    n1, n2 = len(current), len(baseline)
+    combined = sorted([(value, 0) for value in current] + [(value, 1) for value in baseline])
+    ranks = [0.0] * len(combined)
+    tie_term = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tie_term += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def bootstrap_changes(baseline: List[float], current: List[float], iterations: int,
+                      confidence: float, rng: random.Random) -> Dict[str, tuple]:
+    """对两组样本分别有放回重采样，返回各统计量相对变化的置信区间 {statistic: (low, high)}"""
+    changes = {statistic: [] for statistic in COMPARE_STATISTICS}
+    for _ in range(iterations):
+        base_sample = sorted(rng.choices(baseline, k=len(baseline)))
+        current_sample = sorted(rng.choices(current, k=len(current)))
+        for statistic in COMPARE_STATISTICS:
+            q = float(statistic[1:])
+            base_value = percentile(base_sample, q)
+            if base_value > 0:
+                changes[statistic].append(percentile(current_sample, q) / base_value - 1)
+    tail = (1 - confidence) / 2 * 100
+    return {
+        statistic: (percentile(values, tail), percentile(values, 100 - tail)) if values else None
+        for statistic, values in changes.items()
+    }
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1,
+                    alpha: float = 0.05, max_error_rate_increase: float = 0.01,
+                    iterations: int = 1000, seed: Optional[int] = 0) -> List[Dict[str, Any]]:
+    """逐指标、逐分位数对比当前结果和基线
+
+    某个分位数变慢超过 threshold（相对值）且自助法置信区间不包含0时判为回归，
+    变快超过 threshold 且显著时判为改进；任一侧样本少于2个时无法判断显著性。
+    错误率按绝对增量、吞吐量按相对下降判断。
+    """
+    rng = random.Random(seed)
+    base_samples, base_scalars = extract_metrics(baseline)
+    current_samples, current_scalars = extract_metrics(current)
+    rows = []
+    for metric in sorted(set(base_samples) & set(current_samples)):
+        base_values, current_values = base_samples[metric], current_samples[metric]
+        if not base_values or not current_values:
+            continue
+        enough = len(base_values) >= 2 and len(current_values) >= 2
+        p_value = mann_whitney_greater(base_values, current_values) if enough else None
+        intervals = bootstrap_changes(base_values, current_values, iterations, 1 - alpha, rng) if enough else {}
+        for statistic in COMPARE_STATISTICS:
+            q = float(statistic[1:])
+            base_value, current_value = percentile(base_values, q), percentile(current_values, q)
+            change = current_value / base_value - 1 if base_value > 0 else 0.0
+            interval = intervals.get(statistic)
+            if interval is None:
+                status = 'insufficient' if abs(change) > threshold else 'unchanged'
+            elif change > threshold and interval[0] > 0:
+                status = 'regression'
+            elif change < -threshold and interval[1] < 0:
+                status = 'improvement'
+            else:
+                status = 'unchanged'
+            rows.append({
+                'metric': metric, 'statistic': statistic,
+                'baseline': base_value, 'current': current_value, 'change': change,
+                'ci': interval, 'p_value': p_value,
+                'samples': (len(base_values), len(current_values)), 'status': status,
+            })
+    if 'error_rate' in base_scalars and 'error_rate' in current_scalars:
+        increase = current_scalars['error_rate'] - base_scalars['error_rate']
+        rows.append({
+            'metric': 'error_rate', 'statistic': 'value',
+            'baseline': base_scalars['error_rate'], 'current': current_scalars['error_rate'], 'change': increase,
+            'ci': None, 'p_value': None, 'samples': None,
+            'status': 'regression' if increase > max_error_rate_increase
+            else 'improvement' if increase < -max_error_rate_increase else 'unchanged',
+        })
+    if 'throughput_rps' in base_scalars and 'throughput_rps' in current_scalars and base_scalars['throughput_rps'] > 0:
+        change = current_scalars['throughput_rps'] / base_scalars['throughput_rps'] - 1
+        rows.append({
+            'metric': 'throughput_rps', 'statistic': 'value',
+            'baseline': base_scalars['throughput_rps'], 'current': current_scalars['throughput_rps'], 'change': change,
+            'ci': None, 'p_value': None, 'samples': None,
+            'status': 'regression' if change < -threshold else 'improvement' if change > threshold else 'unchanged',
+        })
+    return rows
+
+
+COMPARE_STATUS_LABELS = {
+    'regression': '❌ 回归',
+    'improvement': '✅ 改进',
+    'unchanged': '持平',
+    'insufficient': '⚠️ 样本不足',
+}
+
+
+def format_comparison_row(row: Dict[str, Any]) -> List[str]:
+    """把一行对比结果格式化为表格单元格"""
+    if row['metric'] == 'error_rate':
+        values = [f"{row['baseline'] * 100:.2f}%", f"{row['current'] * 100:.2f}%", f"{row['change'] * 100:+.2f}pp"]
+    elif row['metric'] == 'throughput_rps':
+        values = [f"{row['baseline']:.2f}", f"{row['current']:.2f}", f"{row['change'] * 100:+.1f}%"]
+    else:
+        values = [f"{row['baseline']:.4f}", f"{row['current']:.4f}", f"{row['change'] * 100:+.1f}%"]
+    ci = f"[{row['ci'][0] * 100:+.1f}%, {row['ci'][1] * 100:+.1f}%]" if row['ci'] else "-"
+    p_value = f"{row['p_value']:.3f}" if row['p_value'] is not None else "-"
+    return [row['metric'], row['statistic']] + values + [ci, p_value, COMPARE_STATUS_LABELS[row['status']]]
+
+
+COMPARE_HEADERS = ['指标', '统计量', '基线', '当前', '变化', '变化置信区间', 'MW p值', '结论']
+
+
+def render_comparison_markdown(rows: List[Dict[str, Any]], info: Dict[str, Any]) -> str:
+    lines = [
+        "# AstroMao 性能对比报告", "",
+        f"- 基线: `{info['baseline']}`",
+        f"- 当前: `{info['current']}`",
+        f"- 测试类型: {info['mode']}",
+        f"- 回归阈值: {info['threshold'] * 100:.0f}%，显著性水平: {info['alpha']}",
+        f"- 回归: {info['regressions']} 项，改进: {info['improvements']} 项", "",
+        "| " + " | ".join(COMPARE_HEADERS) + " |",
+        "|" + "---|" * len(COMPARE_HEADERS),
+    ]
+    for row in rows:
+        lines.append("| " + " | ".join(format_comparison_row(row)) + " |")
+    return "\n".join(lines) + "\n"
+
+
+def render_comparison_html(rows: List[Dict[str, Any]], info: Dict[str, Any]) -> str:
+    import html
+    colors = {'regression': '#fde2e2', 'improvement': '#e2f5e2', 'insufficient': '#fff6d5'}
+    body = []
+    for row in rows:
+        style = f' style="background:{colors[row["status"]]}"' if row['status'] in colors else ''
+        cells = "".join(f"<td>{html.escape(cell)}</td>" for cell in format_comparison_row(row))
+        body.append(f"<tr{style}>{cells}</tr>")
+    header = "".join(f"<th>{html.escape(cell)}</th>" for cell in COMPARE_HEADERS)
+    return f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>AstroMao 性能对比报告</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: right; }}
+td:first-child, td:nth-child(2), td:last-child {{ text-align: left; }}
+</style>
+</head>
+<body>
+<h1>AstroMao 性能对比报告</h1>
+<ul>
+<li>基线: <code>{html.escape(info['baseline'])}</code></li>
+<li>当前: <code>{html.escape(info['current'])}</code></li>
+<li>测试类型: {html.escape(info['mode'])}</li>
+<li>回归阈值: {info['threshold'] * 100:.0f}%，显著性水平: {info['alpha']}</li>
+<li>回归: {info['regressions']} 项，改进: {info['improvements']} 项</li>
+</ul>
+<table>
+<tr>{header}</tr>
+{chr(10).join(body)}
+</table>
+</body>
+</html>
+"""
+
+
+def resolve_baseline(name: str, baseline_dir: str) -> str:
+    """基线可以是文件路径，也可以是基线目录中保存的名称"""
+    if os.path.isfile(name):
+        return name
+    return os.path.join(baseline_dir, f"{name}.json")
+
+
+def current_git_commit() -> Optional[str]:
+    import subprocess
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_baseline_command(args):
+    """baseline 子命令：把结果文件保存为基线，或列出已保存的基线"""
+    if args.action == 'list':
+        if not os.path.isdir(args.baseline_dir):
+            print(f"基线目录不存在: {args.baseline_dir}")
+            return
+        for filename in sorted(os.listdir(args.baseline_dir)):
+            if not filename.endswith('.json'):
+                continue
+            with open(os.path.join(args.baseline_dir, filename), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            meta = data.get('baseline', {})
+            saved_at = time.strftime('%Y-%m-%d %H:%M', time.localtime(meta.get('saved_at', data.get('timestamp', 0))))
+            print(f"  {filename[:-5]:<20} {result_mode(data):<10} {saved_at}  commit {meta.get('git_commit') or '-'}")
+        return
+    
+    if not args.result:
+        print("错误: 请指定要保存为基线的结果文件")
+        sys.exit(2)
+    with open(args.result, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    name = args.name or result_mode(data)
+    data['baseline'] = {
+        'name': name,
+        'saved_at': time.time(),
+        'source': os.path.abspath(args.result),
+        'git_commit': current_git_commit(),
+    }
+    os.makedirs(args.baseline_dir, exist_ok=True)
+    path = os.path.join(args.baseline_dir, f"{name}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    print(f"基线已保存: {path}")
+
+
+def run_compare(args):
+    """compare 子命令：对比结果和基线，存在回归时以退出码1退出"""
+    with open(args.result, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+    baseline_path = resolve_baseline(args.baseline or result_mode(current), args.baseline_dir)
+    if not os.path.isfile(baseline_path):
+        print(f"错误: 基线不存在: {baseline_path}（先用 baseline save 保存）")
+        sys.exit(2)
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if result_mode(baseline) != result_mode(current):
+        print(f"错误: 测试类型不一致，基线为 {result_mode(baseline)}，当前为 {result_mode(current)}")
+        sys.exit(2)
+    if baseline.get('configuration', {}).get('durations') != current.get('configuration', {}).get('durations') or \
+            baseline.get('configuration', {}).get('schedule') != current.get('configuration', {}).get('schedule'):
+        print("⚠️ 基线和当前结果的语料或负载计划不同，对比结果可能不可信")
+    # 没有 warm_cache 字段的旧结果没有带 nocache，相当于 --warm-cache
+    if baseline.get('configuration', {}).get('warm_cache', True) != \
+            current.get('configuration', {}).get('warm_cache', True):
+        print("⚠️ 基线和当前结果的识别缓存模式不同（--warm-cache），对比结果可能不可信")
+    
+    rows = compare_results(baseline, current, args.threshold, args.alpha, args.max_error_rate_increase,
+                           args.iterations, args.seed)
+    regressions = [row for row in rows if row['status'] == 'regression']
+    info = {
+        'baseline': baseline_path,
+        'current': args.result,
+        'mode': result_mode(current),
+        'threshold': args.threshold,
+        'alpha': args.alpha,
+        'regressions': len(regressions),
+        'improvements': sum(1 for row in rows if row['status'] == 'improvement'),
+    }
+    
+    print("\n" + "="*60)
+    print("AstroMao 性能对比")
+    print("="*60)
+    print(f"基线: {baseline_path}")
+    print(f"当前: {args.result}\n")
+    print(f"  {'指标':<24}{'统计量':<8}{'基线':>10}{'当前':>10}{'变化':>10}  {'变化置信区间':<20}{'MW p值':>8}  结论")
+    for row in rows:
+        metric, statistic, base_value, current_value, change, ci, p_value, status = format_comparison_row(row)
+        print(f"  {metric:<24}{statistic:<8}{base_value:>10}{current_value:>10}{change:>10}  {ci:<20}{p_value:>8}  {status}")
+    print(f"\n回归: {info['regressions']} 项，改进: {info['improvements']} 项")
+    
+    if args.report:
+        if args.report.endswith(('.html', '.htm')):
+            content = render_comparison_html(rows, info)
+        else:
+            content = render_comparison_markdown(rows, info)
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(content)
+        print(f"报告已保存到: {args.report}")
+    
+    if regressions:
+        sys.exit(1)
+
+
 async def main():
     parser = argparse.ArgumentParser(description="AstroMao 性能测试")
     parser.add_argument("--server", "-s", default="http://localhost:8001", 
@@ -228,9 +1493,144 @@ async def main():
                        help="结果输出文件 (JSON格式)")
     parser.add_argument("--generate-test-audio", action="store_true",
                        help="生成测试音频文件")
+    parser.add_argument("--warm-cache", action="store_true",
+                       help="允许命中服务端识别缓存（默认每个识别请求带 nocache=1）")
+    
+    subparsers = parser.add_subparsers(dest="command", title="子命令（不指定时通过HTTP测试端到端耗时）")
+    stages_parser = subparsers.add_parser("stages", help="进程内分阶段基准测试")
+    stages_parser.add_argument("--durations", nargs="+", type=int, default=[5, 30, 120],
+                               help="合成语料的音频时长（秒）")
+    stages_parser.add_argument("--files", "-f", nargs="+",
+                               help="使用指定音频文件代替合成语料")
+    stages_parser.add_argument("--repeat", "-n", type=int, default=3,
+                               help="每个文件的正式运行次数")
+    stages_parser.add_argument("--warmup", type=int, default=1,
+                               help="每个文件的预热次数（不计入结果）")
+    stages_parser.add_argument("--app-args", default="",
+                               help="传给 app.py 的启动参数，如 \"--ncpu 2 --device cuda\"")
+    stages_parser.add_argument("--translation-cache", action="store_true",
+                               help="保留翻译缓存（默认关闭以测量模型耗时）")
+    stages_parser.add_argument("--output", "-o",
+                               help="结果输出文件 (JSON格式)")
+    
+    load_parser = subparsers.add_parser("load", help="开环负载测试（按到达率持续发送混合请求）")
+    load_parser.add_argument("--server", "-s", default="http://localhost:8001",
+                             help="服务器URL")
+    load_parser.add_argument("--arrival", choices=["poisson", "constant"], default="poisson",
+                             help="到达过程：泊松或恒定间隔")
+    load_parser.add_argument("--rate", "-r", type=float, default=1.0,
+                             help="目标到达率（请求/秒）")
+    load_parser.add_argument("--duration", "-t", type=float, default=60,
+                             help="保持目标到达率的时长（秒）")
+    load_parser.add_argument("--ramp-up", type=float, default=0,
+                             help="开始时从0线性加压到目标到达率的时长（秒）")
+    load_parser.add_argument("--schedule", nargs="+",
+                             help="阶梯加压计划，每段为 时长:速率，如 30:1 30:2 30:4（指定时忽略 --rate/--duration/--ramp-up）")
+    load_parser.add_argument("--mix", default="short=5,long=1,translate=3,results=1",
+                             help="请求类型配比：short、long、translate、results")
+    load_parser.add_argument("--short-file", help="短音频文件（默认生成合成音频）")
+    load_parser.add_argument("--long-file", help="长音频文件（默认生成合成音频）")
+    load_parser.add_argument("--short-duration", type=int, default=5,
+                             help="合成短音频时长（秒）")
+    load_parser.add_argument("--long-duration", type=int, default=120,
+                             help="合成长音频时长（秒）")
+    load_parser.add_argument("--window", type=float, default=10,
+                             help="时间线统计窗口（秒）")
+    load_parser.add_argument("--timeout", type=float, default=600,
+                             help="单个请求超时（秒）")
+    load_parser.add_argument("--max-in-flight", type=int, default=1000,
+                             help="客户端在途请求上限，超过时记为失败")
+    load_parser.add_argument("--seed", type=int,
+                             help="随机种子，便于复现到达序列")
+    load_parser.add_argument("--warm-cache", action="store_true",
+                             help="允许命中服务端识别缓存（默认每个识别请求带 nocache=1）")
+    load_parser.add_argument("--output", "-o",
+                             help="结果输出文件 (JSON格式)")
+    
+    baseline_parser = subparsers.add_parser("baseline", help="保存或列出性能基线")
+    baseline_parser.add_argument("action", choices=["save", "list"],
+                                 help="save: 把结果文件保存为基线; list: 列出已保存的基线")
+    baseline_parser.add_argument("result", nargs="?",
+                                 help="要保存的结果文件（--output 生成的 JSON）")
+    baseline_parser.add_argument("--name",
+                                 help="基线名称（默认为测试类型: recognize/stages/load）")
+    baseline_parser.add_argument("--baseline-dir", default=DEFAULT_BASELINE_DIR,
+                                 help="基线目录")
+    
+    compare_parser = subparsers.add_parser("compare", help="对比结果和基线，存在回归时退出码为1")
+    compare_parser.add_argument("result",
+                                help="当前结果文件（--output 生成的 JSON）")
+    compare_parser.add_argument("--baseline", "-b",
+                                help="基线名称或文件路径（默认为与结果同类型的基线）")
+    compare_parser.add_argument("--baseline-dir", default=DEFAULT_BASELINE_DIR,
+                                help="基线目录")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="判定回归的相对变化阈值（0.1 即慢10%%）")
+    compare_parser.add_argument("--alpha", type=float, default=0.05,
+                                help="显著性水平")
+    compare_parser.add_argument("--max-error-rate-increase", type=float, default=0.01,
+                                help="错误率允许的绝对增量")
+    compare_parser.add_argument("--iterations", type=int, default=1000,
+                                help="自助法重采样次数")
+    compare_parser.add_argument("--seed", type=int, default=0,
+                                help="重采样随机种子")
+    compare_parser.add_argument("--report",
+                                help="报告输出文件，.html 输出HTML，其他输出Markdown")
+    
+    sweep_parser = subparsers.add_parser("sweep", help="参数网格扫描，对比速度和准确率")
+    sweep_parser.add_argument("--reference", required=True,
+                              help="参考集清单（JSONL，每行 {\"audio\", \"text\", \"translation\", \"target_lang\"}）")
+    sweep_parser.add_argument("--batch-size-s", dest="batch_size_s", nargs="+", type=int,
+                              help="batch_size_s 取值")
+    sweep_parser.add_argument("--merge-length-s", dest="merge_length_s", nargs="+", type=int,
+                              help="merge_length_s 取值")
+    sweep_parser.add_argument("--merge-vad", dest="merge_vad", nargs="+", choices=["true", "false"],
+                              help="merge_vad 取值")
+    sweep_parser.add_argument("--ncpu", nargs="+", type=int,
+                              help="ncpu 取值")
+    sweep_parser.add_argument("--torch-threads", dest="torch_threads", nargs="+", type=int,
+                              help="torch 计算线程数取值")
+    sweep_parser.add_argument("--num-beams", dest="num_beams", nargs="+", type=int,
+                              help="MarianMT num_beams 取值")
+    sweep_parser.add_argument("--app-args", default="",
+                              help="所有组合共用的 app.py 启动参数")
+    sweep_parser.add_argument("--repeat", "-n", type=int, default=1,
+                              help="每个文件的正式运行次数")
+    sweep_parser.add_argument("--warmup", type=int, default=1,
+                              help="每个文件的预热次数（不计入结果）")
+    sweep_parser.add_argument("--report",
+                              help="Markdown 报告输出文件")
+    sweep_parser.add_argument("--output", "-o",
+                              help="结果输出文件 (JSON格式)")
+    
+    point_parser = subparsers.add_parser("sweep-point", help="（由 sweep 调用）用一组参数跑参考集")
+    point_parser.add_argument("--reference", required=True)
+    point_parser.add_argument("--app-args", default="")
+    point_parser.add_argument("--repeat", type=int, default=1)
+    point_parser.add_argument("--warmup", type=int, default=1)
+    point_parser.add_argument("--output", required=True)
     
     args = parser.parse_args()
     
+    if args.command == "sweep":
+        run_sweep(args)
+        return
+    if args.command == "sweep-point":
+        await run_sweep_point(args)
+        return
+    if args.command == "baseline":
+        run_baseline_command(args)
+        return
+    if args.command == "compare":
+        run_compare(args)
+        return
+    if args.command == "stages":
+        await run_stage_benchmark(args)
+        return
+    if args.command == "load":
+        await run_load_test(args)
+        return
+    
     # 生成测试音频
     if args.generate_test_audio:
         print("生成测试音频文件...")
@@ -266,7 +1666,7 @@ async def main():
         print(f"  - {f}")
     
     # 运行测试
-    benchmark = AstroMaoBenchmark(args.server)
+    benchmark = AstroMaoBenchmark(args.server, args.warm_cache)
     
     print(f"\n开始性能测试 (并发数: {args.concurrent})...")
     start_time = time.time()
@@ -288,7 +1688,8 @@ async def main():
             'configuration': {
                 'server_url': args.server,
                 'concurrent_requests': args.concurrent,
-                'test_files': test_files
+                'test_files': test_files,
+                'warm_cache': args.warm_cache,
             },
             'analysis': analysis,
             'raw_results': results
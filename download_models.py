@@ -33,6 +33,19 @@ def download_models():
         else:
             print("语音识别模型已存在，跳过下载")
         
+        # 下载实时流式ASR模型（/ws/asr 2pass模式的实时草稿）
+        online_model_path = models_dir / "speech_paraformer-large_asr_nat-zh-cn-16k-common-vocab8404-online"
+        if not online_model_path.exists():
+            print("下载实时流式语音识别模型...")
+            snapshot_download(
+                "iic/speech_paraformer-large_asr_nat-zh-cn-16k-common-vocab8404-online",
+                cache_dir=str(models_dir),
+                local_dir=str(online_model_path)
+            )
+            print("实时流式语音识别模型下载完成")
+        else:
+            print("实时流式语音识别模型已存在，跳过下载")
+        
         # 下载VAD模型
         vad_model_path = models_dir / "speech_fsmn_vad_zh-cn-16k-common-pytorch"
         if not vad_model_path.exists():
@@ -67,6 +67,8 @@
         if (selectAudioBtn) selectAudioBtn.addEventListener('click', () => audioForJsonInput && audioForJsonInput.click());
         if (recognizeBtn) recognizeBtn.addEventListener('click', recognizeAudio);
         if (historyBtn) historyBtn.addEventListener('click', showResultsHistory);
+        const liveBtn = document.getElementById('liveBtn');
+        if (liveBtn) liveBtn.addEventListener('click', toggleLiveRecognition);
 
         // Drag and drop events
         if (uploadSection) {
@@ -110,6 +112,7 @@
         fileInfo.style.display = 'block';
         recognizeBtn.style.display = 'inline-block';
         recognizeBtn.disabled = false;
+        loadWaveform(null);
         
         hideMessages();
     }
@@ -131,7 +134,7 @@
         // Show progress
         progressContainer.style.display = 'block';
         recognizeBtn.disabled = true;
-        recognizeBtn.innerHTML = '<span class="loading"></span>转换并识别中...';
+        recognizeBtn.innerHTML = '<span class="loading"></span>识别中...';
         hideMessages();
         resultsSection.style.display = 'none';
 
@@ -144,50 +147,12 @@
         }, 200);
 
         try {
-            let audioFileToRecognize = selectedFile;
-            
-            // Step 1: Convert audio to MP3 if not already MP3
-            const fileExtension = selectedFile.name.split('.').pop().toLowerCase();
-            if (fileExtension !== 'mp3') {
-                console.log(`Converting ${selectedFile.name} from ${fileExtension} to MP3...`);
-                
-                const convertFormData = new FormData();
-                convertFormData.append('audio', selectedFile);
-                
-                const convertResponse = await fetch('/api/convert_to_mp3', {
-                    method: 'POST',
-                    body: convertFormData
-                });
-                
-                if (!convertResponse.ok) {
-                    throw new Error('音频转换失败');
-                }
-                
-                // Get the converted MP3 file as blob
-                const mp3Blob = await convertResponse.blob();
-                const originalName = selectedFile.name.split('.').slice(0, -1).join('.');
-                audioFileToRecognize = new File([mp3Blob], `${originalName}.mp3`, { type: 'audio/mpeg' });
-                
-                console.log('Audio converted to MP3 successfully');
-                showSuccess('音频已转换为MP3格式，开始识别...');
-                
-                // Update progress
-                progress = 30;
-                progressFill.style.width = progress + '%';
-            } else {
-                console.log('Audio is already in MP3 format, proceeding with recognition...');
-            }
-            
-            // Step 2: Perform recognition with the MP3 file
+            // 原始文件只上传一次：服务端边上传边解码识别，同时生成MP3存档并关联到结果
             const recognizeFormData = new FormData();
-            recognizeFormData.append('audio', audioFileToRecognize);
+            recognizeFormData.append('audio', selectedFile);
             
-            const response = await fetch('/api/recognize', {
-                method: 'POST',
-                body: recognizeFormData
-            });
-
-            const result = await response.json();
+            // 流式识别，每段识别完成后立即显示
+            const result = await streamRecognition(recognizeFormData);
 
             clearInterval(progressInterval);
             progressFill.style.width = '100%';
@@ -201,14 +166,13 @@
                 if (result.success) {
                     displayResults(result);
                     
-                    // 识别完成后自动保存音频文件到results文件夹（保存转换后的MP3文件）
-                    if (audioFileToRecognize && result.result_id) {
-                        console.log('识别完成，开始保存MP3音频文件到results文件夹...');
-                        uploadAudioForResult(audioFileToRecognize, result.result_id);
+                    // 存档音频已由服务端保存到results文件夹，保存结果JSON并显示波形
+                    if (result.result_id && result.audio_path) {
+                        autoSyncResult();
+                        loadWaveform(result.result_id);
                     }
                     
-                    const conversionMsg = fileExtension !== 'mp3' ? '（已转换为MP3格式）' : '';
-                    showSuccess(`识别完成！${conversionMsg}`);
+                    showSuccess('识别完成！');
                 } else {
                     showError(result.message || '识别失败');
                 }
@@ -224,6 +188,174 @@
         }
     }
 
+    // 调用流式识别API，逐行解析NDJSON事件并实时显示已识别的分句，返回最终完整结果
+    async function streamRecognition(formData) {
+        const response = await fetch('/api/recognize/stream?archive=1', {
+            method: 'POST',
+            body: formData
+        });
+        if (!response.ok || !response.body) {
+            const error = await response.json().catch(() => ({}));
+            throw new Error(error.detail || `识别请求失败 (${response.status})`);
+        }
+
+        const reader = response.body.getReader();
+        const textDecoder = new TextDecoder();
+        const partialResult = { text: '', sentences: [], speakers: [], total_duration: 0 };
+        let buffer = '';
+        let finalResult = null;
+
+        const handleEvent = (event) => {
+            if (event.type === 'sentences') {
+                partialResult.sentences.push(...event.sentences);
+                event.speakers.forEach(speaker => {
+                    if (!partialResult.speakers.includes(speaker)) {
+                        partialResult.speakers.push(speaker);
+                    }
+                });
+                partialResult.text += event.sentences.map(sentence => sentence.text).join('');
+                partialResult.total_duration = event.processed_s;
+                displayResults(partialResult);
+                // 识别完成前不允许保存或导出
+                document.getElementById('resultActions').style.display = 'none';
+            } else if (event.type === 'done') {
+                finalResult = event.result;
+            } else if (event.type === 'error') {
+                throw new Error(event.detail);
+            }
+        };
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += textDecoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.filter(line => line.trim()).forEach(line => handleEvent(JSON.parse(line)));
+        }
+        if (buffer.trim()) {
+            handleEvent(JSON.parse(buffer));
+        }
+        if (!finalResult) {
+            throw new Error('识别连接意外中断');
+        }
+        return finalResult;
+    }
+
+    // 实时识别状态：麦克风流、音频上下文、WebSocket连接
+    let liveSession = null;
+
+    function toggleLiveRecognition() {
+        if (liveSession) {
+            stopLiveRecognition();
+        } else {
+            startLiveRecognition().catch(error => {
+                cleanupLiveRecognition();
+                showError('实时识别启动失败: ' + error.message);
+            });
+        }
+    }
+
+    async function startLiveRecognition() {
+        if (!navigator.mediaDevices || !window.AudioWorkletNode) {
+            throw new Error('当前浏览器不支持麦克风采集');
+        }
+        hideMessages();
+        const liveBtn = document.getElementById('liveBtn');
+        const liveFinal = document.getElementById('liveFinalText');
+        const livePartial = document.getElementById('livePartialText');
+        liveFinal.innerHTML = '';
+        livePartial.textContent = '';
+        document.getElementById('liveTranscript').style.display = 'block';
+
+        const stream = await navigator.mediaDevices.getUserMedia({
+            audio: { channelCount: 1, echoCancellation: true, noiseSuppression: true }
+        });
+        const audioContext = new AudioContext();
+        await audioContext.audioWorklet.addModule('/static/js/pcm-recorder-worklet.js');
+        const source = audioContext.createMediaStreamSource(stream);
+        const recorder = new AudioWorkletNode(audioContext, 'pcm-recorder');
+
+        const protocol = location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const socket = new WebSocket(`${protocol}//${location.host}/ws/asr`);
+        socket.binaryType = 'arraybuffer';
+        liveSession = { stream, audioContext, source, recorder, socket };
+
+        socket.onopen = () => {
+            socket.send(JSON.stringify({ mode: '2pass' }));
+        };
+        socket.onmessage = (message) => {
+            const event = JSON.parse(message.data);
+            if (event.type === 'ready') {
+                // 服务端就绪后再开始推送音频帧
+                recorder.port.onmessage = (e) => {
+                    if (socket.readyState === WebSocket.OPEN) {
+                        socket.send(e.data);
+                    }
+                };
+                source.connect(recorder);
+                liveBtn.innerHTML = '⏹ 停止识别';
+            } else if (event.type === 'partial') {
+                livePartial.textContent += event.text;
+            } else if (event.type === 'final') {
+                // 离线模型的最终结果替换此前的实时草稿
+                livePartial.textContent = '';
+                const line = document.createElement('p');
+                line.style.margin = '6px 0';
+                line.textContent = `[${formatTimeToHMS(event.start)}] ${event.text}`;
+                if (event.translation && event.translation.en && event.translation.en !== event.text) {
+                    const translation = document.createElement('span');
+                    translation.style.cssText = 'display: block; color: #6c757d; font-size: 0.9em;';
+                    translation.textContent = event.translation.source_lang === 'en'
+                        ? event.translation.zh : event.translation.en;
+                    line.appendChild(translation);
+                }
+                liveFinal.appendChild(line);
+            } else if (event.type === 'end') {
+                socket.close();
+            } else if (event.type === 'error') {
+                showError('实时识别错误: ' + event.detail);
+            }
+        };
+        socket.onclose = (event) => {
+            if (event.code === 1013) {
+                showError('实时识别会话已满，请稍后重试');
+            }
+            cleanupLiveRecognition();
+        };
+    }
+
+    function stopLiveRecognition() {
+        if (!liveSession) return;
+        const { socket } = liveSession;
+        releaseLiveAudio();
+        if (socket.readyState === WebSocket.OPEN) {
+            // 通知服务端说话结束，收到end事件（最后一段已识别）后关闭连接
+            socket.send(JSON.stringify({ is_speaking: false }));
+            setTimeout(() => socket.close(), 30000);
+        } else {
+            cleanupLiveRecognition();
+        }
+    }
+
+    function releaseLiveAudio() {
+        if (!liveSession || liveSession.released) return;
+        liveSession.released = true;
+        const { stream, audioContext, source, recorder } = liveSession;
+        recorder.port.onmessage = null;
+        source.disconnect();
+        stream.getTracks().forEach(track => track.stop());
+        audioContext.close();
+    }
+
+    function cleanupLiveRecognition() {
+        if (!liveSession) return;
+        releaseLiveAudio();
+        liveSession = null;
+        const liveBtn = document.getElementById('liveBtn');
+        if (liveBtn) liveBtn.innerHTML = '🎤 实时识别';
+    }
+
     let currentResult = null; // 存储当前识别结果
     let audioPlayer = null; // 音频播放器引用
     let currentAudioFile = null; // 当前音频文件
@@ -557,6 +689,7 @@
                         currentResult.audio_path = result.audio_path;
                         console.log('已更新 currentResult.audio_path:', result.audio_path);
                     }
+                    loadWaveform(resultId);
                     // 自动同步更新到服务器
                     console.log('开始自动同步结果到服务器...');
                     await autoSyncResult();
@@ -569,59 +702,38 @@
             }
         }
 
-        // 从服务器加载保存的音频文件
-        async function loadSavedAudioFile(audioPath) {
-            try {
-                const response = await fetch(`/api/audio/${audioPath}`);
-                if (response.ok) {
-                    const audioBlob = await response.blob();
-                    const audioFile = new File([audioBlob], audioPath, { type: audioBlob.type });
-                    
-                    // 设置为当前音频文件
-                    selectedFile = audioFile;
-                    selectedAudioForJson = audioFile;
-                    
-                    // 设置音频播放器
-                    setupAudioPlayer(audioFile);
-                    
-                    console.log('保存的音频文件已加载:', audioPath);
-                } else {
-                    console.error('加载保存的音频文件失败:', response.statusText);
-                    // 如果音频文件不存在，显示选择音频按钮
-                    if (importedJsonData && importedJsonData.audio_hash) {
-                        selectAudioBtn.style.display = 'inline-block';
-                        selectAudioBtn.textContent = '🎵 选择对应音频';
-                        selectAudioBtn.style.background = 'linear-gradient(135deg, #fd79a8 0%, #fdcb6e 100%)';
-                    }
-                }
-            } catch (error) {
-                console.error('加载保存的音频文件错误:', error);
-                // 如果加载失败，显示选择音频按钮
+        // 从服务器加载保存的音频文件：播放器直接使用URL，按需以Range请求分段加载，无需先下载整个文件
+        function loadSavedAudioFile(audioPath) {
+            const audioURL = `/api/audio/${encodeURIComponent(audioPath)}`;
+            const player = document.getElementById('audioPlayer');
+            player.addEventListener('error', () => {
+                if (player.getAttribute('src') !== audioURL) return;
+                console.error('加载保存的音频文件失败:', audioPath);
+                // 如果音频文件不存在，显示选择音频按钮
                 if (importedJsonData && importedJsonData.audio_hash) {
                     selectAudioBtn.style.display = 'inline-block';
                     selectAudioBtn.textContent = '🎵 选择对应音频';
                     selectAudioBtn.style.background = 'linear-gradient(135deg, #fd79a8 0%, #fdcb6e 100%)';
                 }
-            }
+            }, { once: true });
+            setupAudioPlayer(audioURL);
+            console.log('保存的音频文件已加载:', audioPath);
         }
 
     // 设置音频播放器
+    // audioFile 可以是本地 File 对象，也可以是服务器上音频的URL
     function setupAudioPlayer(audioFile = null) {
         audioPlayer = document.getElementById('audioPlayer');
         const fileToUse = audioFile || selectedFile;
         
         if (fileToUse && currentAudioFile !== fileToUse) {
+            // 释放之前本地文件的URL对象
+            if (audioPlayer.src && audioPlayer.src.startsWith('blob:')) {
+                URL.revokeObjectURL(audioPlayer.src);
+            }
             currentAudioFile = fileToUse;
-            const audioURL = URL.createObjectURL(fileToUse);
-            audioPlayer.src = audioURL;
+            audioPlayer.src = typeof fileToUse === 'string' ? fileToUse : URL.createObjectURL(fileToUse);
             audioPlayer.style.display = 'block';
-            
-            // 清理之前的URL对象
-            audioPlayer.addEventListener('loadstart', () => {
-                if (audioPlayer.src && audioPlayer.src.startsWith('blob:')) {
-                    // 不立即清理，等播放完成后再清理
-                }
-            });
         }
         
         // 添加播放进度监听器，实现播放器与分句列表的双向绑定
@@ -631,6 +743,7 @@
             // 监听播放进度变化
             audioPlayer.addEventListener('timeupdate', function() {
                 highlightCurrentSentence(this.currentTime);
+                drawWaveform(this.currentTime);
             });
             
             // 监听播放结束事件
@@ -643,6 +756,66 @@
         }
     }
     
+    // 波形峰值：从服务器获取概览级别的峰值并绘制，无需下载整个音频
+    let waveformPeaks = null;
+
+    async function loadWaveform(resultId) {
+        const canvas = document.getElementById('waveformCanvas');
+        waveformPeaks = null;
+        canvas.style.display = 'none';
+        if (!resultId) return;
+        try {
+            const response = await fetch(`/api/audio/${encodeURIComponent(resultId)}/peaks?zoom=0`);
+            if (!response.ok) return;
+            const samplesPerBucket = parseInt(response.headers.get('X-Peaks-Samples-Per-Bucket'));
+            const sampleRate = parseInt(response.headers.get('X-Peaks-Sample-Rate'));
+            waveformPeaks = {
+                data: new Int16Array(await response.arrayBuffer()),
+                secondsPerBucket: samplesPerBucket / sampleRate
+            };
+            if (!canvas.hasAttribute('data-seek-listener')) {
+                canvas.setAttribute('data-seek-listener', 'true');
+                canvas.addEventListener('click', (e) => {
+                    const player = document.getElementById('audioPlayer');
+                    if (!waveformPeaks || !player.src) return;
+                    const duration = waveformPeaks.data.length / 2 * waveformPeaks.secondsPerBucket;
+                    player.currentTime = e.offsetX / canvas.clientWidth * duration;
+                    drawWaveform(player.currentTime);
+                });
+            }
+            canvas.style.display = 'block';
+            drawWaveform(document.getElementById('audioPlayer').currentTime || 0);
+        } catch (error) {
+            console.error('加载波形失败:', error);
+        }
+    }
+
+    // 绘制波形，已播放部分使用深色
+    function drawWaveform(currentTime = 0) {
+        const canvas = document.getElementById('waveformCanvas');
+        if (!waveformPeaks || !canvas || canvas.style.display === 'none') return;
+        const width = canvas.width = Math.floor(canvas.clientWidth * window.devicePixelRatio);
+        const height = canvas.height = Math.floor(canvas.clientHeight * window.devicePixelRatio);
+        const context = canvas.getContext('2d');
+        const { data, secondsPerBucket } = waveformPeaks;
+        const buckets = data.length / 2;
+        const playedX = buckets ? currentTime / (buckets * secondsPerBucket) * width : 0;
+        for (let x = 0; x < width; x++) {
+            const from = Math.floor(x / width * buckets);
+            const to = Math.max(from + 1, Math.floor((x + 1) / width * buckets));
+            let min = 0;
+            let max = 0;
+            for (let i = from; i < to && i < buckets; i++) {
+                min = Math.min(min, data[2 * i]);
+                max = Math.max(max, data[2 * i + 1]);
+            }
+            const top = (1 - max / 32768) * height / 2;
+            const bottom = (1 - min / 32768) * height / 2;
+            context.fillStyle = x < playedX ? '#667eea' : '#c3cfe2';
+            context.fillRect(x, top, 1, Math.max(1, bottom - top));
+        }
+    }
+
     // 高亮显示当前播放时间对应的分句
     function highlightCurrentSentence(currentTime) {
         // 移除之前的所有高亮
@@ -816,14 +989,27 @@
         }
     }
 
-    // 显示历史记录
-    async function showResultsHistory() {
+    // 历史记录分页状态
+    const HISTORY_PAGE_SIZE = 50;
+    let historyResults = [];
+    let historyTotal = 0;
+
+    // 显示历史记录（append 为 true 时加载下一页）
+    async function showResultsHistory(append = false) {
         try {
-            const response = await fetch('/api/results');
+            const offset = append === true ? historyResults.length : 0;
+            const params = new URLSearchParams({ offset, limit: HISTORY_PAGE_SIZE });
+            const filterInput = document.getElementById('historyFilter');
+            if (filterInput && filterInput.value.trim()) {
+                params.set('filename', filterInput.value.trim());
+            }
+            const response = await fetch(`/api/results?${params}`);
             const data = await response.json();
             
             if (data.success) {
-                displayHistoryList(data.results);
+                historyResults = offset === 0 ? data.results : historyResults.concat(data.results);
+                historyTotal = data.total_count;
+                displayHistoryList(historyResults);
                 document.getElementById('historyModal').style.display = 'block';
             } else {
                 showError('获取历史记录失败');
@@ -862,7 +1048,11 @@
                     <button onclick="deleteHistoryResult('${result.result_id}')" class="history-action-btn delete-btn">🗑️ 删除</button>
                 </div>
             </div>
-        `).join('');
+        `).join('') + (results.length < historyTotal ? `
+            <div style="text-align: center;">
+                <button onclick="showResultsHistory(true)" class="history-action-btn">加载更多（${results.length}/${historyTotal}）</button>
+            </div>
+        ` : '');
     }
 
     // 加载历史记录结果
@@ -895,6 +1085,7 @@
             if (jsonData.audio_path) {
                 // 自动加载保存的音频文件
                 loadSavedAudioFile(jsonData.audio_path);
+                loadWaveform(resultId);
                 const audioFileName = jsonData.filename ? `（原音频文件：${jsonData.filename}）` : '';
                 showSuccess(`历史记录已加载！音频文件已自动加载${audioFileName}`);
             } else if (jsonData.audio_hash) {
@@ -0,0 +1,44 @@
+// 麦克风采集处理器：在音频线程中把输入降采样为16kHz单声道Int16 PCM，
+// 每累积约100ms推送一次给主线程，由主线程通过WebSocket发送到 /ws/asr
+class PCMRecorderProcessor extends AudioWorkletProcessor {
+    constructor() {
+        super();
+        this.targetRate = 16000;
+        this.ratio = sampleRate / this.targetRate;
+        this.frameSamples = 1600; // 100ms @ 16kHz
+        this.buffer = new Int16Array(this.frameSamples);
+        this.length = 0;
+        // 降采样累加器（盒式滤波，跨process调用保持状态）
+        this.accSum = 0;
+        this.accCount = 0;
+        this.position = 0;
+    }
+
+    process(inputs) {
+        const input = inputs[0];
+        if (!input || input.length === 0) {
+            return true;
+        }
+        const channel = input[0];
+        for (let i = 0; i < channel.length; i++) {
+            this.accSum += channel[i];
+            this.accCount += 1;
+            this.position += 1;
+            if (this.position >= this.ratio) {
+                this.position -= this.ratio;
+                const sample = Math.max(-1, Math.min(1, this.accSum / this.accCount));
+                this.buffer[this.length++] = sample < 0 ? sample * 0x8000 : sample * 0x7fff;
+                this.accSum = 0;
+                this.accCount = 0;
+                if (this.length === this.frameSamples) {
+                    this.port.postMessage(this.buffer.buffer, [this.buffer.buffer]);
+                    this.buffer = new Int16Array(this.frameSamples);
+                    this.length = 0;
+                }
+            }
+        }
+        return true;
+    }
+}
+
+registerProcessor('pcm-recorder', PCMRecorderProcessor);
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+"""
+app.py 的单元测试
+
+不需要启动服务和加载模型：python -m pytest test_app.py
+（test.py 是针对运行中服务的接口测试）。缺少 funasr/torch 等运行依赖时整体跳过，
+不依赖模型的纯函数放在 utils.py，测试见 test_utils.py。
+"""
+
+import asyncio
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+try:
+    import app
+except ImportError as e:
+    raise unittest.SkipTest(f"app.py dependencies are not installed: {e}")
+
+
+class EnsurePeaksFileTest(unittest.TestCase):
+    def test_concurrent_requests_share_one_computation(self):
+        calls = []
+
+        async def compute(audio_path, peaks_path):
+            calls.append(peaks_path)
+            await asyncio.sleep(0.01)
+
+        async def scenario():
+            first = app.ensure_peaks_file("a_audio.mp3", "a_peaks.bin")
+            second = app.ensure_peaks_file("a_audio.mp3", "a_peaks.bin")
+            self.assertIs(first, second)
+            await asyncio.gather(first, second)
+            await asyncio.sleep(0)
+            self.assertNotIn("a_peaks.bin", app.peaks_computations)
+
+        with mock.patch.object(app, "compute_peaks_file", compute):
+            asyncio.run(scenario())
+        self.assertEqual(calls, ["a_peaks.bin"])
+
+
+class FakeSegmentModel:
+    """模拟 AutoModel：model 为ASR子模型，inference 记录每次收到的语音段数"""
+
+    def __init__(self):
+        self.model = object()
+        self.batches = []
+
+    def inference(self, input, input_len=None, model=None, kwargs=None, key=None, **cfg):
+        if model is self.model:
+            self.batches.append(len(input))
+        return [{"text": segment} for segment in input]
+
+
+class ASRSegmentBatcherTest(unittest.TestCase):
+    def recognize_concurrently(self, batcher, model, inputs):
+        results = [None] * len(inputs)
+
+        def worker(i):
+            results[i] = model.inference(inputs[i], model=model.model, kwargs={})
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(inputs))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_segments_are_merged_and_split_back(self):
+        model = FakeSegmentModel()
+        batcher = app.ASRSegmentBatcher(model, SimpleNamespace(running=2), 5000, 300)
+        results = self.recognize_concurrently(batcher, model, [["a1", "a2"], ["b1"]])
+        self.assertEqual(model.batches, [3])
+        self.assertEqual(results, [[{"text": "a1"}, {"text": "a2"}], [{"text": "b1"}]])
+        self.assertEqual((batcher.batches, batcher.merged_requests), (1, 2))
+
+    def test_single_request_does_not_wait(self):
+        model = FakeSegmentModel()
+        app.ASRSegmentBatcher(model, SimpleNamespace(running=1), 60000, 300)
+        self.assertEqual(model.inference(["a"], model=model.model, kwargs={}), [{"text": "a"}])
+        # VAD、标点等其他子模型不经过合并
+        self.assertEqual(model.inference(["v"], model=None), [{"text": "v"}])
+        self.assertEqual(model.batches, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
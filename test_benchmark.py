@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+benchmark.py 纯函数的单元测试
+
+不需要启动服务：python -m pytest test_benchmark.py
+"""
+
+import math
+import random
+import unittest
+
+import benchmark
+
+
+class ArrivalTimesTest(unittest.TestCase):
+    def test_constant_rate(self):
+        schedule = benchmark.parse_schedule(None, 2.0, 10, 0)
+        times = list(benchmark.arrival_times(schedule, 'constant', random.Random(0)))
+        self.assertEqual(len(times), 20)
+        for k, t in enumerate(times, 1):
+            self.assertAlmostEqual(t, 0.5 * k)
+
+    def test_linear_ramp_inverts_cumulative_rate(self):
+        # 10秒内从0升到4请求/秒：Λ(τ) = 0.2τ²，第k个请求在 τ = √(5k)
+        schedule = benchmark.parse_schedule(None, 4.0, 0, 10)
+        self.assertEqual(schedule[0], {'duration': 10, 'start_rate': 0.0, 'end_rate': 4.0})
+        times = list(benchmark.arrival_times(schedule[:1], 'constant', random.Random(0)))
+        self.assertEqual(len(times), 20)
+        for k, t in enumerate(times, 1):
+            self.assertAlmostEqual(t, (5 * k) ** 0.5)
+
+    def test_steps_carry_over_between_segments(self):
+        schedule = benchmark.parse_schedule(["10:1", "10:2"], 0, 0, 0)
+        times = list(benchmark.arrival_times(schedule, 'constant', random.Random(0)))
+        expected = [float(k) for k in range(1, 11)] + [10 + 0.5 * k for k in range(1, 21)]
+        self.assertEqual(len(times), len(expected))
+        for t, e in zip(times, expected):
+            self.assertAlmostEqual(t, e)
+
+    def test_poisson_matches_rate_and_seed(self):
+        schedule = benchmark.parse_schedule(None, 5.0, 400, 0)
+        times = list(benchmark.arrival_times(schedule, 'poisson', random.Random(1)))
+        self.assertEqual(times, list(benchmark.arrival_times(schedule, 'poisson', random.Random(1))))
+        self.assertEqual(times, sorted(times))
+        self.assertLessEqual(times[-1], 400)
+        # 期望2000个，标准差约45
+        self.assertLess(abs(len(times) - 2000), 200)
+
+
+def recognize_result(values, failures=0):
+    """构造端到端测试的结果文件：每个成功请求的耗时和RTF取同一个值"""
+    runs = [{'success': True, 'request_time': value, 'rtf': value / 10} for value in values]
+    runs += [{'success': False, 'error': 'HTTP 503'} for _ in range(failures)]
+    return {'raw_results': runs}
+
+
+class CompareTest(unittest.TestCase):
+    BASELINE = [1.0, 1.1, 0.9, 1.05, 0.95, 1.2, 1.0, 0.98]
+    SLOWER = [1.3, 1.25, 1.4, 1.1, 1.35, 1.0, 1.5, 1.45]
+
+    def test_mann_whitney_matches_reference_value(self):
+        # scipy.stats.mannwhitneyu(SLOWER, BASELINE, alternative='greater', method='asymptotic')
+        self.assertAlmostEqual(benchmark.mann_whitney_greater(self.BASELINE, self.SLOWER), 0.0030659766520406504)
+
+    def test_mann_whitney_direction(self):
+        self.assertGreater(benchmark.mann_whitney_greater(self.SLOWER, self.BASELINE), 0.99)
+        self.assertEqual(benchmark.mann_whitney_greater([1.0] * 5, [1.0] * 5), 1.0)
+
+    def test_bootstrap_intervals(self):
+        rng = random.Random(0)
+        intervals = benchmark.bootstrap_changes(self.BASELINE, [v * 1.5 for v in self.BASELINE], 200, 0.95, rng)
+        self.assertEqual(set(intervals), set(benchmark.COMPARE_STATISTICS))
+        for low, high in intervals.values():
+            self.assertLessEqual(low, 0.5 + 1e-9)
+            self.assertGreaterEqual(high, 0.5 - 1e-9)
+            self.assertGreater(low, 0)
+        flat = benchmark.bootstrap_changes([2.0] * 4, [2.0] * 4, 50, 0.95, rng)
+        self.assertEqual(flat['p50'], (0.0, 0.0))
+
+    def rows(self, baseline, current, **kwargs):
+        return {(row['metric'], row['statistic']): row
+                for row in benchmark.compare_results(baseline, current, iterations=200, **kwargs)}
+
+    def test_slower_run_is_a_regression(self):
+        rng = random.Random(0)
+        base = [rng.gauss(1.0, 0.05) for _ in range(30)]
+        rows = self.rows(recognize_result(base), recognize_result([v * 1.5 for v in base]))
+        self.assertEqual(rows[('request_time', 'p50')]['status'], 'regression')
+        self.assertLess(rows[('request_time', 'p50')]['p_value'], 0.05)
+        self.assertAlmostEqual(rows[('request_time', 'p50')]['change'], 0.5)
+
+    def test_faster_run_is_an_improvement(self):
+        rng = random.Random(0)
+        base = [rng.gauss(1.0, 0.05) for _ in range(30)]
+        rows = self.rows(recognize_result(base), recognize_result([v * 0.5 for v in base]))
+        self.assertEqual(rows[('rtf', 'p50')]['status'], 'improvement')
+
+    def test_same_distribution_is_unchanged(self):
+        rng = random.Random(0)
+        base = [rng.gauss(1.0, 0.05) for _ in range(30)]
+        current = [rng.gauss(1.0, 0.05) for _ in range(30)]
+        statuses = {row['status'] for row in self.rows(recognize_result(base), recognize_result(current)).values()}
+        self.assertEqual(statuses, {'unchanged'})
+
+    def test_single_sample_is_insufficient(self):
+        rows = self.rows(recognize_result([1.0]), recognize_result([2.0]))
+        self.assertEqual(rows[('request_time', 'p50')]['status'], 'insufficient')
+        self.assertIsNone(rows[('request_time', 'p50')]['p_value'])
+
+    def test_error_rate_increase(self):
+        rows = self.rows(recognize_result(self.BASELINE), recognize_result(self.BASELINE, failures=2))
+        row = rows[('error_rate', 'value')]
+        self.assertEqual(row['status'], 'regression')
+        self.assertAlmostEqual(row['change'], 0.2)
+
+
+class QualityMetricsTest(unittest.TestCase):
+    def test_tokenize_mixed_text(self):
+        self.assertEqual(benchmark.tokenize("你好 World2026，测试!"), ['你', '好', 'world2026', '测', '试'])
+        self.assertEqual(benchmark.tokenize("你好，World!", keep_punctuation=True), ['你', '好', '，', 'world', '!'])
+
+    def test_error_counts(self):
+        counts = benchmark.error_counts("今天天气很好。", "今天 天汽很好")
+        self.assertEqual((counts['char_errors'], counts['chars']), (1, 6))
+        counts = benchmark.error_counts("The cat sat on the mat.", "the cat on a mat")
+        # 删除 sat，替换 the -> a
+        self.assertEqual((counts['word_errors'], counts['words']), (2, 6))
+
+    def test_bleu_identical_is_100(self):
+        self.assertAlmostEqual(benchmark.corpus_bleu(["the cat sat on the mat"], ["the cat sat on the mat"]), 100.0)
+        self.assertAlmostEqual(benchmark.corpus_bleu(["今天天气很好"], ["今天天气很好"]), 100.0)
+
+    def test_bleu_without_four_gram_match_is_zero(self):
+        self.assertEqual(benchmark.corpus_bleu(["the cat sat on the mat"], ["mat the on sat cat the"]), 0.0)
+        self.assertEqual(benchmark.corpus_bleu(["the cat"], [""]), 0.0)
+
+    def test_bleu_brevity_penalty(self):
+        # 所有 n-gram 精确率为1，只剩长度惩罚 exp(1 - 7/6)
+        bleu = benchmark.corpus_bleu(["the cat sat on the mat today"], ["the cat sat on the mat"])
+        self.assertAlmostEqual(bleu, 100 * math.exp(1 - 7 / 6))
+
+
+def sweep_point(rtf, cer, peak_rss_mb, bleu=None):
+    return {'rtf': rtf, 'cer': cer, 'peak_rss_mb': peak_rss_mb, 'bleu': bleu}
+
+
+class ParetoFrontTest(unittest.TestCase):
+    def test_dominated_points_are_dropped(self):
+        points = [
+            sweep_point(0.1, 0.05, 900, 30),
+            sweep_point(0.2, 0.05, 900, 30),   # 比第一个慢
+            sweep_point(0.2, 0.04, 900, 30),   # 更慢但更准
+            sweep_point(0.1, 0.05, 900, 31),   # BLEU 更高，淘汰第一个
+        ]
+        self.assertEqual(benchmark.pareto_front(points), [2, 3])
+
+    def test_equal_points_are_both_kept(self):
+        points = [sweep_point(0.1, 0.05, 900), sweep_point(0.1, 0.05, 900)]
+        self.assertEqual(benchmark.pareto_front(points), [0, 1])
+
+    def test_failed_points_are_excluded(self):
+        points = [sweep_point(None, None, None), sweep_point(0.3, 0.1, 900)]
+        self.assertEqual(benchmark.pareto_front(points), [1])
+
+    def test_missing_metrics_are_not_compared(self):
+        # 没有内存数据的配置不能淘汰有内存数据的配置，反之亦然
+        points = [sweep_point(0.1, 0.05, None, 30), sweep_point(0.2, 0.06, 900, 30)]
+        self.assertEqual(benchmark.pareto_front(points), [0, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+"""
+utils.py 的单元测试
+
+utils.py 不依赖 funasr/torch，不需要启动服务和加载模型：python -m pytest test_utils.py
+"""
+
+import os
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+import utils
+
+
+class SearchMatchExpressionTest(unittest.TestCase):
+    def test_chinese_term_becomes_character_phrase(self):
+        self.assertEqual(utils.search_match_expression("你好"), '{text zh en} : ("你 好")')
+
+    def test_terms_are_combined_with_and(self):
+        self.assertEqual(
+            utils.search_match_expression("Hello  World"), '{text zh en} : ("hello" AND "world")'
+        )
+
+    def test_mixed_term_and_punctuation(self):
+        self.assertEqual(utils.search_match_expression("e-mail测试"), '{text zh en} : ("e mail 测 试")')
+
+    def test_field_restricts_columns(self):
+        self.assertEqual(utils.search_match_expression("hello", "en"), '{en} : ("hello")')
+
+    def test_query_without_words_is_empty(self):
+        self.assertEqual(utils.search_match_expression("!!! ，。"), "")
+        self.assertEqual(utils.search_match_expression(""), "")
+
+    def test_full_width_input_is_normalized(self):
+        self.assertEqual(utils.search_match_expression("ＡＢＣ"), '{text zh en} : ("abc")')
+
+
+class ParseByteRangeTest(unittest.TestCase):
+    def test_closed_range(self):
+        self.assertEqual(utils.parse_byte_range("bytes=0-99", 1000), (0, 99))
+
+    def test_open_ended_range(self):
+        self.assertEqual(utils.parse_byte_range("bytes=500-", 1000), (500, 999))
+
+    def test_end_is_clamped_to_file_size(self):
+        self.assertEqual(utils.parse_byte_range("bytes=900-5000", 1000), (900, 999))
+
+    def test_suffix_range(self):
+        self.assertEqual(utils.parse_byte_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(utils.parse_byte_range("bytes=-5000", 1000), (0, 999))
+
+    def test_unsatisfiable_ranges(self):
+        self.assertIsNone(utils.parse_byte_range("bytes=1000-", 1000))
+        self.assertIsNone(utils.parse_byte_range("bytes=50-10", 1000))
+        self.assertIsNone(utils.parse_byte_range("bytes=-0", 1000))
+
+    def test_empty_file_is_unsatisfiable(self):
+        self.assertIsNone(utils.parse_byte_range("bytes=-100", 0))
+        self.assertIsNone(utils.parse_byte_range("bytes=0-", 0))
+        self.assertIsNone(utils.parse_byte_range("bytes=0-99", 0))
+
+    def test_unsupported_ranges_raise(self):
+        for header in ("items=0-1", "bytes=0-1,5-9", "bytes=a-b", "bytes="):
+            with self.assertRaises(ValueError, msg=header):
+                utils.parse_byte_range(header, 1000)
+
+
+class WaveformPeaksTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.samples = rng.integers(-32768, 32767, size=40003, dtype=np.int16)
+        self.pcm = self.samples.astype("<i2").tobytes()
+
+    def test_buckets_hold_min_and_max(self):
+        peaks = utils.WaveformPeaks(bucket_samples=4)
+        peaks.feed(self.pcm)
+        bucket_samples, data = peaks.levels()[0]
+        self.assertEqual(bucket_samples, 4)
+        # 40003 个采样：10000 个整桶加一个3采样的尾桶
+        self.assertEqual(len(data), 2 * 10001)
+        self.assertEqual(data[0], self.samples[:4].min())
+        self.assertEqual(data[1], self.samples[:4].max())
+        self.assertEqual(data[-2], self.samples[40000:].min())
+        self.assertEqual(data[-1], self.samples[40000:].max())
+
+    def test_feed_in_uneven_chunks_matches_single_feed(self):
+        whole = utils.WaveformPeaks(bucket_samples=4)
+        whole.feed(self.pcm)
+        chunked = utils.WaveformPeaks(bucket_samples=4)
+        for start in range(0, len(self.pcm), 777):
+            chunked.feed(self.pcm[start:start + 777])
+        self.assertEqual(chunked.to_bytes(), whole.to_bytes())
+
+    def test_levels_halve_until_coarse_enough(self):
+        peaks = utils.WaveformPeaks(bucket_samples=4)
+        peaks.feed(self.pcm)
+        levels = peaks.levels()
+        self.assertEqual([bucket_samples for bucket_samples, _ in levels], [4, 8, 16, 32])
+        self.assertLessEqual(len(levels[-1][1]) // 2, utils.PEAKS_MIN_BUCKETS * 2)
+        finest, coarser = levels[0][1], levels[1][1]
+        self.assertEqual(coarser[0], min(finest[0], finest[2]))
+        self.assertEqual(coarser[1], max(finest[1], finest[3]))
+
+    def test_file_round_trip(self):
+        peaks = utils.WaveformPeaks(bucket_samples=4)
+        peaks.feed(self.pcm)
+        levels = peaks.levels()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "peaks.bin")
+            with open(path, "wb") as f:
+                f.write(peaks.to_bytes())
+            info, zoom, bucket_samples, data = utils.read_peaks_level(path)
+            self.assertEqual(info, {"sample_rate": 16000, "total_samples": 40003, "zoom_levels": 4})
+            self.assertEqual((zoom, bucket_samples), (0, 32))
+            np.testing.assert_array_equal(np.frombuffer(data, dtype="<i2"), levels[-1][1])
+            # 超出范围的 zoom 取最细一级
+            _, zoom, bucket_samples, data = utils.read_peaks_level(path, 10)
+            self.assertEqual((zoom, bucket_samples), (3, 4))
+            np.testing.assert_array_equal(np.frombuffer(data, dtype="<i2"), levels[0][1])
+
+
+def riff(*chunks: bytes) -> bytes:
+    """拼接RIFF/WAVE文件"""
+    body = b"WAVE" + b"".join(chunks)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def chunk(chunk_id: bytes, data: bytes, size: int = None) -> bytes:
+    padding = b"\0" if len(data) % 2 else b""
+    return chunk_id + struct.pack("<I", len(data) if size is None else size) + data + padding
+
+
+def fmt_chunk(audio_format: int = 1, channels: int = 1, sample_rate: int = 16000, bits: int = 16) -> bytes:
+    block = channels * bits // 8
+    return chunk(b"fmt ", struct.pack("<HHIIHH", audio_format, channels, sample_rate,
+                                      sample_rate * block, block, bits))
+
+
+class ParseWavHeaderTest(unittest.TestCase):
+    def test_plain_pcm(self):
+        data = riff(fmt_chunk(), chunk(b"data", b"\1\0" * 100))
+        self.assertEqual(utils.parse_wav_header(data), (utils.WAV_FORMAT_PCM, 1, 16000, 16, 44, 200))
+
+    def test_skips_other_chunks_with_padding(self):
+        data = riff(fmt_chunk(channels=2, sample_rate=44100), chunk(b"LIST", b"abc"), chunk(b"data", b"\0" * 400))
+        # LIST 块3字节加1字节填充
+        self.assertEqual(utils.parse_wav_header(data), (utils.WAV_FORMAT_PCM, 2, 44100, 16, 56, 400))
+
+    def test_extensible_float(self):
+        ext = struct.pack("<HHIIHHHHIH14s", utils.WAV_FORMAT_EXTENSIBLE, 1, 16000, 64000, 4, 32,
+                          22, 32, 0, utils.WAV_FORMAT_FLOAT, b"\0" * 14)
+        data = riff(chunk(b"fmt ", ext), chunk(b"data", b"\0" * 40))
+        self.assertEqual(utils.parse_wav_header(data)[:4], (utils.WAV_FORMAT_FLOAT, 1, 16000, 32))
+
+    def test_streamed_data_size_reads_to_end(self):
+        data = riff(fmt_chunk(), chunk(b"data", b"\0" * 100, size=0xFFFFFFFF))
+        self.assertEqual(utils.parse_wav_header(data)[5], 100)
+
+    def test_data_length_is_whole_blocks(self):
+        data = riff(fmt_chunk(channels=2), chunk(b"data", b"\0" * 10, size=10))
+        self.assertEqual(utils.parse_wav_header(data)[5], 8)
+
+    def test_header_prefix_uses_total_size(self):
+        data = riff(fmt_chunk(), chunk(b"data", b"\0" * 100000))
+        self.assertEqual(utils.parse_wav_header(data[:64], len(data))[4:], (44, 100000))
+
+    def test_unsupported_files(self):
+        self.assertIsNone(utils.parse_wav_header(b"ID3\x04" + b"\0" * 100))
+        self.assertIsNone(utils.parse_wav_header(riff(fmt_chunk(audio_format=2), chunk(b"data", b"\0" * 8))))
+        self.assertIsNone(utils.parse_wav_header(riff(fmt_chunk(bits=12), chunk(b"data", b"\0" * 8))))
+        # fmt 块在数据块之后
+        self.assertIsNone(utils.parse_wav_header(riff(chunk(b"data", b"\0" * 8), fmt_chunk())))
+
+    def test_decode_native_returns_data_region(self):
+        pcm = np.arange(-500, 500, dtype="<i2").tobytes()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "a.wav")
+            with open(path, "wb") as f:
+                f.write(riff(fmt_chunk(), chunk(b"LIST", b"x" * 10), chunk(b"data", pcm)))
+            self.assertEqual(utils.decode_native(path, "wav"), pcm)
+            # 数据区之前的块超出读取范围时交给ffmpeg
+            with open(path, "wb") as f:
+                f.write(riff(fmt_chunk(), chunk(b"LIST", b"x" * utils.WAV_HEADER_READ_BYTES), chunk(b"data", pcm)))
+            self.assertIsNone(utils.decode_native(path, "wav"))
+
+    def test_decode_native_mixes_and_resamples(self):
+        # 8kHz 立体声，两个声道相同，混音后重采样到16kHz，采样数加倍
+        frames = np.repeat(np.linspace(-0.5, 0.5, 800) * 32767, 2).astype("<i2").tobytes()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "a.wav")
+            with open(path, "wb") as f:
+                f.write(riff(fmt_chunk(channels=2, sample_rate=8000), chunk(b"data", frames)))
+            pcm = utils.decode_native(path, "wav")
+        samples = np.frombuffer(pcm, dtype="<i2")
+        self.assertEqual(len(samples), 1600)
+        self.assertLess(abs(int(samples[800]) - int(np.frombuffer(frames, dtype="<i2")[800])), 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+"""
+app.py 使用的纯函数
+
+只依赖标准库、numpy 和 scipy，不导入 funasr/torch 和 Web 框架，可以单独导入和测试。
+"""
+
+import math
+import os
+import re
+import struct
+import unicodedata
+from typing import List, Optional
+
+import numpy as np
+from scipy.signal import resample_poly
+try:
+    import soundfile
+except ImportError:  # 可选依赖，缺少时 FLAC/OGG 交给 ffmpeg 解码
+    soundfile = None
+
+# 全文检索的字段
+SEARCH_FIELDS = ("text", "zh", "en")
+CJK_CHAR_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]")
+
+
+def search_tokens(text: str) -> str:
+    """生成全文索引用的文本：中日韩字符逐字切分为独立词元，其余按单词由FTS5切分
+
+    查询时把连续的字组成短语匹配，即可对中文做精确的子串检索。
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return CJK_CHAR_RE.sub(lambda m: f" {m.group(0)} ", text)
+
+
+def search_match_expression(query: str, field: Optional[str] = None) -> str:
+    """把用户查询转换为FTS5 MATCH表达式：空格分隔的每个词作为短语，多个词同时满足"""
+    phrases = []
+    for term in query.split():
+        tokens = re.findall(r"\w+", search_tokens(term))
+        if tokens:
+            phrases.append('"' + " ".join(tokens) + '"')
+    if not phrases:
+        return ""
+    expression = " AND ".join(phrases)
+    columns = field if field else " ".join(SEARCH_FIELDS)
+    return f"{{{columns}}} : ({expression})"
+
+
+def parse_byte_range(range_header: str, file_size: int):
+    """解析单段 Range 请求头，返回 (start, end)（含end）；不可满足时返回 None
+
+    格式错误或多段范围抛出 ValueError，由调用方返回完整文件。
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        raise ValueError(f"Unsupported range: {range_header}")
+    start_text, _, end_text = ranges.strip().partition("-")
+    if not start_text:
+        # 后缀范围 bytes=-N 表示最后N个字节，空文件没有可返回的字节
+        length = int(end_text)
+        if length <= 0 or file_size == 0:
+            return None
+        return max(0, file_size - length), file_size - 1
+    start = int(start_text)
+    end = int(end_text) if end_text else file_size - 1
+    if start >= file_size or end < start:
+        return None
+    return start, min(end, file_size - 1)
+
+
+PEAKS_BUCKET_SAMPLES = 160  # 最高分辨率每个峰值覆盖10ms
+PEAKS_MIN_BUCKETS = 1024  # 最粗一级的峰值数不少于此值（音频足够长时）
+PEAKS_MAGIC = b"AMPK"
+PEAKS_VERSION = 1
+PEAKS_HEADER = struct.Struct("<4sHIIQH")  # magic, version, 采样率, 基础桶大小, 总采样数, 级数
+PEAKS_LEVEL = struct.Struct("<II")  # 每桶采样数, 桶数
+
+
+class WaveformPeaks:
+    """从16kHz s16le PCM增量计算多分辨率波形峰值
+
+    最细一级每 PEAKS_BUCKET_SAMPLES 个采样记录一对 (min, max)，之后每级把相邻两桶
+    合并，直到桶数不超过 PEAKS_MIN_BUCKETS 的两倍。峰值以 int16 数组保存，
+    文件格式为头部 + 各级 (每桶采样数, 桶数) + 各级交错的 min/max 数据。
+    """
+
+    def __init__(self, bucket_samples: int = PEAKS_BUCKET_SAMPLES):
+        self.bucket_samples = bucket_samples
+        self.samples = 0
+        self._mins = []
+        self._maxs = []
+        self._pending = b""
+
+    def feed(self, pcm: bytes):
+        """送入一段PCM，不足一个桶的尾部留待下次合并"""
+        data = self._pending + pcm
+        bucket_bytes = self.bucket_samples * 2
+        full = len(data) // bucket_bytes * bucket_bytes
+        if full:
+            buckets = np.frombuffer(data[:full], dtype=np.int16).reshape(-1, self.bucket_samples)
+            self._mins.append(buckets.min(axis=1))
+            self._maxs.append(buckets.max(axis=1))
+            self.samples += full // 2
+        self._pending = data[full:]
+
+    def levels(self) -> List[tuple]:
+        """返回各级 (每桶采样数, 交错的min/max int16数组)，从最细到最粗"""
+        mins = list(self._mins)
+        maxs = list(self._maxs)
+        tail = np.frombuffer(self._pending[:len(self._pending) // 2 * 2], dtype=np.int16)
+        if tail.size:
+            mins.append(tail.min(keepdims=True))
+            maxs.append(tail.max(keepdims=True))
+        mins = np.concatenate(mins) if mins else np.zeros(0, dtype=np.int16)
+        maxs = np.concatenate(maxs) if maxs else np.zeros(0, dtype=np.int16)
+        bucket_samples = self.bucket_samples
+        levels = []
+        while True:
+            levels.append((bucket_samples, np.stack([mins, maxs], axis=1).reshape(-1)))
+            if len(mins) <= PEAKS_MIN_BUCKETS * 2:
+                return levels
+            if len(mins) % 2:
+                mins = np.append(mins, mins[-1])
+                maxs = np.append(maxs, maxs[-1])
+            mins = mins.reshape(-1, 2).min(axis=1)
+            maxs = maxs.reshape(-1, 2).max(axis=1)
+            bucket_samples *= 2
+
+    def to_bytes(self) -> bytes:
+        levels = self.levels()
+        total_samples = self.samples + len(self._pending) // 2
+        parts = [PEAKS_HEADER.pack(PEAKS_MAGIC, PEAKS_VERSION, 16000, self.bucket_samples, total_samples, len(levels))]
+        parts += [PEAKS_LEVEL.pack(bucket_samples, len(data) // 2) for bucket_samples, data in levels]
+        parts += [data.astype("<i2").tobytes() for _, data in levels]
+        return b"".join(parts)
+
+
+def read_peaks_level(path: str, zoom: Optional[int] = None) -> tuple:
+    """从峰值文件读取一级数据，zoom 从0（最粗）开始递增到最细，None 表示最粗
+
+    返回 (头部信息, 实际级别, 每桶采样数, 交错的min/max字节)，只读取该级对应的字节范围。
+    """
+    with open(path, "rb") as f:
+        magic, version, sample_rate, _, total_samples, level_count = PEAKS_HEADER.unpack(f.read(PEAKS_HEADER.size))
+        if magic != PEAKS_MAGIC or version != PEAKS_VERSION:
+            raise ValueError(f"Invalid peaks file: {path}")
+        table = [PEAKS_LEVEL.unpack(f.read(PEAKS_LEVEL.size)) for _ in range(level_count)]
+        # 文件中从最细到最粗存放，zoom 0 对应最后一级
+        zoom = 0 if zoom is None else max(0, min(zoom, level_count - 1))
+        index = level_count - 1 - zoom
+        offset = PEAKS_HEADER.size + PEAKS_LEVEL.size * level_count + sum(count * 4 for _, count in table[:index])
+        bucket_samples, count = table[index]
+        f.seek(offset)
+        data = f.read(count * 4)
+    info = {"sample_rate": sample_rate, "total_samples": total_samples, "zoom_levels": level_count}
+    return info, zoom, bucket_samples, data
+
+
+# WAVE_FORMAT_PCM / WAVE_FORMAT_IEEE_FLOAT / WAVE_FORMAT_EXTENSIBLE
+WAV_FORMAT_PCM = 1
+WAV_FORMAT_FLOAT = 3
+WAV_FORMAT_EXTENSIBLE = 0xFFFE
+NATIVE_DECODE_FORMATS = {"wav", "flac", "ogg"} if soundfile is not None else {"wav"}
+# 解析WAV文件头时读取的字节数，数据区之前的块超出此范围时交给ffmpeg解码
+WAV_HEADER_READ_BYTES = 64 * 1024
+
+
+def parse_wav_header(data: bytes, total_size: Optional[int] = None) -> Optional[tuple]:
+    """解析WAV文件头，返回 (编码, 声道数, 采样率, 位深, 数据偏移, 数据长度)；非PCM/浮点WAV返回 None
+
+    data 可以只是文件开头，此时 total_size 为文件总长度，数据长度按文件总长度截断。
+    """
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    if total_size is None:
+        total_size = len(data)
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        chunk_size = int.from_bytes(data[pos + 4:pos + 8], "little")
+        body = pos + 8
+        if chunk_id == b"fmt " and chunk_size >= 16:
+            audio_format, channels, sample_rate = struct.unpack_from("<HHI", data, body)
+            bits = struct.unpack_from("<H", data, body + 14)[0]
+            if audio_format == WAV_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                audio_format = struct.unpack_from("<H", data, body + 24)[0]
+            fmt = (audio_format, channels, sample_rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            # 边录边写的WAV数据长度可能为0或0xFFFFFFFF，此时取到文件末尾
+            if chunk_size in (0, 0xFFFFFFFF) or body + chunk_size > total_size:
+                chunk_size = total_size - body
+            audio_format, channels, sample_rate, bits = fmt
+            supported = (
+                (audio_format == WAV_FORMAT_PCM and bits in (8, 16, 24, 32))
+                or (audio_format == WAV_FORMAT_FLOAT and bits in (32, 64))
+            )
+            if not supported or channels == 0 or sample_rate == 0:
+                return None
+            block = channels * bits // 8
+            return audio_format, channels, sample_rate, bits, body, chunk_size // block * block
+        pos = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def wav_samples(pcm: memoryview, audio_format: int, bits: int, channels: int):
+    """把WAV数据区转换为 (采样数, 声道数) 的float32数组，np.frombuffer 直接引用原缓冲区"""
+    if audio_format == WAV_FORMAT_FLOAT:
+        samples = np.frombuffer(pcm, dtype="<f4" if bits == 32 else "<f8").astype(np.float32)
+    elif bits == 8:
+        samples = (np.frombuffer(pcm, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif bits == 24:
+        raw = np.frombuffer(pcm, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+        samples = ((ints << 8) >> 8).astype(np.float32) / (1 << 23)
+    else:
+        dtype = "<i2" if bits == 16 else "<i4"
+        samples = np.frombuffer(pcm, dtype=dtype).astype(np.float32) / (1 << (bits - 1))
+    return samples.reshape(-1, channels)
+
+
+def decode_native(path: str, suffix: str) -> Optional[bytes]:
+    """进程内把 WAV/FLAC/OGG 解码为16kHz单声道s16le PCM，无法处理的编码返回 None"""
+    if suffix == "wav":
+        # 先只读文件头，再按偏移只读取数据区
+        with open(path, "rb") as f:
+            header = parse_wav_header(f.read(WAV_HEADER_READ_BYTES), os.fstat(f.fileno()).st_size)
+            if header is None:
+                return None
+            audio_format, channels, sample_rate, bits, offset, size = header
+            f.seek(offset)
+            pcm = f.read(size)
+        if audio_format == WAV_FORMAT_PCM and channels == 1 and sample_rate == 16000 and bits == 16:
+            # 已是目标格式，数据区即为PCM
+            return pcm
+        samples = wav_samples(memoryview(pcm), audio_format, bits, channels)
+    elif soundfile is not None:
+        samples, sample_rate = soundfile.read(path, dtype="float32", always_2d=True)
+    else:
+        return None
+    mono = samples.mean(axis=1) if samples.shape[1] > 1 else samples[:, 0]
+    if sample_rate != 16000:
+        divisor = math.gcd(16000, int(sample_rate))
+        mono = resample_poly(mono, 16000 // divisor, int(sample_rate) // divisor)
+    return (np.clip(mono, -1.0, 1.0) * 32767).astype("<i2").tobytes()